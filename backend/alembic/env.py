@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 from app.db.base import Base
-from app.db import models  # noqa: F401 ensure models are imported
+from app.db import model_exports  # noqa: F401 ensure models are imported
 
 # this is the Alembic Config object, which provides access to the values
 config = context.config
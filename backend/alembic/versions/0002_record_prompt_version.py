@@ -0,0 +1,37 @@
+"""record prompt version
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "structured_records",
+        sa.Column("prompt_version", sa.String(length=64), nullable=True),
+    )
+    op.create_index(
+        "ix_structured_records_prompt_version",
+        "structured_records",
+        ["prompt_version"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_structured_records_prompt_version", table_name="structured_records"
+    )
+    op.drop_column("structured_records", "prompt_version")
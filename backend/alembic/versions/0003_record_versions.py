@@ -0,0 +1,56 @@
+"""record version history
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "structured_records",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_table(
+        "structured_record_versions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "document_id",
+            sa.String(length=32),
+            sa.ForeignKey("documents.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("patch", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("snapshot", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("source", sa.String(length=32), nullable=False),
+        sa.Column("prompt_version", sa.String(length=64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("document_id", "version", name="uq_record_versions_doc"),
+    )
+    # Existing records become version 1 of their history.
+    op.execute(
+        """
+        INSERT INTO structured_record_versions
+            (document_id, version, snapshot, source, prompt_version, created_at)
+        SELECT document_id, 1, record_json, 'migrated', prompt_version, updated_at
+        FROM structured_records
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("structured_record_versions")
+    op.drop_column("structured_records", "version")
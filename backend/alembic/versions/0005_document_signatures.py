@@ -0,0 +1,55 @@
+"""document signatures and LSH bands
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_signatures",
+        sa.Column(
+            "document_id",
+            sa.String(length=32),
+            sa.ForeignKey("documents.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("minhash", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "page_digests", postgresql.JSONB(astext_type=sa.Text()), nullable=False
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "document_lsh_bands",
+        sa.Column("band", sa.SmallInteger(), primary_key=True),
+        sa.Column("bucket", sa.BigInteger(), primary_key=True),
+        sa.Column(
+            "document_id",
+            sa.String(length=32),
+            sa.ForeignKey("documents.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+    )
+    op.create_index(
+        "ix_document_lsh_bands_document_id", "document_lsh_bands", ["document_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_lsh_bands_document_id", table_name="document_lsh_bands")
+    op.drop_table("document_lsh_bands")
+    op.drop_table("document_signatures")
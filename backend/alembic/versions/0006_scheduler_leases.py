@@ -0,0 +1,35 @@
+"""scheduler leases
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduler_leases",
+        sa.Column("id", sa.String(length=32), primary_key=True),
+        sa.Column("resource", sa.String(length=16), nullable=False),
+        sa.Column("priority", sa.String(length=16), nullable=False),
+        sa.Column("enqueued_at", sa.DateTime(), nullable=False),
+        sa.Column("granted_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_scheduler_leases_resource", "scheduler_leases", ["resource"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scheduler_leases_resource", table_name="scheduler_leases")
+    op.drop_table("scheduler_leases")
@@ -1,33 +1,89 @@
 import logging
-import json
 from typing import Any
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import FileResponse, ORJSONResponse
 from sqlalchemy.orm import Session
 
+from app.core import admission
+from app.core import deadline as deadlines
+from app.core import scheduler
 from app.db.session import get_db
 from app.schemas.veterinary_record import VeterinaryRecordSchema
-from app.services import document_service
+from app.services import document_service, idempotency, record_patch
 
 
 router = APIRouter()
 router_prefix = "/documents"
 
 
+def _json(content: Any, etag: str | None = None) -> ORJSONResponse:
+    """Render directly; a returned dict would first go through jsonable_encoder,
+    which costs more than serializing a large record."""
+    return ORJSONResponse(content, headers={"ETag": etag} if etag else None)
+
+
+def _etag(version: int) -> str:
+    return f'"v{version}"'
+
+
+def _parse_if_match(value: str) -> list[int] | None:
+    """Record versions named by an ``If-Match`` header; ``None`` for ``*``.
+
+    Weak tags never match (If-Match uses strong comparison) and unknown tags
+    are ignored, so a header naming no current version fails with 412.
+    """
+    if value.strip() == "*":
+        return None
+    versions = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag.startswith('"v') and tag.endswith('"') and tag[2:-1].isdigit():
+            versions.append(int(tag[2:-1]))
+    return versions
+
+
 @router.post("/upload")
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
+    idempotency_key: str | None = Header(default=None),
     db: Session = Depends(get_db),
-) -> dict[str, str]:
+) -> Response:
     logging.getLogger("app.api.documents").info(
         "upload.start filename=%s content_type=%s", file.filename, file.content_type
     )
-    metadata = await document_service.save_upload_file(file, db=db)
-    logging.getLogger("app.api.documents").info(
-        "upload.saved id=%s size=%s", metadata["id"], metadata.get("size")
+
+    async def run() -> ORJSONResponse:
+        async with admission.admitted("upload"):
+            metadata = await document_service.save_upload_file(file, db=db)
+        logging.getLogger("app.api.documents").info(
+            "upload.saved id=%s size=%s", metadata["id"], metadata.get("size")
+        )
+        return _json({"id": metadata["id"], "filename": metadata["original_filename"]})
+
+    content = None
+    if idempotency_key is not None:
+        content = await idempotency.upload_digest(file)
+    return await idempotency.handle(
+        db,
+        idempotency_key,
+        f"{request.method} {request.url.path}",
+        "upload",
+        idempotency.fingerprint(file.filename, file.content_type, file.size, content),
+        run,
     )
-    return {"id": metadata["id"], "filename": metadata["original_filename"]}
 
 
 @router.get("/{doc_id}/file")
@@ -44,25 +100,194 @@ def download_document(doc_id: str, db: Session = Depends(get_db)) -> FileRespons
 
 
 @router.post("/{doc_id}/extract")
-def extract_and_structure_document(
-    doc_id: str, db: Session = Depends(get_db)
-) -> dict[str, Any]:
-    logging.getLogger("app.api.documents").info("extract.start id=%s", doc_id)
-    return document_service.process_document_full_pipeline(doc_id, db=db)
+async def extract_and_structure_document(
+    doc_id: str,
+    request: Request,
+    deadline: deadlines.Deadline = Depends(deadlines.request_deadline),
+    priority: str = Depends(scheduler.request_priority),
+    include_raw_text: bool = Query(default=False),
+    reuse_near_duplicate: bool = Query(default=True),
+    idempotency_key: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+) -> Response:
+    logging.getLogger("app.api.documents").info(
+        "extract.start id=%s priority=%s", doc_id, priority
+    )
+
+    async def run() -> ORJSONResponse:
+        async with admission.admitted("extract"):
+            result = await deadlines.run_cancellable(
+                request,
+                deadline,
+                scheduler.prioritized(
+                    priority, document_service.process_document_full_pipeline
+                ),
+                doc_id,
+                db,
+                include_raw_text,
+                reuse_near_duplicate,
+            )
+        return _json(result)
+
+    return await idempotency.handle(
+        db,
+        idempotency_key,
+        f"{request.method} {request.url.path}",
+        "extract",
+        idempotency.fingerprint(include_raw_text, reuse_near_duplicate),
+        run,
+        wait_seconds=deadline.remaining(),
+    )
+
+
+@router.get("/{doc_id}/text")
+def get_document_text(
+    doc_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=200),
+    db: Session = Depends(get_db),
+) -> ORJSONResponse:
+    logging.getLogger("app.api.documents").debug(
+        "text.read id=%s offset=%s limit=%s", doc_id, offset, limit
+    )
+    return _json(document_service.read_raw_text_segments(doc_id, offset, limit, db))
+
+
+@router.get("/{doc_id}/near-duplicates")
+def get_near_duplicates(
+    doc_id: str,
+    threshold: float | None = Query(default=None, ge=0, le=1),
+    db: Session = Depends(get_db),
+) -> ORJSONResponse:
+    return _json(document_service.find_near_duplicates(db, doc_id, threshold))
+
+
+@router.post("/{doc_id}/extract/fields")
+async def re_extract_document_fields(
+    doc_id: str,
+    request: Request,
+    fields: list[str] = Body(..., embed=True),
+    pages: list[int] | None = Body(default=None, embed=True),
+    if_match: str | None = Header(default=None),
+    idempotency_key: str | None = Header(default=None),
+    deadline: deadlines.Deadline = Depends(deadlines.request_deadline),
+    priority: str = Depends(scheduler.request_priority),
+    db: Session = Depends(get_db),
+) -> Response:
+    logging.getLogger("app.api.documents").info(
+        "extract.fields.request id=%s fields=%s", doc_id, ",".join(fields)
+    )
+    versions = None if if_match is None else _parse_if_match(if_match)
+
+    async def run() -> ORJSONResponse:
+        async with admission.admitted("extract"):
+            result = await deadlines.run_cancellable(
+                request,
+                deadline,
+                scheduler.prioritized(priority, document_service.re_extract_fields),
+                db,
+                doc_id,
+                fields,
+                pages,
+                versions,
+            )
+        return _json(result, etag=_etag(result["version"]))
+
+    return await idempotency.handle(
+        db,
+        idempotency_key,
+        f"{request.method} {request.url.path}",
+        "extract_fields",
+        idempotency.fingerprint(fields, pages, if_match),
+        run,
+        wait_seconds=deadline.remaining(),
+    )
 
 
 @router.put("/{doc_id}")
 def update_document_record(
     doc_id: str,
     payload: dict[str, Any],
+    if_match: str | None = Header(default=None),
     db: Session = Depends(get_db),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     logging.getLogger("app.api.documents").info("record.update.start id=%s", doc_id)
     if "record" not in payload:
         raise HTTPException(status_code=422, detail="'record' field required")
-    record = VeterinaryRecordSchema.model_validate(payload["record"])
-    updated = document_service.upsert_structured_record(
-        db, doc_id, json.loads(record.model_dump_json())
+    record = VeterinaryRecordSchema.model_validate(payload["record"]).model_dump(
+        mode="json"
     )
+    if if_match is None:
+        (row,) = document_service.bulk_upsert_structured_records(
+            db, {doc_id: record}, None
+        )
+    else:
+        row = document_service.update_structured_record_if_match(
+            db, doc_id, record, _parse_if_match(if_match)
+        )
     logging.getLogger("app.api.documents").info("record.update.success id=%s", doc_id)
-    return {"id": doc_id, "record": updated}
+    return _json(
+        {"id": doc_id, "version": row["version"], "record": row["record_json"]},
+        etag=_etag(row["version"]),
+    )
+
+
+@router.get("/{doc_id}/record")
+def get_document_record(
+    doc_id: str,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+) -> Response:
+    logging.getLogger("app.api.documents").debug("record.read id=%s", doc_id)
+    current = document_service.get_structured_record(db, doc_id)
+    etag = _etag(current["version"])
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    return _json(current, etag=etag)
+
+
+@router.patch("/{doc_id}/record")
+def patch_document_record(
+    doc_id: str,
+    response: Response,
+    patch: Any = Body(...),
+    content_type: str = Header(...),
+    if_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in record_patch.CONTENT_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Use {' or '.join(record_patch.CONTENT_TYPES)}",
+        )
+    logging.getLogger("app.api.documents").info(
+        "record.patch.start id=%s type=%s", doc_id, media_type
+    )
+    versions = None if if_match is None else _parse_if_match(if_match)
+    row = document_service.patch_structured_record(
+        db, doc_id, media_type, patch, versions
+    )
+    response.headers["ETag"] = _etag(row["version"])
+    logging.getLogger("app.api.documents").info("record.patch.success id=%s", doc_id)
+    return {"id": doc_id, "version": row["version"]}
+
+
+@router.get("/{doc_id}/record/versions")
+def list_document_record_versions(
+    doc_id: str, db: Session = Depends(get_db)
+) -> dict[str, Any]:
+    logging.getLogger("app.api.documents").debug("record.versions id=%s", doc_id)
+    return document_service.list_structured_record_versions(db, doc_id)
+
+
+@router.get("/{doc_id}/record/versions/{version}")
+def get_document_record_version(
+    doc_id: str, version: int, db: Session = Depends(get_db)
+) -> ORJSONResponse:
+    logging.getLogger("app.api.documents").debug(
+        "record.version.read id=%s version=%s", doc_id, version
+    )
+    return _json(document_service.get_structured_record_version(db, doc_id, version))
@@ -0,0 +1,14 @@
+import logging
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.core.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics() -> dict[str, Any]:
+    logging.getLogger("app.api.metrics").debug("metrics.read")
+    return metrics.snapshot()
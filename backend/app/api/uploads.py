@@ -0,0 +1,102 @@
+import logging
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from app.core import admission
+from app.db.session import get_db
+from app.services import upload_sessions
+
+
+router = APIRouter(tags=["uploads"])
+router_prefix = "/uploads"
+
+OFFSET_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _offset_headers(session: dict[str, Any]) -> dict[str, str]:
+    return {
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["length"]),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("", status_code=201)
+def create_upload(payload: dict[str, Any], response: Response) -> dict[str, Any]:
+    """Open a resumable upload: ``{"filename", "length", "content_type"?, "sha256"?}``."""
+    try:
+        filename = str(payload["filename"])
+        length = int(payload["length"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=422, detail="'filename' and integer 'length' required"
+        )
+    session = upload_sessions.create_session(
+        filename,
+        length,
+        declared_type=payload.get("content_type"),
+        sha256=payload.get("sha256"),
+    )
+    logging.getLogger("app.api.uploads").info(
+        "upload.session.start id=%s length=%s", session["id"], length
+    )
+    response.headers["Location"] = f"{router_prefix}/{session['id']}"
+    response.headers.update(_offset_headers(session))
+    return session
+
+
+@router.head("/{session_id}")
+def upload_offset(session_id: str) -> Response:
+    session = upload_sessions.get_session(session_id)
+    return Response(status_code=200, headers=_offset_headers(session))
+
+
+@router.get("/{session_id}")
+def upload_status(session_id: str, response: Response) -> dict[str, Any]:
+    session = upload_sessions.get_session(session_id)
+    response.headers.update(_offset_headers(session))
+    return session
+
+
+@router.patch(
+    "/{session_id}",
+    status_code=204,
+    dependencies=[Depends(admission.admit("upload"))],
+)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+) -> Response:
+    content_type = request.headers.get("content-type", "")
+    if content_type.split(";")[0].strip() != OFFSET_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=415, detail=f"Content-Type must be {OFFSET_CONTENT_TYPE}"
+        )
+    offset = await upload_sessions.append_chunk(
+        session_id, upload_offset, request.stream()
+    )
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@router.post(
+    "/{session_id}/finalize", dependencies=[Depends(admission.admit("upload"))]
+)
+def finalize_upload(session_id: str, db: Session = Depends(get_db)) -> dict[str, str]:
+    metadata = upload_sessions.finalize_session(session_id, db=db)
+    logging.getLogger("app.api.uploads").info(
+        "upload.session.finalized id=%s size=%s", metadata["id"], metadata["size"]
+    )
+    return {
+        "id": metadata["id"],
+        "filename": metadata["original_filename"],
+        "sha256": metadata["sha256"],
+    }
+
+
+@router.delete("/{session_id}", status_code=204)
+def cancel_upload(session_id: str) -> Response:
+    upload_sessions.delete_session(session_id)
+    return Response(status_code=204)
@@ -0,0 +1,333 @@
+"""Re-extract structured records for existing documents.
+
+    python -m app.backfill --stale --since 2026-01-01 --content-type application/pdf \
+        --concurrency 8 --workers 4 --batch-size 50
+
+Documents are selected by upload date, content type and the prompt version
+of their current record. ``--stale`` selects documents with no record or one
+not produced by the current ``PROMPT_VERSION``. Text extraction runs in a
+process pool. LLM structuring runs with bounded async concurrency. Both take
+their slots from the scheduler budget shared with the API, as ``batch`` work,
+so interactive requests go first. Results are written in batches with one
+``INSERT ... ON CONFLICT`` each. Progress is checkpointed after every batch,
+so rerunning the same command resumes where it stopped; ``--restart``
+discards the checkpoint.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core import scheduler
+from app.core.config import settings
+from app.db.model_exports import Document, StructuredRecord
+from app.db.session import SessionLocal
+from app.services.document_service import bulk_upsert_structured_records
+from app.services.extraction.factory import get_extractor
+from app.services.llm_service import PROMPT_VERSION, extract_structured_record_async
+
+logger = logging.getLogger("app.backfill")
+
+NO_VERSION = "none"
+
+
+@dataclass
+class BackfillOptions:
+    since: datetime | None = None
+    until: datetime | None = None
+    content_types: list[str] = field(default_factory=list)
+    prompt_versions: list[str] = field(default_factory=list)
+    stale: bool = False
+    limit: int | None = None
+    concurrency: int = 8
+    workers: int = os.cpu_count() or 1
+    batch_size: int = 50
+    checkpoint: str = ".backfill-checkpoint.json"
+    restart: bool = False
+    dry_run: bool = False
+
+    def filters(self) -> dict[str, Any]:
+        return {
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+            "content_types": sorted(self.content_types),
+            "prompt_versions": sorted(self.prompt_versions),
+            "stale": self.stale,
+            "target_prompt_version": PROMPT_VERSION,
+        }
+
+
+class Checkpoint:
+    """Document ids already written, persisted atomically after each batch."""
+
+    def __init__(self, path: str, filters: dict[str, Any], restart: bool) -> None:
+        self.path = Path(path)
+        self.filters = filters
+        self.done: set[str] = set()
+        self.failed: dict[str, str] = {}
+        if self.path.exists() and not restart:
+            data = json.loads(self.path.read_text())
+            if data.get("filters") != filters:
+                raise SystemExit(
+                    f"{self.path} was written for different filters; "
+                    "use --restart or another --checkpoint"
+                )
+            self.done = set(data.get("done", []))
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "filters": self.filters,
+                    "done": sorted(self.done),
+                    "failed": self.failed,
+                    "updated_at": datetime.utcnow().isoformat() + "Z",
+                }
+            )
+        )
+        os.replace(tmp, self.path)
+
+
+class Progress:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.written = 0
+        self.failed = 0
+        self.t0 = time.perf_counter()
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = time.perf_counter() - self.t0
+        finished = self.written + self.failed
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - finished
+        return {
+            "total": self.total,
+            "written": self.written,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(rate, 3),
+            "eta_s": round(remaining / rate) if rate else None,
+        }
+
+
+def select_documents(
+    db: Session, options: BackfillOptions
+) -> list[tuple[str, str, str]]:
+    """``(id, path, content_type)`` of matching documents, oldest first."""
+    query = (
+        select(Document.id, Document.path, Document.content_type)
+        .outerjoin(StructuredRecord, StructuredRecord.document_id == Document.id)
+        .order_by(Document.created_at, Document.id)
+    )
+    if options.since:
+        query = query.where(Document.created_at >= options.since)
+    if options.until:
+        query = query.where(Document.created_at < options.until)
+    if options.content_types:
+        query = query.where(Document.content_type.in_(options.content_types))
+    if options.stale:
+        query = query.where(
+            StructuredRecord.prompt_version.is_distinct_from(PROMPT_VERSION)
+        )
+    if options.prompt_versions:
+        versions = [v for v in options.prompt_versions if v != NO_VERSION]
+        conditions = [StructuredRecord.prompt_version.in_(versions)]
+        if NO_VERSION in options.prompt_versions:
+            conditions.append(StructuredRecord.prompt_version.is_(None))
+        query = query.where(or_(*conditions))
+    if options.limit:
+        query = query.limit(options.limit)
+    return [tuple(row) for row in db.execute(query)]
+
+
+def _extract_text(content_type: str, path: str) -> str:
+    return get_extractor(content_type).extract(path).text or ""
+
+
+async def _run(
+    options: BackfillOptions,
+    documents: list[tuple[str, str, str]],
+    checkpoint: Checkpoint,
+    progress: Progress,
+    session_factory: Callable[[], Session],
+    executor: Executor | None,
+) -> None:
+    loop = asyncio.get_running_loop()
+    pending: dict[str, dict[str, Any]] = {}
+    flush_lock = asyncio.Lock()
+    queue: Iterator[tuple[str, str, str]] = iter(documents)
+
+    def write_batch(batch: dict[str, dict[str, Any]]) -> None:
+        with session_factory() as db:
+            try:
+                bulk_upsert_structured_records(db, batch, PROMPT_VERSION)
+                progress.written += len(batch)
+                checkpoint.done.update(batch)
+            except Exception:
+                db.rollback()
+                # Isolate the offending rows (e.g. a document deleted meanwhile).
+                for doc_id, record in batch.items():
+                    try:
+                        bulk_upsert_structured_records(
+                            db, {doc_id: record}, PROMPT_VERSION
+                        )
+                        progress.written += 1
+                        checkpoint.done.add(doc_id)
+                    except Exception as exc:
+                        db.rollback()
+                        progress.failed += 1
+                        checkpoint.failed[doc_id] = f"write: {exc}"
+        checkpoint.save()
+        logger.info(
+            "backfill.progress %s",
+            " ".join(f"{k}={v}" for k, v in progress.snapshot().items()),
+        )
+
+    async def flush(force: bool = False) -> None:
+        async with flush_lock:
+            if not pending or (len(pending) < options.batch_size and not force):
+                return
+            batch = dict(pending)
+            pending.clear()
+            await asyncio.to_thread(write_batch, batch)
+
+    async def worker() -> None:
+        for doc_id, path, content_type in queue:
+            try:
+                async with scheduler.slot_async("ocr"):
+                    text = await loop.run_in_executor(
+                        executor, _extract_text, content_type, path
+                    )
+                if not text.strip():
+                    raise ValueError("no text could be extracted")
+                record = await extract_structured_record_async(text)
+            except Exception as exc:
+                progress.failed += 1
+                checkpoint.failed[doc_id] = f"{exc.__class__.__name__}: {exc}"
+                logger.warning("backfill.error id=%s msg=%s", doc_id, str(exc))
+                continue
+            checkpoint.failed.pop(doc_id, None)
+            pending[doc_id] = record.model_dump(mode="json")
+            await flush()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, options.concurrency))))
+    await flush(force=True)
+
+
+def run_backfill(
+    options: BackfillOptions,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> dict[str, Any]:
+    """Run a backfill and return the final progress summary."""
+    checkpoint = Checkpoint(options.checkpoint, options.filters(), options.restart)
+    with session_factory() as db:
+        selected = select_documents(db, options)
+    documents = [d for d in selected if d[0] not in checkpoint.done]
+    skipped = len(selected) - len(documents)
+    logger.info(
+        "backfill.start selected=%s resumed_skip=%s prompt_version=%s",
+        len(selected),
+        skipped,
+        PROMPT_VERSION,
+    )
+    progress = Progress(len(documents))
+    if options.dry_run or not documents:
+        return {**progress.snapshot(), "skipped": skipped, "dry_run": options.dry_run}
+
+    executor = None
+    if options.workers > 0:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["app.services.extraction.factory"])
+        executor = ProcessPoolExecutor(max_workers=options.workers, mp_context=ctx)
+    # --concurrency is the LLM budget of this process; its work is batch class.
+    scheduler.configure("llm", options.concurrency)
+    if settings.scheduler_shared:
+        # Compete with the API for the same OCR and LLM slots.
+        scheduler.share(session_factory)
+    try:
+        with scheduler.use_priority(scheduler.BATCH):
+            asyncio.run(
+                _run(
+                    options, documents, checkpoint, progress, session_factory, executor
+                )
+            )
+    finally:
+        scheduler.share(None)
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    summary = {**progress.snapshot(), "skipped": skipped}
+    logger.info("backfill.done %s", " ".join(f"{k}={v}" for k, v in summary.items()))
+    return summary
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def parse_args(argv: list[str] | None = None) -> BackfillOptions:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", type=_parse_date, help="uploaded at or after")
+    parser.add_argument("--until", type=_parse_date, help="uploaded before")
+    parser.add_argument("--content-type", action="append", default=[])
+    parser.add_argument(
+        "--prompt-version",
+        action="append",
+        default=[],
+        help=f"records produced by this version ('{NO_VERSION}' = unversioned)",
+    )
+    parser.add_argument("--stale", action="store_true")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="extraction processes"
+    )
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--checkpoint", default=".backfill-checkpoint.json")
+    parser.add_argument("--restart", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    return BackfillOptions(
+        since=args.since,
+        until=args.until,
+        content_types=args.content_type,
+        prompt_versions=args.prompt_version,
+        stale=args.stale,
+        limit=args.limit,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint=args.checkpoint,
+        restart=args.restart,
+        dry_run=args.dry_run,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    options = parse_args(argv)
+    logger.info("backfill.options %s", json.dumps(asdict(options), default=str))
+    summary = run_backfill(options)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""Admission control for expensive endpoints.
+
+Each endpoint class (``extract``, ``upload``) has a concurrency limit and a
+bounded wait queue. When all slots are taken, requests wait in FIFO order.
+They are turned away with ``503`` and ``Retry-After`` when the queue is full,
+when their wait times out, or while the process is over its memory budget.
+
+The limit adapts between 1 and the configured maximum. It drops when the
+class's p95 latency over the last ``admission_latency_window_seconds``
+exceeds its target, or when RSS (from
+``/proc/self/statm``) nears the memory budget. It creeps back up while
+latency and memory are healthy and the slots are in use. Limits, in-flight
+requests, queue depth, wait time and rejections are published as
+``admission.<class>.*`` metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger("app.core.admission")
+
+# Limits are re-evaluated at most this often.
+ADAPT_INTERVAL_SECONDS = 1.0
+# Latency samples kept for the control loop, at most.
+_RECENT_MAX = 1024
+# Below this share of the memory budget the limit may grow again.
+MEMORY_HEADROOM = 0.85
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CGROUP_LIMITS = (
+    "/sys/fs/cgroup/memory.max",
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+)
+
+
+def rss_bytes() -> int | None:
+    """Resident set size of this process, or ``None`` where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def memory_budget_bytes() -> int | None:
+    """Per-process RSS budget: the setting, else a share of the cgroup limit."""
+    if settings.admission_memory_limit_mb > 0:
+        return settings.admission_memory_limit_mb * 1024 * 1024
+    for path in _CGROUP_LIMITS:
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        # "max" (v2) or a huge sentinel (v1) mean no limit.
+        if raw.isdigit() and int(raw) < 1 << 60:
+            workers = settings.web_concurrency or os.cpu_count() or 1
+            return int(int(raw) * 0.8 / workers)
+    return None
+
+
+class _Waiter:
+    __slots__ = ("loop", "future")
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.future: asyncio.Future[None] = self.loop.create_future()
+
+    def wake(self) -> None:
+        def resolve() -> None:
+            if not self.future.done():
+                self.future.set_result(None)
+
+        self.loop.call_soon_threadsafe(resolve)
+
+
+class AdmissionController:
+    """Adaptive concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        target_p95_ms: float,
+        memory_budget: Callable[[], int | None] = memory_budget_bytes,
+        rss: Callable[[], int | None] = rss_bytes,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.target_p95_ms = target_p95_ms
+        self._memory_budget = memory_budget
+        self._rss = rss
+        self.in_flight = 0
+        self._queue: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self._adapted_at = 0.0
+        # (finished at, duration) of recent requests, for the control loop only;
+        # the published latency summary keeps its own window.
+        self._recent: deque[tuple[float, float]] = deque(maxlen=_RECENT_MAX)
+        self._publish()
+
+    @property
+    def latency_metric(self) -> str:
+        return f"admission.{self.name}.latency_ms"
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f"admission.{self.name}.limit", self.limit)
+        metrics.set_gauge(f"admission.{self.name}.in_flight", self.in_flight)
+        metrics.set_gauge(f"admission.{self.name}.queue_depth", len(self._queue))
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the median latency."""
+        p50_ms = metrics.quantile(self.latency_metric, 50) or 1000.0
+        waves = (len(self._queue) + 1) / self.limit
+        return max(1, min(60, math.ceil(p50_ms * waves / 1000)))
+
+    def _reject(self, reason: str) -> HTTPException:
+        metrics.incr(f"admission.{self.name}.rejected")
+        metrics.incr(f"admission.{self.name}.rejected.{reason}")
+        retry_after = self.retry_after()
+        logger.warning(
+            "admission.rejected class=%s reason=%s in_flight=%s limit=%s queue=%s",
+            self.name,
+            reason,
+            self.in_flight,
+            self.limit,
+            len(self._queue),
+        )
+        return HTTPException(
+            status_code=503,
+            detail="Server is busy; retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def record(self, duration_ms: float) -> None:
+        metrics.observe(self.latency_metric, duration_ms)
+        with self._lock:
+            self._recent.append((time.monotonic(), duration_ms))
+
+    def recent_p95(self, now: float | None = None) -> float | None:
+        """p95 of the requests that finished within the latency window.
+
+        Old slow requests age out after the window, however few new ones
+        finish, so a limit pushed down to 1 can recover.
+        """
+        now = time.monotonic() if now is None else now
+        horizon = now - settings.admission_latency_window_seconds
+        while self._recent and self._recent[0][0] < horizon:
+            self._recent.popleft()
+        if not self._recent:
+            return None
+        ordered = sorted(duration for _, duration in self._recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _over_memory(self) -> bool:
+        budget, rss = self._memory_budget(), self._rss()
+        return budget is not None and rss is not None and rss >= budget
+
+    def adapt(self, force: bool = False) -> None:
+        """Move the limit one step towards what latency and memory allow."""
+        now = time.monotonic()
+        if not force and now - self._adapted_at < ADAPT_INTERVAL_SECONDS:
+            return
+        self._adapted_at = now
+        budget, rss = self._memory_budget(), self._rss()
+        if rss is not None:
+            metrics.set_gauge("process.rss_mb", rss / (1024 * 1024))
+        p95 = self.recent_p95(now)
+        previous = self.limit
+        if budget is not None and rss is not None and rss >= budget:
+            # Memory is what gets the container killed: shed hard.
+            self.limit = 1
+        elif (
+            budget is not None and rss is not None and rss > budget * MEMORY_HEADROOM
+        ) or (p95 is not None and p95 > self.target_p95_ms):
+            self.limit = max(1, self.limit - 1)
+        elif self.limit < self.max_concurrency and self.in_flight >= self.limit:
+            self.limit += 1
+        if self.limit != previous:
+            logger.info(
+                "admission.limit class=%s from=%s to=%s p95_ms=%s rss_mb=%s",
+                self.name,
+                previous,
+                self.limit,
+                None if p95 is None else int(p95),
+                None if rss is None else rss // (1024 * 1024),
+            )
+            self._wake()
+        self._publish()
+
+    def _wake(self) -> None:
+        """Hand free slots to queued requests, oldest first (lock held)."""
+        while self._queue and self.in_flight < self.limit:
+            waiter = self._queue.popleft()
+            if waiter.future.done():
+                continue
+            self.in_flight += 1
+            waiter.wake()
+
+    async def acquire(self) -> None:
+        with self._lock:
+            self.adapt()
+            if self.in_flight < self.limit and not self._queue:
+                if self.in_flight and self._over_memory():
+                    raise self._reject("memory")
+                self.in_flight += 1
+                self._publish()
+                metrics.observe(f"admission.{self.name}.wait_ms", 0.0)
+                return
+            if len(self._queue) >= self.max_queue:
+                raise self._reject("queue_full")
+            waiter = _Waiter()
+            self._queue.append(waiter)
+            self._publish()
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter in self._queue:
+                    self._queue.remove(waiter)
+                    self._publish()
+                    raise self._reject("queue_timeout")
+            # Otherwise a slot was handed over just as the wait ended: keep it.
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._queue:
+                    self._queue.remove(waiter)
+                    self._publish()
+                    raise
+            self.release(None)
+            raise
+        metrics.observe(
+            f"admission.{self.name}.wait_ms", (time.perf_counter() - t0) * 1000
+        )
+
+    def release(self, duration_ms: float | None) -> None:
+        if duration_ms is not None:
+            self.record(duration_ms)
+        with self._lock:
+            self.in_flight -= 1
+            self.adapt()
+            self._wake()
+            self._publish()
+
+
+_controllers: dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def controller(name: str) -> AdmissionController:
+    """The process-wide controller for an endpoint class, built from settings."""
+    with _controllers_lock:
+        if name not in _controllers:
+            _controllers[name] = AdmissionController(
+                name,
+                max_concurrency=settings.admission_limits.get(name, 4),
+                max_queue=settings.admission_queue_size,
+                queue_timeout=settings.admission_queue_timeout_seconds,
+                target_p95_ms=settings.admission_target_p95_ms.get(name, 60000),
+            )
+        return _controllers[name]
+
+
+@asynccontextmanager
+async def admitted(name: str) -> AsyncIterator[None]:
+    """Hold a slot of ``name`` for the duration of the block.
+
+    For handlers that must decide whether there is work at all (an
+    idempotent replay, say) before taking a slot.
+    """
+    if not settings.admission_enabled:
+        yield
+        return
+    gate = controller(name)
+    await gate.acquire()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        gate.release((time.perf_counter() - t0) * 1000)
+
+
+def admit(name: str) -> Callable[[], AsyncIterator[None]]:
+    """Dependency that holds a slot of ``name`` for the rest of the request."""
+
+    async def dependency() -> AsyncIterator[None]:
+        async with admitted(name):
+            yield
+
+    return dependency
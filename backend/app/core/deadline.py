@@ -0,0 +1,178 @@
+"""Per-request deadlines and cooperative cancellation.
+
+A ``Deadline`` is created for each long-running request (``request_deadline``)
+and installed in a context variable while the work runs (``run_cancellable``),
+so text extraction and LLM calls find it without extra parameters. It is set
+when the time budget runs out or the client disconnects. Work checks it
+between steps and polls it while waiting on subprocesses and network calls,
+then stops: tesseract is killed, the OpenAI request is cancelled and the
+database session is rolled back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+
+from fastapi import Header, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger("app.core.deadline")
+
+T = TypeVar("T")
+
+# How often waits wake up to look at the deadline and the connection.
+POLL_SECONDS = 0.1
+
+
+class RequestCancelled(Exception):
+    """The request's work was stopped before it finished."""
+
+    status_code = 499
+    reason = "cancelled"
+
+
+class DeadlineExceeded(RequestCancelled):
+    status_code = 504
+    reason = "deadline"
+
+    def __init__(self) -> None:
+        super().__init__("Request deadline exceeded")
+
+
+class ClientDisconnected(RequestCancelled):
+    # Non-standard, as used by nginx; the client never sees it.
+    status_code = 499
+    reason = "disconnect"
+
+    def __init__(self) -> None:
+        super().__init__("Client disconnected")
+
+
+class Deadline:
+    """A point in (monotonic) time after which work stops, plus a cancel flag."""
+
+    def __init__(self, timeout: float | None) -> None:
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+        self._disconnected = threading.Event()
+
+    def remaining(self) -> float | None:
+        """Seconds left, never negative; ``None`` without a time limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self) -> None:
+        self._disconnected.set()
+
+    @property
+    def done(self) -> bool:
+        return self._disconnected.is_set() or self.remaining() == 0.0
+
+    def check(self) -> None:
+        """Raise :class:`RequestCancelled` once the work should stop."""
+        if self._disconnected.is_set():
+            raise ClientDisconnected()
+        if self.remaining() == 0.0:
+            raise DeadlineExceeded()
+
+    async def guard(self, awaitable: Awaitable[T]) -> T:
+        """Await ``awaitable``, cancelling it as soon as the deadline is done."""
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=POLL_SECONDS)
+                if done:
+                    return task.result()
+                if self.done:
+                    self.check()
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+
+_current: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+def current() -> Deadline | None:
+    return _current.get()
+
+
+def check() -> None:
+    """Raise if the current request's deadline is done; no-op outside requests."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+@contextmanager
+def use(deadline: Deadline | None) -> Iterator[Deadline | None]:
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+async def request_deadline(
+    x_request_timeout: float | None = Header(default=None),
+) -> Deadline:
+    """Dependency: the request's deadline, ``X-Request-Timeout`` seconds if given.
+
+    The header can shorten or extend ``request_timeout_seconds`` up to
+    ``request_timeout_max_seconds``.
+    """
+    timeout = settings.request_timeout_seconds
+    if x_request_timeout is not None and x_request_timeout > 0:
+        timeout = min(x_request_timeout, settings.request_timeout_max_seconds)
+    return Deadline(timeout if timeout > 0 else None)
+
+
+async def _watch_disconnect(request: Request, deadline: Deadline) -> None:
+    while not deadline.done:
+        if await request.is_disconnected():
+            deadline.cancel()
+            return
+        await asyncio.sleep(POLL_SECONDS)
+
+
+async def run_cancellable(
+    request: Request,
+    deadline: Deadline,
+    fn: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """Run blocking ``fn`` in the threadpool with ``deadline`` installed.
+
+    The connection is watched meanwhile; a disconnect cancels the deadline.
+    The work is awaited until it has stopped, so the caller's database session
+    is no longer in use when this returns or raises.
+    """
+
+    def run() -> T:
+        with use(deadline):
+            return fn(*args, **kwargs)
+
+    watcher = asyncio.create_task(_watch_disconnect(request, deadline))
+    try:
+        return await run_in_threadpool(run)
+    finally:
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+
+
+def count_cancelled(exc: RequestCancelled, path: str) -> None:
+    metrics.incr(f"requests.cancelled.{exc.reason}")
+    logger.info("request.cancelled path=%s reason=%s", path, exc.reason)
@@ -0,0 +1,91 @@
+"""In-process metrics: counters, gauges and latency summaries.
+
+Values are per worker process and exposed as JSON at ``GET /metrics``.
+"""
+
+import threading
+from collections import deque
+from typing import Any
+
+_WINDOW = 1024
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    rank = (len(ordered) - 1) * q / 100.0
+    lo = int(rank)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+class MetricsRegistry:
+    """Thread-safe metric store; timings keep a sliding window of samples."""
+
+    def __init__(self, window: int = _WINDOW) -> None:
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, deque[float]] = {}
+        self._timing_counts: dict[str, int] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self._window)
+            samples.append(value_ms)
+            self._timing_counts[name] = self._timing_counts.get(name, 0) + 1
+
+    def quantile(self, name: str, q: float) -> float | None:
+        """Percentile (0..100) over the current window, or None without samples."""
+        with self._lock:
+            samples = sorted(self._timings.get(name, ()))
+        return _percentile(samples, q) if samples else None
+
+    def timing_count(self, name: str) -> int:
+        """Samples observed for ``name`` since start (not only the window)."""
+        with self._lock:
+            return self._timing_counts.get(name, 0)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            timings = {name: sorted(s) for name, s in self._timings.items()}
+            result: dict[str, Any] = {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {},
+            }
+            counts = dict(self._timing_counts)
+        for name, ordered in timings.items():
+            if not ordered:
+                continue
+            result["timings"][name] = {
+                "count": counts[name],
+                "p50_ms": _percentile(ordered, 50),
+                "p95_ms": _percentile(ordered, 95),
+                "p99_ms": _percentile(ordered, 99),
+                "max_ms": ordered[-1],
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+            self._timing_counts.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,473 @@
+"""Priority scheduling of OCR workers and LLM calls between request classes.
+
+Work is tagged with a priority class (``interactive``, ``batch`` or
+``background``), from the ``X-Priority`` header for API requests. Each shared
+resource (``ocr``, ``llm``) has a number of slots. When slots are free, work
+runs at once. Otherwise waiting work is served by weighted fair queuing
+(stride scheduling): with weights 8/2/1, interactive work gets eight slots
+for every one that background work gets, but every class keeps moving.
+Aging bounds the wait: work queued longer than ``scheduler_aging_seconds``
+goes next whatever its class.
+
+With ``scheduler_shared`` on, a process that calls :func:`share` (the API at
+startup, the backfill CLI) takes its slots from the ``scheduler_leases``
+table instead, so one budget covers every process on the database and
+interactive requests overtake a backfill running elsewhere. Waiting work
+polls the table. A free slot goes to the class furthest below its weighted
+share of the slots held, oldest work first, with the same aging rule.
+
+Waits per resource and class are published as
+``scheduler.<resource>.<class>.wait_ms``; end-to-end latency per class as
+``scheduler.<class>.latency_ms``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+from fastapi import Header, HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core import deadline as deadlines
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.model_exports import SchedulerLease
+
+logger = logging.getLogger("app.core.scheduler")
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+CLASSES = (INTERACTIVE, BATCH, BACKGROUND)
+
+# How often shared waiters look at the lease table.
+SHARED_POLL_SECONDS = 0.2
+# A waiting row lapses this long after its last poll.
+_WAITER_TTL_SECONDS = 10
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "priority", default=INTERACTIVE
+)
+
+
+class _Ticket:
+    __slots__ = ("priority", "enqueued_at", "granted")
+
+    def __init__(self, priority: str) -> None:
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class Resource:
+    """A pool of slots shared by the priority classes."""
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        weights: dict[str, float],
+        aging_seconds: float,
+    ) -> None:
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.weights = {c: max(float(weights.get(c, 1)), 0.001) for c in CLASSES}
+        self.aging_seconds = aging_seconds
+        self.in_use = 0
+        self._queues: dict[str, deque[_Ticket]] = {c: deque() for c in CLASSES}
+        # Stride scheduling: the class with the lowest pass goes next and
+        # advances by 1 / weight.
+        self._passes = {c: 0.0 for c in CLASSES}
+        self._cond = threading.Condition()
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f"scheduler.{self.name}.in_use", self.in_use)
+        for cls, queue in self._queues.items():
+            metrics.set_gauge(f"scheduler.{self.name}.{cls}.queued", len(queue))
+
+    def _next_class(self) -> str | None:
+        waiting = [c for c in CLASSES if self._queues[c]]
+        if not waiting:
+            return None
+        oldest = min(waiting, key=lambda c: self._queues[c][0].enqueued_at)
+        if time.monotonic() - self._queues[oldest][0].enqueued_at >= self.aging_seconds:
+            metrics.incr(f"scheduler.{self.name}.{oldest}.aged")
+            return oldest
+        return min(waiting, key=lambda c: (self._passes[c], CLASSES.index(c)))
+
+    def _grant(self) -> None:
+        """Hand free slots to waiting tickets (condition held)."""
+        while self.in_use < self.capacity:
+            cls = self._next_class()
+            if cls is None:
+                break
+            ticket = self._queues[cls].popleft()
+            ticket.granted = True
+            self.in_use += 1
+            self._passes[cls] += 1 / self.weights[cls]
+        self._cond.notify_all()
+
+    def _enqueue(self, ticket: _Ticket) -> None:
+        queue = self._queues[ticket.priority]
+        if not queue:
+            # A class that was idle does not bank credit: start at the
+            # lowest pass among the classes that are waiting.
+            active = [self._passes[c] for c in CLASSES if self._queues[c]]
+            if active:
+                floor = min(active)
+                self._passes[ticket.priority] = max(
+                    self._passes[ticket.priority], floor
+                )
+        queue.append(ticket)
+
+    def acquire(self, priority: str, abandon: threading.Event | None = None) -> float:
+        """Block until a slot is granted; returns the wait in ms.
+
+        Gives up with the current request deadline, or when ``abandon`` is set.
+        """
+        deadline = deadlines.current()
+        ticket = _Ticket(priority)
+        with self._cond:
+            self._enqueue(ticket)
+            self._grant()
+            while not ticket.granted:
+                self._publish()
+                self._cond.wait(deadlines.POLL_SECONDS)
+                if ticket.granted:
+                    break
+                if (deadline is not None and deadline.done) or (
+                    abandon is not None and abandon.is_set()
+                ):
+                    self._queues[priority].remove(ticket)
+                    self._publish()
+                    if deadline is not None:
+                        deadline.check()
+                    raise deadlines.RequestCancelled("Gave up waiting for a slot")
+            self._publish()
+        wait_ms = (time.monotonic() - ticket.enqueued_at) * 1000
+        metrics.observe(f"scheduler.{self.name}.{priority}.wait_ms", wait_ms)
+        return wait_ms
+
+    def release(self, lease: object = None) -> None:
+        with self._cond:
+            self.in_use -= 1
+            self._grant()
+            self._publish()
+
+
+class SharedResource:
+    """A pool of slots leased in ``scheduler_leases``, shared across processes."""
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        weights: dict[str, float],
+        aging_seconds: float,
+        sessions: Callable[[], Session],
+    ) -> None:
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.weights = {c: max(float(weights.get(c, 1)), 0.001) for c in CLASSES}
+        self.aging_seconds = aging_seconds
+        self._sessions = sessions
+        # Grants for one resource are serialized by a transaction advisory lock.
+        self._lock_key = int.from_bytes(
+            blake2b(f"scheduler.{name}".encode(), digest_size=8).digest(),
+            "big",
+            signed=True,
+        )
+
+    def _next(self, waiting: list[Any], held: list[Any], now: datetime) -> list[str]:
+        """Ids of the waiting rows that get the free slots, in grant order."""
+        counts = {c: 0 for c in CLASSES}
+        for row in held:
+            counts[row.priority] = counts.get(row.priority, 0) + 1
+        queues = {c: deque(r for r in waiting if r.priority == c) for c in CLASSES}
+        granted = []
+        for _ in range(self.capacity - len(held)):
+            ready = [c for c in CLASSES if queues[c]]
+            if not ready:
+                break
+            oldest = min(ready, key=lambda c: queues[c][0].enqueued_at)
+            waited = (now - queues[oldest][0].enqueued_at).total_seconds()
+            if waited >= self.aging_seconds:
+                cls = oldest
+            else:
+                cls = min(
+                    ready,
+                    key=lambda c: (counts[c] / self.weights[c], CLASSES.index(c)),
+                )
+            granted.append(queues[cls].popleft().id)
+            counts[cls] += 1
+        return granted
+
+    def _poll(
+        self, db: Session, lease: str, priority: str, enqueued_at: datetime
+    ) -> bool:
+        """Queue or refresh ``lease``; True once it holds a slot."""
+        now = datetime.utcnow()
+        db.execute(select(func.pg_advisory_xact_lock(self._lock_key)))
+        db.execute(
+            delete(SchedulerLease).where(
+                SchedulerLease.resource == self.name, SchedulerLease.expires_at < now
+            )
+        )
+        waiter_expiry = now + timedelta(seconds=_WAITER_TTL_SECONDS)
+        refreshed = db.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.id == lease)
+            .values(expires_at=waiter_expiry)
+        )
+        if not refreshed.rowcount:
+            db.add(
+                SchedulerLease(
+                    id=lease,
+                    resource=self.name,
+                    priority=priority,
+                    enqueued_at=enqueued_at,
+                    expires_at=waiter_expiry,
+                )
+            )
+            db.flush()
+        rows = db.execute(
+            select(
+                SchedulerLease.id,
+                SchedulerLease.priority,
+                SchedulerLease.enqueued_at,
+                SchedulerLease.granted_at,
+            )
+            .where(SchedulerLease.resource == self.name)
+            .order_by(SchedulerLease.enqueued_at, SchedulerLease.id)
+        ).all()
+        held = [r for r in rows if r.granted_at is not None]
+        waiting = [r for r in rows if r.granted_at is None]
+        granted = lease in self._next(waiting, held, now)
+        if granted:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.id == lease)
+                .values(
+                    granted_at=now,
+                    expires_at=now
+                    + timedelta(seconds=settings.scheduler_lease_seconds),
+                )
+            )
+        db.commit()
+        metrics.set_gauge(f"scheduler.{self.name}.in_use", len(held) + granted)
+        for cls in CLASSES:
+            queued = sum(r.priority == cls for r in waiting)
+            metrics.set_gauge(f"scheduler.{self.name}.{cls}.queued", queued)
+        return granted
+
+    def acquire(self, priority: str, abandon: threading.Event | None = None) -> str:
+        """Block until a slot is leased; returns the lease for :meth:`release`.
+
+        Gives up with the current request deadline, or when ``abandon`` is set.
+        """
+        deadline = deadlines.current()
+        lease = uuid.uuid4().hex
+        enqueued_at = datetime.utcnow()
+        t0 = time.monotonic()
+        with self._sessions() as db:
+            try:
+                while not self._poll(db, lease, priority, enqueued_at):
+                    if (deadline is not None and deadline.done) or (
+                        abandon is not None and abandon.is_set()
+                    ):
+                        if deadline is not None:
+                            deadline.check()
+                        raise deadlines.RequestCancelled("Gave up waiting for a slot")
+                    time.sleep(SHARED_POLL_SECONDS)
+            except BaseException:
+                db.rollback()
+                db.execute(delete(SchedulerLease).where(SchedulerLease.id == lease))
+                db.commit()
+                raise
+        wait_ms = (time.monotonic() - t0) * 1000
+        metrics.observe(f"scheduler.{self.name}.{priority}.wait_ms", wait_ms)
+        return lease
+
+    def release(self, lease: object = None) -> None:
+        with self._sessions() as db:
+            db.execute(delete(SchedulerLease).where(SchedulerLease.id == lease))
+            db.commit()
+
+
+_resources: dict[str, Resource] = {}
+_shared: dict[str, SharedResource] = {}
+_shared_sessions: Callable[[], Session] | None = None
+_resources_lock = threading.Lock()
+
+
+def _capacity(name: str) -> int:
+    if name == "ocr":
+        return (
+            settings.scheduler_ocr_slots
+            or settings.extraction_pool_workers
+            or os.cpu_count()
+            or 1
+        )
+    return settings.scheduler_llm_slots
+
+
+def _shared_capacity(name: str) -> int:
+    if name == "ocr":
+        return settings.scheduler_shared_ocr_slots or os.cpu_count() or 1
+    return settings.scheduler_shared_llm_slots
+
+
+def share(sessions: Callable[[], Session] | None) -> None:
+    """Lease slots through ``sessions`` from now on; ``None`` goes back to
+    per-process slots. Only used while ``scheduler_shared`` is on."""
+    global _shared_sessions
+    with _resources_lock:
+        _shared_sessions = sessions
+        _shared.clear()
+
+
+def resource(name: str) -> Resource | SharedResource:
+    with _resources_lock:
+        if _shared_sessions is not None and settings.scheduler_shared:
+            if name not in _shared:
+                _shared[name] = SharedResource(
+                    name,
+                    _shared_capacity(name),
+                    settings.scheduler_weights,
+                    settings.scheduler_aging_seconds,
+                    _shared_sessions,
+                )
+            return _shared[name]
+        if name not in _resources:
+            _resources[name] = Resource(
+                name,
+                _capacity(name),
+                settings.scheduler_weights,
+                settings.scheduler_aging_seconds,
+            )
+        return _resources[name]
+
+
+def configure(name: str, capacity: int) -> Resource:
+    """Replace resource ``name`` with one of ``capacity`` slots (not while in use)."""
+    with _resources_lock:
+        _resources[name] = Resource(
+            name,
+            capacity,
+            settings.scheduler_weights,
+            settings.scheduler_aging_seconds,
+        )
+        return _resources[name]
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def use_priority(priority: str) -> Iterator[str]:
+    token = _priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def slot(name: str) -> Iterator[None]:
+    """Hold a slot of resource ``name`` for the current priority class."""
+    if not settings.scheduler_enabled:
+        yield
+        return
+    res = resource(name)
+    lease = res.acquire(current_priority())
+    try:
+        yield
+    finally:
+        res.release(lease)
+
+
+async def _release(res: Resource | SharedResource, lease: object) -> None:
+    if isinstance(res, SharedResource):
+        # A database round trip; keep it off the event loop.
+        await asyncio.to_thread(res.release, lease)
+    else:
+        res.release(lease)
+
+
+@asynccontextmanager
+async def slot_async(name: str) -> AsyncIterator[None]:
+    """``slot`` for coroutines: the blocking wait runs in a thread."""
+    if not settings.scheduler_enabled:
+        yield
+        return
+    res = resource(name)
+    abandon = threading.Event()
+    # ``to_thread`` copies the context, so the request deadline is seen there.
+    waiting = asyncio.ensure_future(
+        asyncio.to_thread(res.acquire, current_priority(), abandon)
+    )
+    try:
+        lease = await asyncio.shield(waiting)
+    except asyncio.CancelledError:
+        # The thread may still be granted the slot; hand it straight back.
+        abandon.set()
+        try:
+            lease = await waiting
+        except deadlines.RequestCancelled:
+            pass
+        else:
+            await _release(res, lease)
+        raise
+    try:
+        yield
+    finally:
+        await _release(res, lease)
+
+
+async def request_priority(
+    x_priority: str | None = Header(default=None),
+) -> str:
+    """Dependency: the ``X-Priority`` class of the request (default interactive)."""
+    if x_priority is None:
+        return INTERACTIVE
+    priority = x_priority.strip().lower()
+    if priority not in CLASSES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"X-Priority must be one of: {', '.join(CLASSES)}",
+        )
+    return priority
+
+
+def prioritized(priority: str, fn: Callable[..., T]) -> Callable[..., T]:
+    """``fn`` run under ``priority``, with its latency recorded for the class."""
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> T:
+        t0 = time.perf_counter()
+        with use_priority(priority):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.observe(
+                    f"scheduler.{priority}.latency_ms",
+                    (time.perf_counter() - t0) * 1000,
+                )
+
+    return run
@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    SmallInteger,
+    String,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class DocumentSignature(Base):
+    """MinHash signature of a document's extracted text.
+
+    ``minhash`` packs the signature as unsigned 32-bit values; ``page_digests``
+    holds ``[digest, sketch]`` per raw-text segment (a bare digest in older
+    rows), to tell which pages differ from a near duplicate and how much.
+    """
+
+    __tablename__ = "document_signatures"
+
+    document_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
+    )
+    minhash: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    page_digests: Mapped[list] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=datetime.utcnow, nullable=False
+    )
+
+
+class DocumentLSHBand(Base):
+    """One LSH bucket of a signature: documents sharing a bucket are candidates."""
+
+    __tablename__ = "document_lsh_bands"
+    __table_args__ = (Index("ix_document_lsh_bands_document_id", "document_id"),)
+
+    band: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    bucket: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    document_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
+    )
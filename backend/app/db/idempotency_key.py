@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """A client's ``Idempotency-Key`` for one request target, and its response.
+
+    ``scope`` is the method and path (``POST /documents/{id}/extract``);
+    ``fingerprint`` identifies the rest of the request, so a key reused for a
+    different request is refused. While the first request runs the row is
+    ``in_progress`` and held until ``locked_until``; afterwards it is
+    ``completed`` and holds the response until ``expires_at``.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    scope: Mapped[str] = mapped_column(String(255), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    response_status: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_headers: Mapped[dict | None] = mapped_column(
+        JSONB(none_as_null=True), nullable=True
+    )
+    response_body: Mapped[dict | None] = mapped_column(
+        JSONB(none_as_null=True), nullable=True
+    )
+    locked_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), nullable=False, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=datetime.utcnow, nullable=False
+    )
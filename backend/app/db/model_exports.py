@@ -1,4 +1,16 @@
 from app.db.document import Document
+from app.db.document_signature import DocumentLSHBand, DocumentSignature
+from app.db.idempotency_key import IdempotencyKey
+from app.db.record_version import StructuredRecordVersion
+from app.db.scheduler_lease import SchedulerLease
 from app.db.structured_record import StructuredRecord
 
-__all__ = ["Document", "StructuredRecord"]
+__all__ = [
+    "Document",
+    "DocumentLSHBand",
+    "DocumentSignature",
+    "IdempotencyKey",
+    "SchedulerLease",
+    "StructuredRecord",
+    "StructuredRecordVersion",
+]
@@ -0,0 +1,36 @@
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class StructuredRecordVersion(Base):
+    """One entry of a record's history.
+
+    ``patch`` is an RFC 6902 patch from the previous version. Every
+    ``record_snapshot_interval``-th version (and the first) stores the full
+    record in ``snapshot`` instead, which bounds reconstruction cost.
+    """
+
+    __tablename__ = "structured_record_versions"
+    __table_args__ = (
+        UniqueConstraint("document_id", "version", name="uq_record_versions_doc"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    document_id: Mapped[str] = mapped_column(
+        String(32),
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    patch: Mapped[list | None] = mapped_column(JSONB(none_as_null=True), nullable=True)
+    snapshot: Mapped[dict | None] = mapped_column(
+        JSONB(none_as_null=True), nullable=True
+    )
+    source: Mapped[str] = mapped_column(String(32), nullable=False)
+    prompt_version: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=datetime.utcnow, nullable=False
+    )
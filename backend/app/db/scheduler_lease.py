@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class SchedulerLease(Base):
+    """A claim on a slot of a shared scheduler resource (``ocr``, ``llm``).
+
+    Every process on the database (API workers, the backfill CLI) queues here.
+    A waiting row has no ``granted_at``; a granted one holds a slot until it is
+    deleted. ``expires_at`` lets rows of a process that died lapse: waiters
+    push it forward on every poll, holders get ``scheduler_lease_seconds``.
+    """
+
+    __tablename__ = "scheduler_leases"
+    __table_args__ = (Index("ix_scheduler_leases_resource", "resource"),)
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    resource: Mapped[str] = mapped_column(String(16), nullable=False)
+    priority: Mapped[str] = mapped_column(String(16), nullable=False)
+    enqueued_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), nullable=False
+    )
+    granted_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=False), nullable=True
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), nullable=False
+    )
@@ -1,16 +1,24 @@
 import logging
 from collections.abc import Iterator
 
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
 
 
+def _json_serializer(value: object) -> str:
+    # JSONB bind values; orjson also handles datetime without a pre-pass.
+    return orjson.dumps(value).decode()
+
+
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     future=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 SessionLocal = sessionmaker(
@@ -0,0 +1,59 @@
+"""Schema initialisation at application startup.
+
+``db_init_mode`` selects what happens on boot:
+
+- ``create_all``: create missing tables from the models (development/tests).
+- ``verify``: check that the database is at the Alembic head revision and
+  fail startup otherwise; migrations are applied out of band.
+- ``skip``: do nothing.
+"""
+
+import logging
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+
+from app.db.base import Base
+
+logger = logging.getLogger("app.db")
+
+DB_INIT_MODES = ("create_all", "verify", "skip")
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database is not at the Alembic head revision."""
+
+
+def alembic_heads() -> set[str]:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def verify_alembic_head(engine: Engine) -> set[str]:
+    """Compare the database's ``alembic_version`` against the script heads."""
+    from alembic.runtime.migration import MigrationContext
+
+    expected = alembic_heads()
+    with engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    if current != expected:
+        raise SchemaVersionError(
+            f"database at {sorted(current) or 'no revision'}, "
+            f"expected {sorted(expected)}; run 'alembic upgrade head'"
+        )
+    return current
+
+
+def init_database(engine: Engine, mode: str) -> None:
+    if mode == "create_all":
+        Base.metadata.create_all(bind=engine)
+    elif mode == "verify":
+        revisions = verify_alembic_head(engine)
+        logger.info("db.verified revision=%s", ",".join(sorted(revisions)))
+    elif mode != "skip":
+        raise ValueError(f"db_init_mode must be one of {DB_INIT_MODES}: {mode}")
@@ -2,34 +2,92 @@ from contextlib import asynccontextmanager
 import logging
 import importlib
 import pkgutil
+import time
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from app.core import deadline as deadlines
+from app.core import scheduler
 from app.core.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.metrics import metrics
+from app.db.session import SessionLocal, engine
+from app.db.startup import SchemaVersionError, init_database
 import app.api as api_package
 
+# Startup phase durations (ms), logged and published as ``startup.*`` gauges.
+startup_timings: dict[str, float] = {}
+
+
+def _record_phase(name: str, t0: float) -> None:
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    startup_timings[name] = elapsed_ms
+    metrics.set_gauge(f"startup.{name}_ms", elapsed_ms)
+
+
+def init_resources() -> None:
+    """Initialise the schema per ``db_init_mode`` and, if configured, warm extractors.
+
+    Under gunicorn with ``preload_app`` this runs once in the master before
+    workers fork, so warmed extractors are shared copy-on-write.
+    """
+    logger = logging.getLogger("app")
+    t0 = time.perf_counter()
+    try:
+        init_database(engine, settings.db_init_mode)
+    except SchemaVersionError:
+        raise
+    except Exception as exc:
+        logger.exception("db.init.error msg=%s", str(exc))
+    _record_phase("db_init", t0)
+    if settings.preload_extractors:
+        from app.services.extraction.factory import registry
+
+        t0 = time.perf_counter()
+        registry.warm_all()
+        _record_phase("extractors", t0)
+        logger.info("extractors.preloaded stats=%s", registry.stats())
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger = logging.getLogger("app")
     logger.info("startup env=%s", settings.environment)
-    try:
-        Base.metadata.create_all(bind=engine)
-    except Exception as exc:
-        logging.getLogger("app").exception("db.init.error msg=%s", str(exc))
+    if not getattr(app.state, "resources_ready", False):
+        init_resources()
+    logger.info(
+        "startup.timing %s",
+        " ".join(f"{name}_ms={ms:.1f}" for name, ms in startup_timings.items()),
+    )
+    if settings.scheduler_shared:
+        # OCR and LLM slots are leased in Postgres, shared with other workers.
+        scheduler.share(SessionLocal)
     yield
+    scheduler.share(None)
+    from app.services import llm_service
+    from app.services.extraction import pool as extraction_pool
+
+    await llm_service.close_clients()
+    extraction_pool.shutdown()
     logger.info("shutdown")
 
 
+async def request_cancelled_handler(
+    request: Request, exc: deadlines.RequestCancelled
+) -> ORJSONResponse:
+    """504 when the deadline passed; 499 (never seen) when the client left."""
+    deadlines.count_cancelled(exc, request.url.path)
+    return ORJSONResponse({"detail": str(exc)}, status_code=exc.status_code)
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.app_name,
         description="Veterinary insight document processing engine",
         version="0.1.0",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # basic logging config
@@ -46,6 +104,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    app.add_exception_handler(deadlines.RequestCancelled, request_cancelled_handler)
+
+    t0 = time.perf_counter()
     for finder, name, ispkg in pkgutil.iter_modules(api_package.__path__):
         module = importlib.import_module(f"{api_package.__name__}.{name}")
         router = getattr(module, "router", None)
@@ -56,6 +117,7 @@ def create_app() -> FastAPI:
             app.include_router(router, prefix=prefix)
         else:
             app.include_router(router)
+    _record_phase("routers", t0)
 
     return app
 
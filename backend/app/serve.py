@@ -0,0 +1,52 @@
+"""Server entry point: ``python -m app.serve``.
+
+``SERVER_MODE=development`` runs a single uvicorn process. ``production``
+runs gunicorn with uvicorn workers and ``preload_app`` (see
+``gunicorn.conf.py``): the app, schemas and extractors are imported once in
+the master and shared copy-on-write by the forked workers.
+"""
+
+import logging
+import os
+import sys
+from pathlib import Path
+
+from app.core.config import settings
+
+GUNICORN_CONF = Path(__file__).resolve().parent.parent / "gunicorn.conf.py"
+
+
+def worker_count() -> int:
+    """``web_concurrency``, or one worker per CPU when it is 0."""
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    return os.cpu_count() or 1
+
+
+def main() -> None:
+    logger = logging.getLogger("app.serve")
+    if settings.server_mode == "production":
+        logger.info("serve.start mode=production workers=%s", worker_count())
+        argv = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            str(GUNICORN_CONF),
+            "app.main:app",
+        ]
+        os.execv(sys.executable, argv)
+    elif settings.server_mode == "development":
+        import uvicorn
+
+        uvicorn.run(
+            "app.main:app",
+            host=settings.server_host,
+            port=settings.server_port,
+        )
+    else:
+        raise SystemExit(f"Unknown SERVER_MODE: {settings.server_mode}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Table-driven content sniffing on the first bytes of an upload.
+
+Uploads are classified from their own bytes rather than the client's
+``Content-Type``. ZIP containers are resolved from the local file headers
+in the first chunk. When that is not enough, a bounded read of the
+central directory (found through the Zip64 locator for large archives)
+decides once the file is on disk, with the local headers as a last resort.
+"""
+
+from __future__ import annotations
+
+import codecs
+import mimetypes
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.services.extraction.factory import DOCX_MIME, registry
+
+ZIP_MIME = "application/zip"
+TEXT_MIME = "text/plain"
+OCTET_STREAM = "application/octet-stream"
+
+# End-of-central-directory record (22 bytes) plus the maximum comment size.
+_EOCD_SEARCH = 22 + 0xFFFF
+# Zip64 end-of-central-directory locator, which sits right before the EOCD.
+_ZIP64_LOCATOR = 20
+_ZIP64_EOCD = 56
+_CENTRAL_DIRECTORY_BUDGET = 256 * 1024
+_TEXT_SAMPLE = 8192
+
+
+@dataclass(frozen=True)
+class Signature:
+    mime: str
+    magic: bytes
+    offset: int = 0
+
+    def matches(self, head: bytes) -> bool:
+        return head[self.offset : self.offset + len(self.magic)] == self.magic
+
+
+SIGNATURES: tuple[Signature, ...] = (
+    Signature("application/pdf", b"%PDF-"),
+    Signature("image/png", b"\x89PNG\r\n\x1a\n"),
+    Signature("image/jpeg", b"\xff\xd8\xff"),
+    Signature("image/tiff", b"II*\x00"),
+    Signature("image/tiff", b"MM\x00*"),
+    # OLE2 compound file: Word 97-2003 (also .xls/.ppt, which have no extractor).
+    Signature("application/msword", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),
+    Signature("image/heic", b"ftypheic", offset=4),
+    Signature("image/heic", b"ftypheix", offset=4),
+    Signature("image/heic", b"ftyphevc", offset=4),
+    Signature("image/heif", b"ftypmif1", offset=4),
+    Signature("image/heif", b"ftypmsf1", offset=4),
+    Signature(ZIP_MIME, b"PK\x03\x04"),
+)
+
+# First path component of ZIP member names -> OOXML flavour.
+_OOXML_ROOTS = {
+    "word": DOCX_MIME,
+    "xl": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+_EXT_MAP: dict[str, str] = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".heic": "image/heic",
+    ".heif": "image/heif",
+    ".docx": DOCX_MIME,
+    ".doc": "application/msword",
+    ".txt": TEXT_MIME,
+}
+
+
+def _ooxml_from_names(names: Iterable[str]) -> str | None:
+    for name in names:
+        root = name.split("/", 1)[0]
+        if root in _OOXML_ROOTS:
+            return _OOXML_ROOTS[root]
+    return None
+
+
+def _local_header_names(head: bytes) -> Iterator[str]:
+    """Member names from the ZIP local file headers contained in ``head``."""
+    pos = 0
+    while head[pos : pos + 4] == b"PK\x03\x04" and pos + 30 <= len(head):
+        flags, _, _, _, _, compressed, _, name_len, extra_len = struct.unpack(
+            "<HHHHIIIHH", head[pos + 6 : pos + 30]
+        )
+        name = head[pos + 30 : pos + 30 + name_len]
+        yield name.decode("utf-8", errors="replace")
+        if flags & 0x08:
+            # Sizes live in a trailing data descriptor; cannot skip ahead.
+            return
+        pos += 30 + name_len + extra_len + compressed
+
+
+def looks_like_text(head: bytes) -> bool:
+    sample = head[:_TEXT_SAMPLE]
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return True
+    if b"\x00" in sample:
+        return False
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        pass
+    # Single-byte legacy encodings: mostly printable, few control bytes.
+    control = sum(1 for b in sample if b < 32 and b not in (9, 10, 12, 13))
+    return control <= len(sample) // 100
+
+
+def sniff_bytes(head: bytes) -> str | None:
+    """Classify content from its first bytes; ``None`` when nothing matches.
+
+    Returns ``application/zip`` for ZIP containers whose OOXML flavour is
+    not visible in ``head``; resolve those with :func:`probe_zip`.
+    """
+    for signature in SIGNATURES:
+        if signature.matches(head):
+            if signature.mime == ZIP_MIME:
+                return _ooxml_from_names(_local_header_names(head)) or ZIP_MIME
+            return signature.mime
+    plugin_mime = registry.match_magic(head)
+    if plugin_mime:
+        return plugin_mime
+    if head and looks_like_text(head):
+        return TEXT_MIME
+    return None
+
+
+def probe_zip(path: Path, budget: int = _CENTRAL_DIRECTORY_BUDGET) -> str:
+    """Resolve a ZIP container from its central directory with bounded reads.
+
+    Reads at most the EOCD search window plus ``budget`` bytes of the central
+    directory, however many members the archive has.
+    """
+    try:
+        with path.open("rb") as fh:
+            mime = _ooxml_from_central_directory(fh, budget)
+            if mime is None:
+                fh.seek(0)
+                mime = _ooxml_from_names(_local_header_names(fh.read(budget)))
+    except (OSError, struct.error):
+        return ZIP_MIME
+    return mime or ZIP_MIME
+
+
+def _ooxml_from_central_directory(fh, budget: int) -> str | None:
+    fh.seek(0, 2)
+    size = fh.tell()
+    tail_len = min(size, _EOCD_SEARCH)
+    fh.seek(size - tail_len)
+    tail = fh.read(tail_len)
+    eocd = tail.rfind(b"PK\x05\x06")
+    if eocd < 0 or eocd + 22 > len(tail):
+        return None
+    cd_size, cd_offset = struct.unpack("<II", tail[eocd + 12 : eocd + 20])
+    if 0xFFFFFFFF in (cd_size, cd_offset):
+        located = _zip64_central_directory(fh, tail[:eocd])
+        if located is None:
+            return None
+        cd_size, cd_offset = located
+    fh.seek(cd_offset)
+    directory = fh.read(min(cd_size, budget))
+    return _ooxml_from_names(_central_directory_names(directory))
+
+
+def _zip64_central_directory(fh, before_eocd: bytes) -> tuple[int, int] | None:
+    """``(size, offset)`` of the central directory from the Zip64 records."""
+    locator = before_eocd[-_ZIP64_LOCATOR:]
+    if len(locator) < _ZIP64_LOCATOR or locator[:4] != b"PK\x06\x07":
+        return None
+    (record_offset,) = struct.unpack("<Q", locator[8:16])
+    fh.seek(record_offset)
+    record = fh.read(_ZIP64_EOCD)
+    if len(record) < _ZIP64_EOCD or record[:4] != b"PK\x06\x06":
+        return None
+    return struct.unpack("<QQ", record[40:56])
+
+
+def _central_directory_names(directory: bytes) -> Iterator[str]:
+    pos = 0
+    while directory[pos : pos + 4] == b"PK\x01\x02" and pos + 46 <= len(directory):
+        name_len, extra_len, comment_len = struct.unpack(
+            "<HHH", directory[pos + 28 : pos + 34]
+        )
+        yield directory[pos + 46 : pos + 46 + name_len].decode(
+            "utf-8", errors="replace"
+        )
+        pos += 46 + name_len + extra_len + comment_len
+
+
+def guess_from_name(filename: str | None, declared: str | None) -> str:
+    """Fallback for content with nothing to sniff (e.g. empty files)."""
+    ext = Path(filename or "").suffix.lower()
+    if ext in _EXT_MAP:
+        return _EXT_MAP[ext]
+    if declared and declared != OCTET_STREAM:
+        return declared
+    guessed, _ = mimetypes.guess_type(filename or "")
+    return guessed or OCTET_STREAM
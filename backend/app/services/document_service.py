@@ -1,24 +1,55 @@
 from __future__ import annotations
 
 import json
+import re
 import uuid
 from datetime import datetime
 from pathlib import Path
-import mimetypes
-import zipfile
-from typing import Any
+from typing import Any, Collection, Iterable, Iterator, Mapping
 import logging
 
 from fastapi import HTTPException, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
 
+from app.core import deadline as deadlines
+from app.core import scheduler
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.db.model_exports import Document, StructuredRecord
-from app.services.extraction.factory import get_extractor
-from app.services.llm_service import extract_structured_record, LLMExtractionError
+from app.services import (
+    near_duplicates,
+    page_window,
+    record_history,
+    record_patch,
+    record_repair,
+)
+from app.services.content_sniffing import (
+    OCTET_STREAM,
+    ZIP_MIME,
+    guess_from_name,
+    probe_zip,
+    sniff_bytes,
+)
+from app.services.extraction import pool as extraction_pool
+from app.services.extraction.base import ExtractionFailed, Segment, join_segments
+from app.services.extraction.factory import registry
+from app.services.llm_service import (
+    PROMPT_VERSION,
+    extract_fields,
+    extract_structured_record,
+    update_structured_record,
+    LLMExtractionError,
+)
 
 logger = logging.getLogger("app.services.documents")
 
+_PAGE_MARKER = re.compile(rb"--- Page (\d+) ---$")
+
+FOREIGN_KEY_VIOLATION = "23503"
+
 
 def _ensure_upload_dir() -> Path:
     path = Path(settings.upload_dir)
@@ -26,10 +57,25 @@ def _ensure_upload_dir() -> Path:
     return path
 
 
+def ensure_extractable(content_type: str) -> None:
+    if content_type not in settings.allowed_mimetypes:
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported media type: {content_type}"
+        )
+    if not registry.supports(content_type):
+        raise HTTPException(
+            status_code=415, detail=f"No extractor available for {content_type}"
+        )
+
+
 async def save_upload_file(
     file: UploadFile, db: Session | None = None
 ) -> dict[str, Any]:
-    """Save uploaded file and return metadata."""
+    """Save uploaded file and return metadata.
+
+    The type is sniffed from the first chunk before anything is written, so
+    unsupported content is rejected without storing the rest of the upload.
+    """
     upload_dir = _ensure_upload_dir()
     doc_id = uuid.uuid4().hex
     filename = f"{doc_id}_{file.filename}"
@@ -39,6 +85,7 @@ async def save_upload_file(
         raise HTTPException(status_code=415, detail="Unsupported media type")
 
     max_bytes = settings.max_upload_size_mb * 1024 * 1024
+    content_type: str | None = None
     try:
         total = 0
         with file_path.open("wb") as f:
@@ -46,33 +93,49 @@ async def save_upload_file(
                 chunk = await file.read(1024 * 1024)
                 if not chunk:
                     break
+                if content_type is None:
+                    content_type = sniff_bytes(chunk) or OCTET_STREAM
+                    if content_type != ZIP_MIME:
+                        ensure_extractable(content_type)
                 total += len(chunk)
                 if total > max_bytes:
-                    f.close()
-                    try:
-                        file_path.unlink(missing_ok=True)
-                    except Exception:
-                        pass
                     raise HTTPException(status_code=413, detail="File too large")
                 f.write(chunk)
+        if content_type is None:
+            # Empty upload: nothing to sniff.
+            content_type = guess_from_name(file.filename, file.content_type)
+        elif content_type == ZIP_MIME:
+            content_type = probe_zip(file_path)
+        ensure_extractable(content_type)
     except HTTPException:
+        file_path.unlink(missing_ok=True)
         raise
     except Exception as exc:
+        file_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=str(exc))
 
-    content_type = _infer_content_type(file_path, file.filename, file.content_type)
+    return record_stored_upload(doc_id, file.filename, file_path, content_type, db=db)
+
 
+def record_stored_upload(
+    doc_id: str,
+    original_filename: str | None,
+    file_path: Path,
+    content_type: str,
+    db: Session | None = None,
+) -> dict[str, Any]:
+    """Write the metadata sidecar and ``Document`` row for a stored upload."""
     metadata = {
         "id": doc_id,
-        "original_filename": file.filename,
-        "stored_filename": filename,
+        "original_filename": original_filename,
+        "stored_filename": file_path.name,
         "content_type": content_type,
         "size": file_path.stat().st_size,
         "created_at": datetime.utcnow().isoformat() + "Z",
         "path": str(file_path),
     }
 
-    meta_path = upload_dir / f"{doc_id}.json"
+    meta_path = file_path.parent / f"{doc_id}.json"
     meta_path.write_text(json.dumps(metadata))
 
     # Persist metadata in DB when session provided
@@ -82,7 +145,7 @@ async def save_upload_file(
     logger.info(
         "upload.persisted id=%s filename=%s size=%s type=%s",
         doc_id,
-        file.filename,
+        original_filename,
         metadata["size"],
         content_type,
     )
@@ -90,53 +153,6 @@ async def save_upload_file(
     return metadata
 
 
-def _infer_content_type(
-    file_path: Path, original_filename: str, uploaded_type: str | None
-) -> str:
-    """Infer a stable MIME type."""
-    if uploaded_type and uploaded_type != "application/octet-stream":
-        if uploaded_type in settings.allowed_mimetypes:
-            return uploaded_type
-
-    ext = Path(original_filename or "").suffix.lower()
-    ext_map: dict[str, str] = {
-        ".pdf": "application/pdf",
-        ".png": "image/png",
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        ".doc": "application/msword",
-        ".txt": "text/plain",
-    }
-    if ext in ext_map:
-        return ext_map[ext]
-
-    guessed, _ = mimetypes.guess_type(original_filename or "")
-    if guessed and guessed in settings.allowed_mimetypes:
-        return guessed
-
-    try:
-        with file_path.open("rb") as f:
-            head = f.read(8)
-        if head.startswith(b"%PDF-"):
-            return "application/pdf"
-        if head.startswith(b"\x89PNG\r\n\x1a\n"):
-            return "image/png"
-        if head.startswith(b"\xff\xd8\xff"):
-            return "image/jpeg"
-        if head.startswith(b"PK\x03\x04"):
-            try:
-                with zipfile.ZipFile(file_path) as zf:
-                    if any(n.startswith("word/") for n in zf.namelist()):
-                        return "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            except zipfile.BadZipFile:
-                pass
-    except Exception:
-        pass
-
-    return "application/octet-stream"
-
-
 def _metadata_from_model(doc) -> dict[str, Any]:
     return {
         "id": doc.id,
@@ -171,43 +187,204 @@ def get_file_path_from_meta(doc_id: str, db: Session | None = None) -> Path:
     return path
 
 
+def _raw_text_path(doc_id: str) -> Path:
+    return Path(settings.upload_dir) / f"{doc_id}.txt"
+
+
+def _segments_path(doc_id: str) -> Path:
+    return Path(settings.upload_dir) / f"{doc_id}.segments.json"
+
+
+def _write_raw_text(doc_id: str, segments: Iterable[Segment]) -> dict[str, Any]:
+    """Write segments to the raw-text sidecar as they arrive, so later steps
+    skip OCR and the whole text is never held here.
+
+    Alongside goes an index of ``[page, start, end]`` byte ranges, one per
+    segment, for paginated reads. Returns that index.
+    """
+    path = _raw_text_path(doc_id)
+    tmp = path.with_suffix(".txt.tmp")
+    index: dict[str, Any] = {"segments": [], "chars": 0}
+    try:
+        with tmp.open("wb") as fh:
+            for segment in segments:
+                fh.write(segment.marker.encode("utf-8"))
+                start = fh.tell()
+                fh.write(segment.text.encode("utf-8"))
+                index["segments"].append([segment.page, start, fh.tell()])
+                index["chars"] += len(segment.text)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _segments_path(doc_id).write_text(json.dumps(index))
+    tmp.replace(path)
+    return index
+
+
+def _index_raw_text(doc_id: str) -> dict[str, Any]:
+    """Segment index of a sidecar written without one, from its page markers."""
+    index: dict[str, Any] = {"segments": [], "chars": 0}
+    page, start, offset = None, 0, 0
+    with _raw_text_path(doc_id).open("rb") as fh:
+        for line in fh:
+            marker = _PAGE_MARKER.match(line)
+            if marker:
+                # The blank line before a marker belongs to it.
+                end = offset - 1 if offset > start else offset
+                if page is not None or end > start:
+                    index["segments"].append([page, start, end])
+                page, start = int(marker.group(1)), offset + len(line)
+            offset += len(line)
+        if page is not None or offset > start:
+            index["segments"].append([page, start, offset])
+        for _, start, end in index["segments"]:
+            fh.seek(start)
+            index["chars"] += len(fh.read(end - start).decode("utf-8"))
+    _segments_path(doc_id).write_text(json.dumps(index))
+    return index
+
+
+def read_raw_text(doc_id: str, db: Session | None = None) -> str:
+    """Persisted raw text of a document, extracting it once if missing."""
+    path = _raw_text_path(doc_id)
+    if not path.exists():
+        extract_text_from_document(doc_id, db=db, include_text=False)
+    logger.debug("raw_text.read id=%s", doc_id)
+    return path.read_text(encoding="utf-8")
+
+
+def _load_index(doc_id: str) -> dict[str, Any]:
+    index_path = _segments_path(doc_id)
+    if index_path.exists():
+        return json.loads(index_path.read_text())
+    return _index_raw_text(doc_id)
+
+
+def _read_segments(
+    doc_id: str, index: dict[str, Any], start: int = 0, stop: int | None = None
+) -> Iterator[tuple[int | None, str]]:
+    """``(page, text)`` of the sidecar's segments ``start:stop``."""
+    positions = range(len(index["segments"]))[start:stop]
+    return _read_segments_at(doc_id, index, positions)
+
+
+def _prompt_text(doc_id: str, index: dict[str, Any]) -> str:
+    """The sidecar's text, up to ``llm_max_input_chars``, for the LLM prompt.
+
+    Segments are read by byte range in order, so a long document costs at
+    most the budget here rather than its whole text.
+    """
+    budget = settings.llm_max_input_chars
+    parts: list[str] = []
+    used = 0
+    for page, text in _read_segments(doc_id, index):
+        rendered = Segment(text, page).render()
+        if used + len(rendered) > budget:
+            parts.append(rendered[: budget - used])
+            metrics.incr("llm.input.truncated")
+            logger.info(
+                "llm.input.truncated id=%s chars=%s budget=%s",
+                doc_id,
+                index["chars"],
+                budget,
+            )
+            break
+        parts.append(rendered)
+        used += len(rendered)
+    return "".join(parts)
+
+
+def _read_segments_at(
+    doc_id: str, index: dict[str, Any], positions: Iterable[int]
+) -> Iterator[tuple[int | None, str]]:
+    """``(page, text)`` of the sidecar's segments at ``positions``."""
+    with _raw_text_path(doc_id).open("rb") as fh:
+        for i in positions:
+            page, begin, end = index["segments"][i]
+            fh.seek(begin)
+            yield page, fh.read(end - begin).decode("utf-8")
+
+
+def read_raw_text_segments(
+    doc_id: str, offset: int = 0, limit: int = 20, db: Session | None = None
+) -> dict[str, Any]:
+    """A page of the persisted raw text, read from the sidecar by byte range."""
+    read_metadata(doc_id, db=db)
+    path = _raw_text_path(doc_id)
+    if not path.exists():
+        raise HTTPException(
+            status_code=404, detail="Text not extracted yet; run extraction first"
+        )
+    index = _load_index(doc_id)
+    total = len(index["segments"])
+    segments = [
+        {"page": page, "text": text}
+        for page, text in _read_segments(doc_id, index, offset, offset + limit)
+    ]
+    return {
+        "id": doc_id,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "chars": index["chars"],
+        "segments": segments,
+        "next_offset": offset + limit if offset + limit < total else None,
+    }
+
+
 def extract_text_from_document(
-    doc_id: str, db: Session | None = None
+    doc_id: str, db: Session | None = None, include_text: bool = True
 ) -> dict[str, Any]:
-    """Extract raw text using appropriate extractor."""
+    """Extract raw text using appropriate extractor.
+
+    The text is streamed into the sidecar segment by segment; with
+    ``include_text=False`` it is not read back, and only its size is returned.
+    """
     meta = read_metadata(doc_id, db=db)
     file_path = get_file_path_from_meta(doc_id, db=db)
     content_type = meta.get("content_type")
 
     try:
         logger.info("extract.text.start id=%s type=%s", doc_id, content_type)
-        extractor = get_extractor(content_type)
-        result = extractor.extract(str(file_path))
+        extraction_meta: dict[str, Any] = {}
+        with scheduler.slot("ocr"):
+            index = _write_raw_text(
+                doc_id,
+                extraction_pool.iter_segments(
+                    content_type, str(file_path), extraction_meta
+                ),
+            )
         logger.info(
-            "extract.text.success id=%s chars=%s", doc_id, len(result.text or "")
+            "extract.text.success id=%s chars=%s segments=%s",
+            doc_id,
+            index["chars"],
+            len(index["segments"]),
         )
-        return {
-            "text": result.text,
-            "extraction_meta": result.meta,
+        result = {
+            "extraction_meta": extraction_meta,
+            "chars": index["chars"],
+            "segments": len(index["segments"]),
         }
+        if include_text:
+            result["text"] = _raw_text_path(doc_id).read_text(encoding="utf-8")
+        return result
+    except deadlines.RequestCancelled:
+        logger.info("extract.text.cancelled id=%s", doc_id)
+        raise
+    except ExtractionFailed as e:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": f"Extraction failed: {str(e)}",
+                "extraction_meta": e.meta,
+            },
+        )
     except ValueError as e:
         raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
 
 
-def _to_jsonable(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        return {k: _to_jsonable(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_to_jsonable(v) for v in obj]
-    if isinstance(obj, tuple):
-        return tuple(_to_jsonable(v) for v in obj)
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    return obj
-
-
 def extract_structured_record_from_text(
     raw_text: str,
     db: Session | None = None,
@@ -217,11 +394,20 @@ def extract_structured_record_from_text(
     try:
         logger.info("extract.record.start doc_id=%s", doc_id)
         record = extract_structured_record(raw_text)
-        result = {"record": _to_jsonable(record.model_dump())}
+        result = {"record": record.model_dump(mode="json")}
         if db is not None and doc_id:
-            upsert_structured_record(db, doc_id, result["record"])
+            # Nobody is waiting for this record any more; do not write it.
+            deadlines.check()
+            upsert_structured_record(
+                db, doc_id, result["record"], prompt_version=PROMPT_VERSION
+            )
         logger.info("extract.record.success doc_id=%s", doc_id)
         return result
+    except deadlines.RequestCancelled:
+        if db is not None:
+            db.rollback()
+        logger.info("extract.record.cancelled doc_id=%s", doc_id)
+        raise
     except LLMExtractionError as e:
         raise HTTPException(
             status_code=422,
@@ -231,25 +417,178 @@ def extract_structured_record_from_text(
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
-def process_document_full_pipeline(
-    doc_id: str, db: Session | None = None
+def _changed_segments(
+    doc_id: str, index: dict[str, Any], prior_id: str, edits: dict[int, int | None]
+) -> list[Segment]:
+    """``doc_id``'s changed pages for the LLM: a new page whole, an edited one
+    (see ``near_duplicates.page_matches``) as its lines not in ``prior_id``'s page."""
+    prior_pages: dict[int, str] = {}
+    if _raw_text_path(prior_id).exists():
+        prior_index = _load_index(prior_id)
+        similar = sorted(
+            {j for j in edits.values() if j is not None}
+            & set(range(len(prior_index["segments"])))
+        )
+        read = _read_segments_at(prior_id, prior_index, similar)
+        prior_pages = dict(zip(similar, (text for _, text in read)))
+    positions = sorted(edits)
+    segments = []
+    for i, (page, text) in zip(positions, _read_segments_at(doc_id, index, positions)):
+        j = edits[i]
+        if j is not None and j in prior_pages:
+            text = near_duplicates.new_lines(text, prior_pages[j])
+        if text.strip():
+            segments.append(Segment(text, page))
+    return segments
+
+
+def _reuse_near_duplicate(
+    db: Session, doc_id: str, reuse: bool
+) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+    """Index ``doc_id``'s text and reuse the record of its closest near duplicate.
+
+    Returns the structured result, or None when the record still has to be
+    extracted in full, and what is known about the near duplicate.
+    """
+    index = _load_index(doc_id)
+    fp = near_duplicates.fingerprint(text for _, text in _read_segments(doc_id, index))
+    if fp is None:
+        return None, None
+    near_duplicates.store(db, doc_id, fp)
+    matches = near_duplicates.find(db, doc_id, fp, with_record=True)
+    if not matches:
+        return None, None
+    match = matches[0]
+    metrics.incr("near_duplicate.found")
+    edits = near_duplicates.page_matches(fp, match)
+    changed = sorted(edits)
+    info: dict[str, Any] = {
+        "id": match.document_id,
+        "similarity": round(match.similarity, 3),
+        "changed_pages": [i + 1 for i in changed],
+        "reused": None,
+    }
+    # Sizes from the index's byte ranges; the text is not read again for them.
+    sizes = [end - begin for _, begin, end in index["segments"]]
+    prior = db.execute(
+        select(StructuredRecord.record_json, StructuredRecord.prompt_version).where(
+            StructuredRecord.document_id == match.document_id
+        )
+    ).first()
+    segments: list[Segment] = []
+    if reuse and prior is not None and changed:
+        segments = _changed_segments(doc_id, index, match.document_id, edits)
+    changed_size = sum(len(segment.text.encode("utf-8")) for segment in segments)
+    if (
+        not reuse
+        or prior is None
+        or changed_size > sum(sizes) * settings.near_duplicate_max_changed_ratio
+    ):
+        logger.info(
+            "near_duplicate.offered id=%s of=%s similarity=%.3f changed=%s/%s",
+            doc_id,
+            match.document_id,
+            match.similarity,
+            len(changed),
+            len(sizes),
+        )
+        return None, info
+    if segments:
+        text = join_segments(segments)
+        record = update_structured_record(prior.record_json, text).model_dump(
+            mode="json"
+        )
+        info["reused"] = "changed_pages"
+    else:
+        record = prior.record_json
+        info["reused"] = "record"
+    deadlines.check()
+    # Most of the record still comes from the prior extraction, so it keeps
+    # that prompt version for ``--stale`` backfills.
+    upsert_structured_record(db, doc_id, record, prompt_version=prior.prompt_version)
+    metrics.incr(f"near_duplicate.reused.{info['reused']}")
+    logger.info(
+        "near_duplicate.reused id=%s of=%s similarity=%.3f changed=%s/%s",
+        doc_id,
+        match.document_id,
+        match.similarity,
+        len(changed),
+        len(sizes),
+    )
+    return {"record": record}, info
+
+
+def find_near_duplicates(
+    db: Session, doc_id: str, threshold: float | None = None
 ) -> dict[str, Any]:
-    """Run full pipeline: extract text then structure with LLM."""
-    extraction_result = extract_text_from_document(doc_id, db=db)
-    raw_text = extraction_result["text"]
+    """Documents whose text is nearly the same as ``doc_id``'s, best first."""
+    read_metadata(doc_id, db=db)
+    fp = near_duplicates.load(db, doc_id)
+    if fp is None:
+        raise HTTPException(
+            status_code=404, detail="Text not extracted yet; run extraction first"
+        )
+    matches = near_duplicates.find(db, doc_id, fp, threshold)
+    with_record = set(
+        db.scalars(
+            select(StructuredRecord.document_id).where(
+                StructuredRecord.document_id.in_([m.document_id for m in matches])
+            )
+        )
+    )
+    return {
+        "id": doc_id,
+        "matches": [
+            {
+                "id": m.document_id,
+                "similarity": round(m.similarity, 3),
+                "changed_pages": [i + 1 for i in near_duplicates.changed_pages(fp, m)],
+                "has_record": m.document_id in with_record,
+            }
+            for m in matches
+        ],
+    }
+
 
-    if not raw_text or not raw_text.strip():
+def process_document_full_pipeline(
+    doc_id: str,
+    db: Session | None = None,
+    include_raw_text: bool = False,
+    reuse_near_duplicate: bool = True,
+) -> dict[str, Any]:
+    """Run full pipeline: extract text then structure with LLM.
+
+    The LLM gets the text read from the sidecar, up to its input budget (see
+    ``_prompt_text``). The response leaves out ``raw_text`` unless
+    ``include_raw_text``; clients page through it with
+    ``read_raw_text_segments`` instead. When the
+    text is a near duplicate of a document that already has a record, that
+    record is reused, with only the changed pages sent to the LLM
+    (``reuse_near_duplicate=False`` extracts in full and only reports it).
+    """
+    extraction_result = extract_text_from_document(doc_id, db=db, include_text=False)
+    prompt_text = ""
+    if extraction_result.get("chars"):
+        prompt_text = _prompt_text(doc_id, _load_index(doc_id))
+
+    if not prompt_text.strip():
         raise HTTPException(
             status_code=422,
             detail="No text could be extracted from document",
         )
 
     try:
-        structured_result = extract_structured_record_from_text(
-            raw_text, db=db, doc_id=doc_id
-        )
-    except HTTPException as e:
-        raise e
+        structured_result, near_duplicate = None, None
+        if db is not None and settings.near_duplicate_enabled:
+            structured_result, near_duplicate = _reuse_near_duplicate(
+                db, doc_id, reuse_near_duplicate
+            )
+        if structured_result is None:
+            structured_result = extract_structured_record_from_text(
+                prompt_text, db=db, doc_id=doc_id
+            )
+    except (HTTPException, deadlines.RequestCancelled):
+        raise
     except LLMExtractionError as e:
         raise HTTPException(
             status_code=422,
@@ -258,12 +597,20 @@ def process_document_full_pipeline(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
-    return {
-        "id": doc_id,
-        "raw_text": raw_text,
-        "extraction_meta": extraction_result["extraction_meta"],
-        "record": structured_result["record"],
-    }
+    result = {"id": doc_id}
+    if include_raw_text:
+        result["raw_text"] = read_raw_text(doc_id)
+    result.update(
+        {
+            "raw_text_chars": extraction_result["chars"],
+            "raw_text_segments": extraction_result["segments"],
+            "extraction_meta": extraction_result["extraction_meta"],
+            "record": structured_result["record"],
+        }
+    )
+    if near_duplicate is not None:
+        result["near_duplicate"] = near_duplicate
+    return result
 
 
 def persist_document_metadata(db: Session, metadata: dict[str, Any]) -> None:
@@ -293,20 +640,298 @@ def persist_document_metadata(db: Session, metadata: dict[str, Any]) -> None:
     logger.debug("metadata.persisted id=%s", metadata["id"])
 
 
+def _written_columns() -> tuple:
+    """RETURNING list for record writes, including the pre-update values.
+
+    The ``old_*`` scalar subqueries still see the row as it was before the
+    statement, which feeds the version history without an extra SELECT.
+    """
+    previous = aliased(StructuredRecord)
+    # RETURNING does not take part in correlation; name the target row directly.
+    target_document_id = literal_column(f"{StructuredRecord.__tablename__}.document_id")
+    return (
+        StructuredRecord.document_id,
+        StructuredRecord.record_json,
+        StructuredRecord.prompt_version,
+        StructuredRecord.version,
+        StructuredRecord.updated_at,
+        select(previous.record_json)
+        .where(previous.document_id == target_document_id)
+        .scalar_subquery()
+        .label("old_json"),
+        select(previous.version)
+        .where(previous.document_id == target_document_id)
+        .scalar_subquery()
+        .label("old_version"),
+    )
+
+
+def _write_records(
+    db: Session, stmt, params: Any, prompt_version: str | None
+) -> list[dict[str, Any]]:
+    """Execute a record write, append its history and commit."""
+    source = record_history.SOURCE_MANUAL
+    if prompt_version is not None:
+        source = record_history.SOURCE_LLM
+    try:
+        written = [dict(row._mapping) for row in db.execute(stmt, params)]
+        record_history.append_versions(db, written, source, prompt_version)
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if getattr(exc.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION:
+            raise HTTPException(status_code=404, detail="Document not found")
+        # Unique (document_id, version) in the history: a concurrent writer.
+        raise HTTPException(status_code=409, detail="Concurrent record update")
+    for row in written:
+        del row["old_json"], row["old_version"]
+    return written
+
+
+def _upsert_records(
+    db: Session, records: dict[str, dict[str, Any]], prompt_version: str | None
+) -> list[dict[str, Any]]:
+    """``INSERT ... ON CONFLICT (document_id) DO UPDATE ... RETURNING`` for ``records``.
+
+    Rows are sent as one executemany, which SQLAlchemy batches into
+    multi-row VALUES statements with a cached compilation. A ``None`` prompt
+    version keeps the stored one (manual edits).
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "document_id": doc_id,
+            "record_json": record,
+            "prompt_version": prompt_version,
+            "version": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for doc_id, record in records.items()
+    ]
+    stmt = pg_insert(StructuredRecord)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StructuredRecord.document_id],
+        set_={
+            "record_json": stmt.excluded.record_json,
+            "prompt_version": func.coalesce(
+                stmt.excluded.prompt_version, StructuredRecord.prompt_version
+            ),
+            "version": StructuredRecord.version + 1,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(*_written_columns())
+    return _write_records(db, stmt, rows, prompt_version)
+
+
+def update_structured_record_if_match(
+    db: Session,
+    doc_id: str,
+    record: dict[str, Any],
+    versions: Collection[int] | None,
+    prompt_version: str | None = None,
+) -> dict[str, Any]:
+    """``UPDATE ... WHERE version IN (...)``: optimistic concurrency, no locking.
+
+    ``versions=None`` matches any existing record (``If-Match: *``). When no
+    row matches (stale version or no record yet) the write is refused with 412.
+    ``prompt_version`` only labels the history entry as LLM output.
+    """
+    stmt = (
+        update(StructuredRecord)
+        .where(StructuredRecord.document_id == doc_id)
+        .values(
+            record_json=record,
+            version=StructuredRecord.version + 1,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(*_written_columns())
+    )
+    if versions is not None:
+        stmt = stmt.where(StructuredRecord.version.in_(list(versions)))
+    written = _write_records(db, stmt, None, prompt_version)
+    if not written:
+        raise HTTPException(
+            status_code=412, detail="Record was modified; reload and retry"
+        )
+    logger.debug("record.updated doc_id=%s version=%s", doc_id, written[0]["version"])
+    return written[0]
+
+
+def patch_structured_record(
+    db: Session,
+    doc_id: str,
+    content_type: str,
+    patch: Any,
+    versions: Collection[int] | None = None,
+    prompt_version: str | None = None,
+) -> dict[str, Any]:
+    """Apply a JSON Patch or merge patch to the current record.
+
+    The patch normally runs in the database as one conditional ``UPDATE``.
+    When that matches no row, the record is read once to find out why. A
+    missing record gives 404 and a stale ``versions`` gives 412. Otherwise
+    the patch is applied in Python, guarded by the version that was read.
+    """
+    compiled = record_patch.compile_patch(content_type, patch)
+    if compiled.in_database:
+        new_json, conditions = record_patch.to_sql(compiled.steps)
+        stmt = (
+            update(StructuredRecord)
+            .where(StructuredRecord.document_id == doc_id, *conditions)
+            .values(
+                record_json=new_json,
+                version=StructuredRecord.version + 1,
+                updated_at=datetime.utcnow(),
+            )
+            .returning(*_written_columns())
+        )
+        if versions is not None:
+            stmt = stmt.where(StructuredRecord.version.in_(list(versions)))
+        written = _write_records(db, stmt, None, prompt_version)
+        if written:
+            logger.debug(
+                "record.patched doc_id=%s version=%s mode=sql",
+                doc_id,
+                written[0]["version"],
+            )
+            return written[0]
+
+    current = get_structured_record(db, doc_id)
+    if versions is not None and current["version"] not in versions:
+        raise HTTPException(
+            status_code=412, detail="Record was modified; reload and retry"
+        )
+    record = record_patch.apply_in_python(content_type, current["record"], patch)
+    row = update_structured_record_if_match(
+        db, doc_id, record, [current["version"]], prompt_version
+    )
+    logger.debug(
+        "record.patched doc_id=%s version=%s mode=python", doc_id, row["version"]
+    )
+    return row
+
+
+def re_extract_fields(
+    db: Session,
+    doc_id: str,
+    fields: list[str],
+    pages: list[int] | None = None,
+    versions: Collection[int] | None = None,
+) -> dict[str, Any]:
+    """Re-extract ``fields`` from the stored raw text and merge them in.
+
+    Only the pages relevant to ``fields`` (or the given ``pages``) are sent,
+    with a prompt and response schema limited to those fields. The result is
+    written with one JSON Patch ``add`` per field, so each field is replaced
+    as a whole and the rest of the record is left untouched.
+    """
+    allowed = record_repair.extractable_fields()
+    unknown = [f for f in fields if f not in allowed]
+    if not fields or unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+            if unknown
+            else "No fields requested",
+        )
+    fields = [f for f in allowed if f in fields]
+    # Fail before spending tokens on a record that cannot be written.
+    current = get_structured_record(db, doc_id)
+    if versions is not None and current["version"] not in versions:
+        raise HTTPException(
+            status_code=412, detail="Record was modified; reload and retry"
+        )
+    raw_text = read_raw_text(doc_id, db=db)
+    window = page_window.select_window(
+        raw_text, fields, settings.field_extraction_max_chars, pages
+    )
+    if not window.text.strip():
+        raise HTTPException(
+            status_code=422, detail="No text in the selected pages of the document"
+        )
+    logger.info(
+        "extract.fields.start id=%s fields=%s pages=%s/%s chars=%s/%s",
+        doc_id,
+        ",".join(fields),
+        ",".join(map(str, window.pages)),
+        window.total_pages,
+        len(window.text),
+        len(raw_text),
+    )
+    try:
+        values = extract_fields(window.text, fields)
+    except LLMExtractionError as e:
+        raise HTTPException(status_code=422, detail=f"LLM extraction failed: {str(e)}")
+    ops = [{"op": "add", "path": f"/{name}", "value": values[name]} for name in fields]
+    row = patch_structured_record(
+        db, doc_id, record_patch.JSON_PATCH, ops, versions, PROMPT_VERSION
+    )
+    logger.info("extract.fields.success id=%s version=%s", doc_id, row["version"])
+    return {
+        "id": doc_id,
+        "version": row["version"],
+        "fields": fields,
+        "pages": window.pages,
+        "values": values,
+    }
+
+
 def upsert_structured_record(
-    db: Session, doc_id: str, record: dict[str, Any]
+    db: Session,
+    doc_id: str,
+    record: dict[str, Any],
+    prompt_version: str | None = None,
 ) -> dict[str, Any]:
-    """Create or update structured record for a document."""
-    doc = db.get(Document, doc_id)
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
-    # Load existing or create
-    payload = _to_jsonable(record)
-    if doc.record:
-        doc.record.record_json = payload
-    else:
-        doc.record = StructuredRecord(document_id=doc_id, record_json=payload)
-    db.commit()
-    db.refresh(doc)
+    """Create or update structured record for a document.
+
+    ``prompt_version`` is set for LLM output; manual edits leave it unchanged.
+    """
+    (row,) = _upsert_records(db, {doc_id: record}, prompt_version)
     logger.debug("record.upserted doc_id=%s", doc_id)
-    return doc.record.record_json
+    return row["record_json"]
+
+
+def bulk_upsert_structured_records(
+    db: Session,
+    records: Mapping[str, dict[str, Any]] | Iterable[tuple[str, dict[str, Any]]],
+    prompt_version: str | None,
+) -> list[dict[str, Any]]:
+    """Upsert many ``(doc_id, record)`` pairs with one statement per call.
+
+    Returns the written rows (``document_id``, ``record_json``,
+    ``prompt_version``, ``version``, ``updated_at``). A later pair for the same document
+    wins. Raises 404 if any document does not exist; nothing is written then.
+    """
+    records = dict(records)
+    if not records:
+        return []
+    rows = _upsert_records(db, records, prompt_version)
+    logger.debug("record.bulk_upserted count=%s", len(rows))
+    return rows
+
+
+def get_structured_record(db: Session, doc_id: str) -> dict[str, Any]:
+    """Current record and its version number."""
+    row = db.execute(
+        select(StructuredRecord.record_json, StructuredRecord.version).where(
+            StructuredRecord.document_id == doc_id
+        )
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return {"id": doc_id, "version": row.version, "record": row.record_json}
+
+
+def get_structured_record_version(
+    db: Session, doc_id: str, version: int
+) -> dict[str, Any]:
+    record = record_history.reconstruct(db, doc_id, version)
+    return {"id": doc_id, "version": version, "record": record}
+
+
+def list_structured_record_versions(db: Session, doc_id: str) -> dict[str, Any]:
+    versions = record_history.list_versions(db, doc_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return {"id": doc_id, "versions": versions}
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Optional
 
 
 class ExtractionResult:
@@ -8,8 +8,78 @@ class ExtractionResult:
         self.meta = meta
 
 
+class Segment:
+    """A piece of a document's text: a page, or a chunk of unpaginated text."""
+
+    __slots__ = ("text", "page", "meta")
+
+    def __init__(
+        self,
+        text: str,
+        page: Optional[int] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.text = text
+        self.page = page
+        self.meta = meta or {}
+
+    @property
+    def marker(self) -> str:
+        """The page marker that precedes the text in the joined document."""
+        return "" if self.page is None else f"\n--- Page {self.page} ---\n"
+
+    def render(self) -> str:
+        return self.marker + self.text
+
+
+def join_segments(segments: Iterable[Segment]) -> str:
+    return "".join(segment.render() for segment in segments)
+
+
+class ExtractionFailed(RuntimeError):
+    """A document could not be extracted within its limits.
+
+    ``kind`` is ``timeout``, ``oom`` or ``crash``.
+    """
+
+    def __init__(self, kind: str, message: str) -> None:
+        super().__init__(message)
+        self.kind = kind
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return {"failure": self.kind, "error": str(self)}
+
+
 class DocumentExtractor(ABC):
     @abstractmethod
     def extract(self, file_path: str) -> ExtractionResult:
         """Extract text and metadata from a file."""
         pass
+
+    def iter_segments(self, file_path: str, meta: Dict[str, Any]) -> Iterator[Segment]:
+        """Yield the text segment by segment, recording document metadata in ``meta``.
+
+        ``meta`` is complete once the iterator is exhausted. By default the
+        whole ``extract`` result is a single segment.
+        """
+        result = self.extract(file_path)
+        meta.update(result.meta)
+        yield Segment(result.text)
+
+    def warm(self) -> None:
+        """Load per-instance resources once; instances are reused across calls."""
+        pass
+
+
+class SegmentedExtractor(DocumentExtractor):
+    """An extractor that produces segments natively; ``extract`` joins them."""
+
+    @abstractmethod
+    def iter_segments(self, file_path: str, meta: Dict[str, Any]) -> Iterator[Segment]:
+        pass
+
+    def extract(self, file_path: str) -> ExtractionResult:
+        meta: Dict[str, Any] = {}
+        text = join_segments(self.iter_segments(file_path, meta))
+        return ExtractionResult(text=text, meta=meta)
@@ -0,0 +1,24 @@
+"""Helpers for extractors that shell out to local conversion tools."""
+
+import shutil
+import subprocess
+
+
+class ConverterUnavailableError(RuntimeError):
+    """Raised when none of the local converters for a format is installed."""
+
+
+def first_available(*commands: str) -> str | None:
+    for command in commands:
+        if shutil.which(command):
+            return command
+    return None
+
+
+def run_converter(args: list[str], timeout: float) -> bytes:
+    """Run a converter and return its stdout; raises on failure or timeout."""
+    result = subprocess.run(args, capture_output=True, timeout=timeout, check=False)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"{args[0]} failed ({result.returncode}): {stderr[:200]}")
+    return result.stdout
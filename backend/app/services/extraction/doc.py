@@ -0,0 +1,44 @@
+import tempfile
+from pathlib import Path
+
+from .base import DocumentExtractor, ExtractionResult
+from .converters import ConverterUnavailableError, first_available, run_converter
+
+
+class DocExtractor(DocumentExtractor):
+    """Legacy Word 97-2003 (.doc) via ``antiword``, falling back to LibreOffice."""
+
+    def __init__(self, timeout: float = 120) -> None:
+        self.timeout = timeout
+        self.converter: str | None = None
+
+    def warm(self) -> None:
+        self.converter = first_available("antiword", "soffice", "libreoffice")
+
+    def extract(self, file_path: str) -> ExtractionResult:
+        if self.converter is None:
+            self.warm()
+        if self.converter is None:
+            raise ConverterUnavailableError(
+                "No .doc converter installed (antiword or LibreOffice)"
+            )
+        if self.converter == "antiword":
+            raw = run_converter(["antiword", "-w", "0", file_path], self.timeout)
+        else:
+            with tempfile.TemporaryDirectory() as out_dir:
+                run_converter(
+                    [
+                        self.converter,
+                        "--headless",
+                        "--convert-to",
+                        "txt:Text (encoded):UTF8",
+                        "--outdir",
+                        out_dir,
+                        file_path,
+                    ],
+                    self.timeout,
+                )
+                raw = (Path(out_dir) / f"{Path(file_path).stem}.txt").read_bytes()
+        text = raw.decode("utf-8", errors="replace")
+        meta = {"type": "doc", "converter": self.converter}
+        return ExtractionResult(text=text, meta=meta)
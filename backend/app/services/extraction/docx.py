@@ -1,10 +1,171 @@
-from .base import DocumentExtractor, ExtractionResult
-import docx
+import re
+import zipfile
+from typing import Any, Iterator
+from xml.etree.ElementTree import Element, iterparse
 
+from .base import Segment, SegmentedExtractor
 
-class DocxExtractor(DocumentExtractor):
-    def extract(self, file_path: str) -> ExtractionResult:
-        doc = docx.Document(file_path)
-        text = "\n".join([p.text for p in doc.paragraphs])
-        meta = {"type": "docx", "paragraphs": len(doc.paragraphs)}
-        return ExtractionResult(text=text, meta=meta)
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+_HEADER_RE = re.compile(r"^word/header(\d*)\.xml$")
+_FOOTER_RE = re.compile(r"^word/footer(\d*)\.xml$")
+# Elements detached from their parent once handled, so the parsed tree never
+# holds more than the block currently being read.
+_RELEASE = {W + "p", W + "tr", W + "tbl", W + "txbxContent", W + "sectPr"}
+# Top-level lines (paragraphs and table rows) per segment.
+SEGMENT_LINES = 200
+
+
+def _numbered_parts(names: list[str], pattern: re.Pattern) -> list[str]:
+    found = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            found.append((int(match.group(1) or 0), name))
+    return [name for _, name in sorted(found)]
+
+
+class _PartReader:
+    """Streams one WordprocessingML part and emits lines in document order.
+
+    Paragraphs become lines and table rows become ``cell | cell`` lines.
+    Text-box content is held until its anchor paragraph closes and follows
+    that paragraph's own text; text-box paragraphs are counted as
+    ``text_box_paragraphs``, not ``paragraphs``. ``mc:Fallback`` branches
+    (VML copies of text boxes) are skipped.
+    """
+
+    def __init__(self, counts: dict[str, int]) -> None:
+        self.counts = counts
+        self.lines: list[str] = []
+        self._runs: list[list[str]] = []
+        self._rows: list[list[str]] = []
+        # Each entry is the sink for finished paragraphs: a cell's paragraph
+        # list, or None for "emit as a line" (body, header/footer, text box).
+        self._sinks: list[list[str] | None] = [None]
+        # Open text boxes, and the text-box lines waiting on each open paragraph.
+        self._boxes: list[list[str]] = []
+        self._deferred: list[list[str]] = []
+        self._fallback_depth = 0
+
+    def feed(self, source, batch: int) -> Iterator[list[str]]:
+        """Yield finished lines whenever ``batch`` of them are ready, then the rest."""
+        stack: list[Element] = []
+        for event, elem in iterparse(source, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                self._start(elem.tag)
+                continue
+            stack.pop()
+            self._end(elem)
+            if stack and (elem.tag in _RELEASE or len(stack) <= 2):
+                stack[-1].remove(elem)
+            if len(self.lines) >= batch:
+                yield self.lines
+                self.lines = []
+        if self.lines:
+            yield self.lines
+            self.lines = []
+
+    def _start(self, tag: str) -> None:
+        if tag == MC + "Fallback":
+            self._fallback_depth += 1
+        elif self._fallback_depth:
+            return
+        elif tag == W + "p":
+            self._runs.append([])
+            self._deferred.append([])
+        elif tag == W + "tbl":
+            self.counts["tables"] += 1
+        elif tag == W + "tr":
+            self._rows.append([])
+        elif tag == W + "tc":
+            self._sinks.append([])
+        elif tag == W + "txbxContent":
+            self.counts["text_boxes"] += 1
+            self._boxes.append([])
+            self._sinks.append(self._boxes[-1])
+
+    def _end(self, elem: Element) -> None:
+        tag = elem.tag
+        if tag == MC + "Fallback":
+            self._fallback_depth -= 1
+            return
+        if self._fallback_depth:
+            return
+        if tag == W + "t":
+            if self._runs and elem.text:
+                self._runs[-1].append(elem.text)
+        elif tag == W + "tab":
+            if self._runs:
+                self._runs[-1].append("\t")
+        elif tag in (W + "br", W + "cr"):
+            if self._runs:
+                self._runs[-1].append("\n")
+        elif tag == W + "p":
+            text = "".join(self._runs.pop())
+            sink = self._sinks[-1]
+            if self._boxes and sink is self._boxes[-1]:
+                self.counts["text_box_paragraphs"] += 1
+            elif sink is None:
+                self.counts["paragraphs"] += 1
+            self._emit(sink, [text, *self._deferred.pop()])
+        elif tag == W + "tc":
+            cell = self._sinks.pop()
+            if self._rows:
+                self._rows[-1].append(" ".join(p for p in cell if p))
+        elif tag == W + "tr":
+            row = " | ".join(self._rows.pop())
+            self.counts["table_rows"] += 1
+            sink = self._sinks[-1]
+            if sink is None:
+                self.lines.append(row)
+            else:
+                # Nested table: the row becomes part of the enclosing cell.
+                sink.append(row)
+        elif tag == W + "txbxContent":
+            self._sinks.pop()
+            box = self._boxes.pop()
+            if self._deferred:
+                self._deferred[-1].extend(box)
+            else:
+                self._emit(self._sinks[-1], box)
+
+    def _emit(self, sink: list[str] | None, lines: list[str]) -> None:
+        (self.lines if sink is None else sink).extend(lines)
+
+
+class DocxExtractor(SegmentedExtractor):
+    """Streams ``word/document.xml`` plus headers and footers with iterparse.
+
+    Unlike loading the package through python-docx, no object model is
+    built: each block is released once read, so parse memory stays flat
+    regardless of document size. Tables and text boxes are included. A
+    segment is every ``SEGMENT_LINES`` top-level lines; DOCX has no pages.
+    """
+
+    def iter_segments(self, file_path: str, meta: dict[str, Any]) -> Iterator[Segment]:
+        counts = {
+            "paragraphs": 0,
+            "tables": 0,
+            "table_rows": 0,
+            "text_boxes": 0,
+            "text_box_paragraphs": 0,
+        }
+        first = True
+        with zipfile.ZipFile(file_path) as zf:
+            names = zf.namelist()
+            headers = _numbered_parts(names, _HEADER_RE)
+            footers = _numbered_parts(names, _FOOTER_RE)
+            meta.update(
+                {"type": "docx", "headers": len(headers), "footers": len(footers)}
+            )
+            for part in [*headers, "word/document.xml", *footers]:
+                with zf.open(part) as fh:
+                    for lines in _PartReader(counts).feed(fh, SEGMENT_LINES):
+                        # Segments concatenate, so each carries its own separator.
+                        text = "\n".join(lines)
+                        yield Segment(text if first else "\n" + text)
+                        first = False
+        meta.update(counts)
@@ -1,20 +1,212 @@
-from .pdf import PDFExtractor
-from .docx import DocxExtractor
-from .image import ImageExtractor
+"""Extractor registry with lazy backend imports and warm, reusable instances.
+
+Built-in extractors are registered by dotted path, so ``fitz``, ``pytesseract``
+and ``PIL`` are imported only when a document of that type is first seen.
+Their magic-byte signatures live in ``app.services.content_sniffing``.
+Third-party extractors register through the ``vet_insight.extractors`` entry
+point group; each entry point is a callable taking the registry::
+
+    def register(registry):
+        registry.register(
+            "my_pkg.rtf:RtfExtractor", ["application/rtf"], magic={b"{\\rtf": "application/rtf"}
+        )
+"""
+
+import importlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from typing import Any, Iterable
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
 from .base import DocumentExtractor
-from typing import Type
 
-MIME_MAP: dict[str, Type[DocumentExtractor]] = {
-    "application/pdf": PDFExtractor,
-    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": DocxExtractor,
-    "image/png": ImageExtractor,
-    "image/jpeg": ImageExtractor,
-    "image/jpg": ImageExtractor,
-}
+logger = logging.getLogger("app.services.extraction")
+
+ENTRY_POINT_GROUP = "vet_insight.extractors"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@dataclass
+class ExtractorSpec:
+    name: str
+    target: str | type[DocumentExtractor]
+    mime_types: tuple[str, ...]
+    magic: dict[bytes, str] = field(default_factory=dict)
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+class ExtractorRegistry:
+    """Maps MIME types (and magic prefixes) to lazily created extractor singletons."""
+
+    def __init__(self, entry_point_group: str | None = ENTRY_POINT_GROUP) -> None:
+        self._by_mime: dict[str, ExtractorSpec] = {}
+        self._magic: dict[bytes, str] = {}
+        self._instances: dict[str, DocumentExtractor] = {}
+        self._stats: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._entry_point_group = entry_point_group
+        self._plugins_loaded = entry_point_group is None
+
+    def register(
+        self,
+        target: str | type[DocumentExtractor],
+        mime_types: Iterable[str],
+        magic: dict[bytes, str] | None = None,
+        name: str | None = None,
+        **options: Any,
+    ) -> ExtractorSpec:
+        """Register ``target`` ("module:Class" or a class) for ``mime_types``.
+
+        ``options`` are passed to the constructor when the instance is built.
+        Registering a MIME type again replaces the previous extractor.
+        """
+        if name is None:
+            name = target if isinstance(target, str) else target.__name__
+        spec = ExtractorSpec(
+            name=name,
+            target=target,
+            mime_types=tuple(mime_types),
+            magic=dict(magic or {}),
+            options=options,
+        )
+        with self._lock:
+            for mime in spec.mime_types:
+                self._by_mime[mime] = spec
+            self._magic.update(spec.magic)
+            self._instances.pop(spec.name, None)
+        return spec
+
+    def load_entry_points(self) -> None:
+        if self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+        for ep in entry_points(group=self._entry_point_group):
+            try:
+                ep.load()(self)
+                logger.info("extractor.plugin.loaded name=%s", ep.name)
+            except Exception as exc:
+                logger.exception(
+                    "extractor.plugin.error name=%s msg=%s", ep.name, str(exc)
+                )
+
+    def _spec_for(self, mime_type: str | None) -> ExtractorSpec | None:
+        spec = self._by_mime.get(mime_type or "")
+        if spec is None and not self._plugins_loaded:
+            self.load_entry_points()
+            spec = self._by_mime.get(mime_type or "")
+        return spec
+
+    def supports(self, mime_type: str | None) -> bool:
+        return self._spec_for(mime_type) is not None
+
+    def mime_types(self) -> list[str]:
+        self.load_entry_points()
+        return sorted(self._by_mime)
+
+    def match_magic(self, head: bytes) -> str | None:
+        """MIME type whose registered magic prefix matches ``head``."""
+        self.load_entry_points()
+        for prefix, mime in self._magic.items():
+            if head.startswith(prefix):
+                return mime
+        return None
+
+    def get(self, mime_type: str | None) -> DocumentExtractor:
+        spec = self._spec_for(mime_type)
+        if spec is None:
+            raise ValueError(f"Unsupported MIME type: {mime_type}")
+        instance = self._instances.get(spec.name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(spec.name)
+            if instance is None:
+                instance = self._build(spec)
+                self._instances[spec.name] = instance
+        return instance
+
+    def _build(self, spec: ExtractorSpec) -> DocumentExtractor:
+        t0 = time.perf_counter()
+        cls = spec.target
+        if isinstance(cls, str):
+            module_name, _, attr = cls.partition(":")
+            cls = getattr(importlib.import_module(module_name), attr)
+        t1 = time.perf_counter()
+        instance = cls(**spec.options)
+        instance.warm()
+        t2 = time.perf_counter()
+
+        import_ms = (t1 - t0) * 1000
+        startup_ms = (t2 - t1) * 1000
+        self._stats[spec.name] = {"import_ms": import_ms, "startup_ms": startup_ms}
+        metrics.set_gauge(f"extractor.import_ms.{spec.name}", import_ms)
+        metrics.set_gauge(f"extractor.startup_ms.{spec.name}", startup_ms)
+        logger.info(
+            "extractor.loaded name=%s import_ms=%.1f startup_ms=%.1f",
+            spec.name,
+            import_ms,
+            startup_ms,
+        )
+        return instance
+
+    def warm_all(self) -> None:
+        """Import and warm every registered extractor (e.g. before forking)."""
+        self.load_entry_points()
+        for mime in list(self._by_mime):
+            self.get(mime)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {name: dict(values) for name, values in self._stats.items()}
+
+
+registry = ExtractorRegistry()
+registry.register(
+    "app.services.extraction.pdf:PDFExtractor",
+    ["application/pdf"],
+    name="pdf",
+)
+registry.register(
+    "app.services.extraction.docx:DocxExtractor",
+    [DOCX_MIME],
+    name="docx",
+)
+registry.register(
+    "app.services.extraction.image:ImageExtractor",
+    ["image/png", "image/jpeg", "image/jpg"],
+    name="image",
+    lang=settings.ocr_languages,
+)
+registry.register(
+    "app.services.extraction.tiff:TiffExtractor",
+    ["image/tiff"],
+    name="tiff",
+    lang=settings.ocr_languages,
+    max_workers=settings.ocr_max_workers,
+)
+registry.register(
+    "app.services.extraction.heic:HeicExtractor",
+    ["image/heic", "image/heif"],
+    name="heic",
+    lang=settings.ocr_languages,
+    timeout=settings.converter_timeout_seconds,
+)
+registry.register(
+    "app.services.extraction.doc:DocExtractor",
+    ["application/msword"],
+    name="doc",
+    timeout=settings.converter_timeout_seconds,
+)
+registry.register(
+    "app.services.extraction.text:TextExtractor",
+    ["text/plain"],
+    name="text",
+)
 
 
 def get_extractor(mime_type: str) -> DocumentExtractor:
-    extractor_cls = MIME_MAP.get(mime_type)
-    if not extractor_cls:
-        raise ValueError(f"Unsupported MIME type: {mime_type}")
-    return extractor_cls()
+    return registry.get(mime_type)
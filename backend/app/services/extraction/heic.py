@@ -0,0 +1,51 @@
+import tempfile
+from pathlib import Path
+
+from . import ocr
+from .base import ExtractionResult
+from .converters import ConverterUnavailableError, first_available, run_converter
+from .image import ImageExtractor, open_image
+
+
+class HeicExtractor(ImageExtractor):
+    """HEIC/HEIF photos: decoded with ``pillow-heif`` if installed, else ``heif-convert``."""
+
+    def __init__(self, lang: str | None = None, timeout: float = 120) -> None:
+        super().__init__(lang=lang)
+        self.timeout = timeout
+        self.decoder: str | None = None
+
+    def warm(self) -> None:
+        super().warm()
+        try:
+            from pillow_heif import register_heif_opener
+
+            register_heif_opener()
+            self.decoder = "pillow-heif"
+        except ImportError:
+            self.decoder = first_available("heif-convert")
+
+    def extract(self, file_path: str) -> ExtractionResult:
+        if self.decoder is None:
+            self.warm()
+        if self.decoder == "pillow-heif":
+            return self._ocr_file(file_path)
+        if self.decoder is None:
+            raise ConverterUnavailableError(
+                "No HEIC decoder installed (pillow-heif or heif-convert)"
+            )
+        with tempfile.TemporaryDirectory() as out_dir:
+            png_path = str(Path(out_dir) / "converted.png")
+            run_converter([self.decoder, file_path, png_path], self.timeout)
+            return self._ocr_file(png_path)
+
+    def _ocr_file(self, path: str) -> ExtractionResult:
+        with open_image(path) as image:
+            text = ocr.image_to_string(image, lang=self.lang)
+            meta = {
+                "type": "heic",
+                "decoder": self.decoder,
+                "mode": image.mode,
+                "size": image.size,
+            }
+        return ExtractionResult(text=text, meta=meta)
@@ -1,11 +1,68 @@
-from .base import DocumentExtractor, ExtractionResult
+import logging
+
+from app.core.config import settings
+
+from .base import DocumentExtractor, ExtractionFailed, ExtractionResult
+from . import ocr
 import pytesseract
 from PIL import Image
 
+logger = logging.getLogger("app.services.extraction.image")
+
+# Pillow refuses outright at twice this; ``check_pixels`` enforces it exactly.
+Image.MAX_IMAGE_PIXELS = settings.extraction_max_image_pixels or None
+
+
+def check_pixels(image: Image.Image) -> None:
+    """Refuse images over ``extraction_max_image_pixels`` before decoding them."""
+    limit = settings.extraction_max_image_pixels
+    width, height = image.size
+    if limit > 0 and width * height > limit:
+        raise ExtractionFailed(
+            "oom",
+            f"Image of {width}x{height} pixels exceeds the limit of {limit} pixels",
+        )
+
+
+def open_image(file_path: str) -> Image.Image:
+    """``Image.open`` with the decompression-bomb threshold applied."""
+    try:
+        image = Image.open(file_path)
+    except Image.DecompressionBombError as exc:
+        raise ExtractionFailed("oom", str(exc))
+    try:
+        check_pixels(image)
+    except ExtractionFailed:
+        image.close()
+        raise
+    return image
+
 
 class ImageExtractor(DocumentExtractor):
+    def __init__(self, lang: str | None = None) -> None:
+        self.lang = lang
+        self.available_languages: list[str] = []
+
+    def warm(self) -> None:
+        """Resolve installed Tesseract language data once for this instance."""
+        try:
+            self.available_languages = pytesseract.get_languages(config="")
+        except Exception as exc:
+            logger.warning("ocr.languages.unavailable msg=%s", str(exc))
+            return
+        if self.lang:
+            requested = self.lang.split("+")
+            usable = [lang for lang in requested if lang in self.available_languages]
+            if usable != requested:
+                logger.warning(
+                    "ocr.languages.missing requested=%s available=%s",
+                    self.lang,
+                    ",".join(self.available_languages),
+                )
+            self.lang = "+".join(usable) or None
+
     def extract(self, file_path: str) -> ExtractionResult:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
+        image = open_image(file_path)
+        text = ocr.image_to_string(image, lang=self.lang)
         meta = {"type": "image", "mode": image.mode, "size": image.size}
         return ExtractionResult(text=text, meta=meta)
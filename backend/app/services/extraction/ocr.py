@@ -0,0 +1,63 @@
+"""Tesseract runs that can be stopped.
+
+``pytesseract.image_to_string`` blocks until tesseract exits. Here the
+process is polled instead. It is killed once ``ocr_timeout_seconds`` pass or
+the current request's deadline is done (see ``app.core.deadline``).
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import time
+
+import pytesseract
+from pytesseract.pytesseract import TesseractError, TesseractNotFoundError
+
+from app.core import deadline as deadlines
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger("app.services.extraction.ocr")
+
+
+def image_to_string(image, lang: str | None = None) -> str:
+    """OCR a PIL image like ``pytesseract.image_to_string``, but interruptible."""
+    deadline = deadlines.current()
+    if deadline is not None:
+        deadline.check()
+    expires_at = time.monotonic() + settings.ocr_timeout_seconds
+    with pytesseract.pytesseract.save(image) as (_, input_filename):
+        args = [pytesseract.pytesseract.tesseract_cmd, input_filename, "stdout"]
+        if lang:
+            args += ["-l", lang]
+        try:
+            # Own process group, so a kill also reaches anything it started.
+            proc = subprocess.Popen(
+                args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            raise TesseractNotFoundError()
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=deadlines.POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                timed_out = time.monotonic() >= expires_at
+                if not timed_out and (deadline is None or not deadline.done):
+                    continue
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.communicate()
+                metrics.incr("ocr.killed")
+                logger.warning("ocr.killed pid=%s timed_out=%s", proc.pid, timed_out)
+                if deadline is not None:
+                    deadline.check()
+                raise RuntimeError("Tesseract process timeout")
+    if proc.returncode:
+        raise TesseractError(
+            proc.returncode, stderr.decode("utf-8", errors="replace").strip()
+        )
+    return stdout.decode("utf-8", errors="replace")
@@ -1,14 +1,15 @@
-from .base import DocumentExtractor, ExtractionResult
+from typing import Any, Iterator
+
+from app.core import deadline as deadlines
+
+from .base import Segment, SegmentedExtractor
 import fitz  # PyMuPDF
 
 
-class PDFExtractor(DocumentExtractor):
-    def extract(self, file_path: str) -> ExtractionResult:
-        doc = fitz.open(file_path)
-        text = ""
-        meta = {"pages": doc.page_count, "type": "pdf"}
-        for page_num, page in enumerate(doc, 1):
-            text += f"\n--- Page {page_num} ---\n"
-            text += page.get_text()
-        doc.close()
-        return ExtractionResult(text=text, meta=meta)
+class PDFExtractor(SegmentedExtractor):
+    def iter_segments(self, file_path: str, meta: dict[str, Any]) -> Iterator[Segment]:
+        with fitz.open(file_path) as doc:
+            meta.update({"pages": doc.page_count, "type": "pdf"})
+            for page_num, page in enumerate(doc, 1):
+                deadlines.check()
+                yield Segment(page.get_text(), page=page_num)
@@ -0,0 +1,391 @@
+"""Sandboxed worker processes for CPU-bound extraction.
+
+OCR and PDF parsing run in child processes (``extraction_pool_workers``, 2 by
+default; 0 extracts in-process), so a document that hangs or exhausts memory
+cannot take the API worker down, and parsing does not hold its GIL while
+other requests are served. The pool belongs to the API worker process that first uses it. With
+several web workers the total is ``web_concurrency * extraction_pool_workers``
+extraction processes. Children come from a forkserver that preloads the
+extractor registry; backends are still imported lazily on first use.
+
+Each worker takes one document at a time, under per-document limits:
+
+- address space (``RLIMIT_AS``, ``extraction_memory_limit_mb``);
+- CPU time (``RLIMIT_CPU``, ``extraction_cpu_seconds``, reset per document);
+- wall clock (``extraction_wall_seconds``), enforced here by killing it;
+- image size (``extraction_max_image_pixels``, against decompression bombs).
+
+A worker is replaced after ``extraction_worker_max_jobs`` documents, after
+running out of memory, and when it dies. A document that breaks a limit
+raises :class:`ExtractionFailed` classified as ``timeout``, ``oom`` or
+``crash``; other workers and the API process are unaffected.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+import time
+from typing import Any, Iterator
+
+from app.core import deadline as deadlines
+from app.core.config import settings
+from app.core.metrics import metrics
+
+from .base import ExtractionFailed, ExtractionResult, Segment, join_segments
+from .factory import get_extractor
+
+logger = logging.getLogger("app.services.extraction")
+
+_lock = threading.Lock()
+_pool: "SandboxPool | None" = None
+
+
+def _limit_cpu(seconds: int) -> None:
+    """Allow ``seconds`` more CPU time before the kernel sends ``SIGXCPU``."""
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _run_job(conn, content_type: str, path: str, timeout: float | None) -> dict:
+    """Send each segment as it is extracted; returns the document metadata."""
+    import resource
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    meta: dict[str, Any] = {}
+    # The parent's deadline cannot cross the process boundary; its time left can.
+    deadline = None if timeout is None else deadlines.Deadline(timeout)
+    with deadlines.use(deadline):
+        for segment in get_extractor(content_type).iter_segments(path, meta):
+            conn.send(("segment", segment.text, segment.page, segment.meta))
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+    meta["sandbox"] = {
+        "worker": os.getpid(),
+        "cpu_ms": round(cpu * 1000),
+        "max_rss_mb": round(after.ru_maxrss / 1024, 1),
+    }
+    return meta
+
+
+def _portable(exc: BaseException) -> BaseException:
+    """``exc`` if it survives pickling, else a ``RuntimeError`` with its message."""
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:
+        return RuntimeError(str(exc))
+
+
+def _worker_main(conn, limits: dict[str, int]) -> None:
+    """Child loop: one ``(content_type, path, timeout)`` job per message."""
+    import resource
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    settings.extraction_max_image_pixels = limits["max_image_pixels"]
+    if limits["memory_bytes"] > 0:
+        cap = limits["memory_bytes"]
+        resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        if limits["cpu_seconds"] > 0:
+            _limit_cpu(limits["cpu_seconds"])
+        try:
+            reply: tuple = ("ok", _run_job(conn, *job))
+        except ExtractionFailed as exc:
+            reply = ("failed", exc.kind, str(exc))
+        except MemoryError:
+            reply = ("failed", "oom", "Out of memory")
+        except deadlines.RequestCancelled:
+            reply = ("cancelled",)
+        except Exception as exc:
+            reply = ("error", _portable(exc))
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send(("failed", "oom", "Out of memory"))
+        if reply[0] == "failed" and reply[1] == "oom":
+            # The heap may be fragmented or half-freed: start afresh.
+            return
+
+
+def _classify_exit(exitcode: int | None) -> tuple[str, str]:
+    """Failure kind and message for a worker that died mid-document."""
+    if exitcode == -signal.SIGXCPU:
+        return "timeout", "CPU time limit exceeded"
+    if exitcode == -signal.SIGKILL:
+        # Nothing here sends SIGKILL without saying so: the kernel OOM killer.
+        return "oom", "Worker killed, likely out of memory"
+    if exitcode is not None and exitcode < 0:
+        return "crash", f"Worker died from {signal.Signals(-exitcode).name}"
+    return "crash", f"Worker exited with code {exitcode}"
+
+
+class _Worker:
+    """One sandboxed child process and its end of the pipe."""
+
+    def __init__(self, ctx, limits: dict[str, int]) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, limits), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    @property
+    def pid(self) -> int | None:
+        return self.process.pid
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self, timeout: float = 5) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def _receive(
+        self, expires_at: float | None, deadline: deadlines.Deadline | None
+    ) -> tuple:
+        """The next message from the child; kills it on any limit."""
+        while not self.conn.poll(deadlines.POLL_SECONDS):
+            if not self.process.is_alive():
+                break
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self.kill()
+                raise ExtractionFailed(
+                    "timeout",
+                    "Extraction exceeded "
+                    f"{settings.extraction_wall_seconds:g}s wall-clock limit",
+                )
+            if deadline is not None and deadline.done:
+                self.kill()
+                deadline.check()
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join()
+            raise ExtractionFailed(*_classify_exit(self.process.exitcode))
+
+    def stream(
+        self,
+        content_type: str,
+        path: str,
+        meta: dict[str, Any],
+        deadline: deadlines.Deadline | None,
+    ) -> Iterator[Segment]:
+        """Run one job, yielding its segments; any limit leaves the worker dead."""
+        self.jobs += 1
+        self.conn.send(
+            (content_type, path, None if deadline is None else deadline.remaining())
+        )
+        wall = settings.extraction_wall_seconds
+        expires_at = time.monotonic() + wall if wall > 0 else None
+        while True:
+            reply = self._receive(expires_at, deadline)
+            if reply[0] == "segment":
+                yield Segment(reply[1], page=reply[2], meta=reply[3])
+                continue
+            if reply[0] == "ok":
+                meta.update(reply[1])
+                return
+            if reply[0] == "failed":
+                raise ExtractionFailed(reply[1], reply[2])
+            if reply[0] == "cancelled":
+                if deadline is not None:
+                    deadline.check()
+                raise deadlines.DeadlineExceeded()
+            raise reply[1]
+
+
+class SandboxPool:
+    """A fixed number of sandboxed workers, started on demand and recycled."""
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(["app.services.extraction.factory"])
+        self._idle: list[_Worker] = []
+        self._busy: set[_Worker] = set()
+        self._started = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def pids(self) -> list[int]:
+        with self._cond:
+            return [w.pid for w in [*self._idle, *self._busy] if w.pid is not None]
+
+    def _limits(self) -> dict[str, int]:
+        return {
+            "memory_bytes": settings.extraction_memory_limit_mb * 1024 * 1024,
+            "cpu_seconds": settings.extraction_cpu_seconds,
+            "max_image_pixels": settings.extraction_max_image_pixels,
+        }
+
+    def _checkout(self) -> _Worker:
+        deadline = deadlines.current()
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Extraction pool is shut down")
+                if self._idle:
+                    worker = self._idle.pop()
+                    if not worker.process.is_alive():
+                        # Died while idle (e.g. the OOM killer); replace it.
+                        worker.conn.close()
+                        self._started -= 1
+                        continue
+                    self._busy.add(worker)
+                    return worker
+                if self._started < self.size:
+                    self._started += 1
+                    break
+                self._cond.wait(deadlines.POLL_SECONDS)
+                if deadline is not None:
+                    deadline.check()
+        try:
+            worker = _Worker(self._ctx, self._limits())
+        except BaseException:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            raise
+        logger.info("extraction.worker.start pid=%s", worker.pid)
+        with self._cond:
+            self._busy.add(worker)
+        return worker
+
+    def _checkin(self, worker: _Worker) -> None:
+        alive = worker.process.is_alive()
+        recycle = alive and worker.jobs >= settings.extraction_worker_max_jobs
+        with self._cond:
+            self._busy.discard(worker)
+            keep = alive and not recycle and not self._closed
+            if keep:
+                self._idle.append(worker)
+            else:
+                self._started -= 1
+            self._cond.notify()
+        if keep:
+            return
+        if recycle:
+            metrics.incr("extraction.pool.recycled")
+            logger.info(
+                "extraction.worker.recycle pid=%s jobs=%s", worker.pid, worker.jobs
+            )
+        worker.stop()
+
+    def iter_segments(
+        self, content_type: str, path: str, meta: dict[str, Any]
+    ) -> Iterator[Segment]:
+        deadline = deadlines.current()
+        worker = self._checkout()
+        finished = False
+        try:
+            yield from worker.stream(content_type, path, meta, deadline)
+            finished = True
+        finally:
+            if not finished:
+                # Stopped mid-document: the child is still sending segments.
+                worker.kill()
+            self._checkin(worker)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            busy = list(self._busy)
+            self._cond.notify_all()
+        if wait:
+            for worker in idle:
+                worker.stop()
+            return
+        for worker in [*idle, *busy]:
+            worker.kill()
+
+
+def get_pool() -> SandboxPool | None:
+    """The shared pool, created on first use; ``None`` when extraction is inline."""
+    global _pool
+    if settings.extraction_pool_workers <= 0:
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = SandboxPool(settings.extraction_pool_workers)
+                logger.info(
+                    "extraction.pool.start workers=%s",
+                    settings.extraction_pool_workers,
+                )
+    return _pool
+
+
+def iter_segments(
+    content_type: str, path: str, meta: dict[str, Any]
+) -> Iterator[Segment]:
+    """Segments from the extractor for ``content_type``, pooled or inline.
+
+    ``meta`` is complete once they are exhausted. Segments cross from the
+    worker one at a time, so neither process holds the whole text. With a
+    request deadline, the child gets the time left; once the deadline is
+    done (or the client disconnects) the worker is killed and replaced.
+    Inline extraction has no sandbox, but image size limits still apply.
+    """
+    pool = get_pool()
+    t0 = time.perf_counter()
+    try:
+        if pool is None:
+            try:
+                yield from get_extractor(content_type).iter_segments(path, meta)
+            except MemoryError:
+                raise ExtractionFailed("oom", "Out of memory")
+            return
+        yield from pool.iter_segments(content_type, path, meta)
+    except ExtractionFailed as exc:
+        metrics.incr(f"extraction.failed.{exc.kind}")
+        logger.warning(
+            "extraction.failed type=%s failure=%s msg=%s",
+            content_type,
+            exc.kind,
+            str(exc),
+        )
+        raise
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    metrics.observe("extraction.pool.call", elapsed_ms)
+    meta.setdefault("sandbox", {})["wall_ms"] = round(elapsed_ms)
+
+
+def extract(content_type: str, path: str) -> ExtractionResult:
+    """The whole text and metadata; see :func:`iter_segments`."""
+    meta: dict[str, Any] = {}
+    text = join_segments(iter_segments(content_type, path, meta))
+    return ExtractionResult(text=text, meta=meta)
+
+
+def shutdown(wait: bool = True) -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+        logger.info("extraction.pool.stop")
@@ -0,0 +1,54 @@
+import codecs
+from typing import Any, Iterator
+
+from .base import Segment, SegmentedExtractor
+
+_CHUNK_SIZE = 1024 * 1024
+_SAMPLE_SIZE = 64 * 1024
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Guess the encoding from a leading sample: BOM, strict UTF-8, then heuristics."""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # A truncated multi-byte sequence at the end of the sample is fine.
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return "cp1252"
+    best = from_bytes(sample).best()
+    return best.encoding if best is not None else "cp1252"
+
+
+class TextExtractor(SegmentedExtractor):
+    """Decodes plain text in chunks after sniffing the encoding from the head."""
+
+    def iter_segments(self, file_path: str, meta: dict[str, Any]) -> Iterator[Segment]:
+        with open(file_path, "rb") as fh:
+            encoding = detect_encoding(fh.read(_SAMPLE_SIZE))
+            meta.update({"type": "text", "encoding": encoding})
+            fh.seek(0)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            chars = 0
+            while chunk := fh.read(_CHUNK_SIZE):
+                text = decoder.decode(chunk)
+                chars += len(text)
+                yield Segment(text)
+            text = decoder.decode(b"", final=True)
+            if text:
+                chars += len(text)
+                yield Segment(text)
+        meta["chars"] = chars
@@ -0,0 +1,53 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+
+from PIL import Image, ImageSequence
+
+from app.core import deadline as deadlines
+
+from . import ocr
+from .base import Segment, SegmentedExtractor
+from .image import ImageExtractor, check_pixels, open_image
+
+
+class TiffExtractor(SegmentedExtractor, ImageExtractor):
+    """OCRs every frame of a multi-page TIFF, several frames at a time.
+
+    Each OCR call runs its own tesseract process, so a thread pool
+    is enough to use several cores. At most ``2 * max_workers`` decoded frames
+    are held in memory at once. Frames run with the caller's request deadline;
+    once it is done no further frames are started.
+    """
+
+    def __init__(self, lang: str | None = None, max_workers: int = 4) -> None:
+        super().__init__(lang=lang)
+        self.max_workers = max(1, max_workers)
+
+    def _ocr(self, frame: Image.Image) -> str:
+        return ocr.image_to_string(frame, lang=self.lang)
+
+    def iter_segments(self, file_path: str, meta: dict[str, Any]) -> Iterator[Segment]:
+        pages = 0
+        with open_image(file_path) as image, ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as pool:
+            meta.update({"type": "tiff", "mode": image.mode, "size": image.size})
+            pending = []
+            try:
+                for frame in ImageSequence.Iterator(image):
+                    deadlines.check()
+                    check_pixels(frame)
+                    context = contextvars.copy_context()
+                    pending.append(pool.submit(context.run, self._ocr, frame.copy()))
+                    if len(pending) >= 2 * self.max_workers:
+                        pages += 1
+                        yield Segment(pending.pop(0).result(), page=pages)
+                while pending:
+                    pages += 1
+                    yield Segment(pending.pop(0).result(), page=pages)
+            finally:
+                # Also reached when the consumer stops early.
+                for future in pending:
+                    future.cancel()
+        meta["pages"] = pages
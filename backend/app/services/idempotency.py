@@ -0,0 +1,269 @@
+"""``Idempotency-Key`` support for POST endpoints that create or pay for work.
+
+The first request with a key claims it in ``idempotency_keys`` and runs. Its
+successful response is stored for ``idempotency_ttl_hours``; retries with the
+same key get it back with ``Idempotent-Replayed: true`` instead of a new
+document or another LLM call. A retry that arrives while the first request is
+still running waits for it (up to ``idempotency_wait_seconds``, then ``409``)
+and returns the same response; it only reads the row while it waits, and
+holds no admission slot, since handlers take one inside ``run``. A failed or
+cancelled request releases the key, so the next retry runs again. Reusing a
+key for a different request is ``422``.
+
+``raw_text`` is not stored: a replayed extraction omits it, and the text is
+read from ``GET /documents/{id}/text`` instead.
+
+Replays, attached retries and conflicts are counted as
+``idempotency.<endpoint>.<outcome>``; ``idempotency.suppressed`` counts every
+request that did not repeat the work.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import HTTPException, Response, UploadFile
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.model_exports import IdempotencyKey
+
+logger = logging.getLogger("app.services.idempotency")
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+MAX_KEY_LENGTH = 255
+# How often a retry looks at the original request's row while it waits.
+POLL_SECONDS = 0.2
+PURGE_INTERVAL_SECONDS = 60
+# Response headers worth replaying (ETag for record writes, and so on).
+_REPLAYED_HEADERS = ("etag", "location")
+# Response fields too large to keep per key; replays leave them out.
+_UNSTORED_FIELDS = ("raw_text",)
+_DIGEST_CHUNK = 1024 * 1024
+
+_purged_at = 0.0
+
+
+def fingerprint(*parts: Any) -> str:
+    """A stable hash of the request details that a key must keep matching."""
+    return sha256(orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+async def upload_digest(file: UploadFile) -> str:
+    """SHA-256 of an uploaded file's content; the file is rewound afterwards."""
+    digest = sha256()
+    while chunk := await file.read(_DIGEST_CHUNK):
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+def purge_expired(db: Session, now: datetime | None = None) -> int:
+    """Delete keys past their TTL; returns how many were removed."""
+    now = now or datetime.utcnow()
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+    db.commit()
+    if result.rowcount:
+        metrics.incr("idempotency.expired", result.rowcount)
+        logger.info("idempotency.purged count=%s", result.rowcount)
+    return result.rowcount
+
+
+def claim(
+    db: Session, scope: str, key: str, request_fingerprint: str
+) -> IdempotencyKey | None:
+    """Take the key for this request; the existing row when someone else holds it.
+
+    An expired row, or an in-progress one whose holder is long gone (a crashed
+    worker), is taken over.
+    """
+    global _purged_at
+    if time.monotonic() - _purged_at > PURGE_INTERVAL_SECONDS:
+        _purged_at = time.monotonic()
+        purge_expired(db)
+    now = datetime.utcnow()
+    values = {
+        "scope": scope,
+        "key": key,
+        "fingerprint": request_fingerprint,
+        "status": IN_PROGRESS,
+        "response_status": None,
+        "response_headers": None,
+        "response_body": None,
+        "locked_until": now + timedelta(seconds=settings.idempotency_lock_seconds),
+        "expires_at": now + timedelta(hours=settings.idempotency_ttl_hours),
+        "created_at": now,
+    }
+    stmt = pg_insert(IdempotencyKey).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+        set_={
+            name: stmt.excluded[name] for name in values if name not in ("scope", "key")
+        },
+        where=(IdempotencyKey.expires_at < now)
+        | (
+            (IdempotencyKey.status == IN_PROGRESS)
+            & (IdempotencyKey.locked_until < now)
+            & (IdempotencyKey.fingerprint == request_fingerprint)
+        ),
+    ).returning(IdempotencyKey.key)
+    while True:
+        owned = db.execute(stmt).first() is not None
+        db.commit()
+        if owned:
+            return None
+        row = current(db, scope, key)
+        if row is not None:
+            return row
+        # Released between the insert and the select: try again.
+
+
+def current(db: Session, scope: str, key: str) -> IdempotencyKey | None:
+    """The key's row as it is now, detached; ``None`` once it is released."""
+    row = db.execute(
+        select(IdempotencyKey).where(
+            IdempotencyKey.scope == scope, IdempotencyKey.key == key
+        )
+    ).scalar_one_or_none()
+    if row is not None:
+        # Later polls must see the row's current state, not this snapshot.
+        db.expunge(row)
+    db.commit()
+    return row
+
+
+def _claimable(row: IdempotencyKey | None, request_fingerprint: str) -> bool:
+    """Whether ``claim`` would now hand the key to this request."""
+    if row is None:
+        return True
+    now = datetime.utcnow()
+    return row.expires_at < now or (
+        row.status == IN_PROGRESS
+        and row.locked_until < now
+        and row.fingerprint == request_fingerprint
+    )
+
+
+def complete(db: Session, scope: str, key: str, response: Response) -> None:
+    headers = {
+        name: response.headers[name]
+        for name in _REPLAYED_HEADERS
+        if name in response.headers
+    }
+    body = orjson.loads(response.body)
+    if isinstance(body, dict):
+        for name in _UNSTORED_FIELDS:
+            body.pop(name, None)
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .values(
+            status=COMPLETED,
+            response_status=response.status_code,
+            response_headers=headers,
+            response_body=body,
+        )
+    )
+    db.commit()
+
+
+def release(db: Session, scope: str, key: str) -> None:
+    """Forget an in-progress key whose request failed, so a retry runs again."""
+    db.rollback()
+    db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == IN_PROGRESS,
+        )
+    )
+    db.commit()
+
+
+def _replay(row: IdempotencyKey) -> ORJSONResponse:
+    headers = dict(row.response_headers or {})
+    headers["Idempotent-Replayed"] = "true"
+    return ORJSONResponse(
+        row.response_body, status_code=row.response_status or 200, headers=headers
+    )
+
+
+def _count(endpoint: str, outcome: str) -> None:
+    metrics.incr(f"idempotency.{endpoint}.{outcome}")
+    if outcome in ("replayed", "attached"):
+        metrics.incr("idempotency.suppressed")
+
+
+async def handle(
+    db: Session,
+    key: str | None,
+    scope: str,
+    endpoint: str,
+    request_fingerprint: str,
+    run: Callable[[], Awaitable[Response]],
+    wait_seconds: float | None = None,
+) -> Response:
+    """Run ``run`` at most once per ``key``; without a key just run it."""
+    if key is None or not settings.idempotency_enabled:
+        return await run()
+    if not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters",
+        )
+    if wait_seconds is None:
+        wait_seconds = settings.idempotency_wait_seconds
+    give_up_at = time.monotonic() + wait_seconds
+    attached = False
+    row = await run_in_threadpool(claim, db, scope, key, request_fingerprint)
+    while row is not None:
+        if row.fingerprint != request_fingerprint:
+            _count(endpoint, "mismatch")
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        if row.status == COMPLETED:
+            _count(endpoint, "attached" if attached else "replayed")
+            logger.info("idempotency.replay scope=%s attached=%s", scope, attached)
+            return _replay(row)
+        if not attached:
+            attached = True
+            logger.info("idempotency.wait scope=%s", scope)
+        if time.monotonic() >= give_up_at:
+            _count(endpoint, "conflict")
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        await asyncio.sleep(POLL_SECONDS)
+        row = await run_in_threadpool(current, db, scope, key)
+        if _claimable(row, request_fingerprint):
+            row = await run_in_threadpool(claim, db, scope, key, request_fingerprint)
+
+    if attached:
+        # The original failed and released the key; this retry does the work.
+        logger.info("idempotency.takeover scope=%s", scope)
+    try:
+        response = await run()
+    except BaseException:
+        await run_in_threadpool(release, db, scope, key)
+        raise
+    if response.status_code >= 400:
+        await run_in_threadpool(release, db, scope, key)
+    else:
+        await run_in_threadpool(complete, db, scope, key, response)
+    return response
@@ -0,0 +1,214 @@
+"""RFC 6902 JSON Patch: diff two documents and apply patches.
+
+Documents are plain JSON values (dict, list, str, int, float, bool, None).
+``diff`` produces ``add``/``remove``/``replace`` operations; ``apply``
+supports the full operation set, including ``move``, ``copy`` and ``test``.
+``merge`` applies an RFC 7396 merge patch.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+Patch = list[dict[str, Any]]
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch is malformed or cannot be applied."""
+
+
+def escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def parse_pointer(pointer: str) -> list[str]:
+    """Split an RFC 6901 pointer into unescaped reference tokens."""
+    if not isinstance(pointer, str):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def equal(a: Any, b: Any) -> bool:
+    """JSON equality: values of different JSON types never match (RFC 6902 4.6).
+
+    Unlike ``==``, ``true`` is not ``1``; ``1`` and ``1.0`` are the same number.
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(equal, a, b))
+    return type(a) is type(b) and a == b
+
+
+def diff(old: Any, new: Any, path: str = "") -> Patch:
+    """Operations that turn ``old`` into ``new``."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    if isinstance(old, dict):
+        ops: Patch = []
+        for key in old:
+            child = f"{path}/{escape(key)}"
+            if key not in new:
+                ops.append({"op": "remove", "path": child})
+            else:
+                ops.extend(diff(old[key], new[key], child))
+        for key in new:
+            if key not in old:
+                ops.append(
+                    {
+                        "op": "add",
+                        "path": f"{path}/{escape(key)}",
+                        "value": copy.deepcopy(new[key]),
+                    }
+                )
+        return ops
+    if isinstance(old, list):
+        return _diff_list(old, new, path)
+    if old != new:
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    return []
+
+
+def _diff_list(old: list, new: list, path: str) -> Patch:
+    # Trim the common prefix and suffix, then diff the middle by position.
+    start = 0
+    while start < len(old) and start < len(new) and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+
+    ops: Patch = []
+    common = min(end_old, end_new)
+    for i in range(start, common):
+        ops.extend(diff(old[i], new[i], f"{path}/{i}"))
+    # Removals go from the back so earlier indices stay valid.
+    for i in range(end_old - 1, common - 1, -1):
+        ops.append({"op": "remove", "path": f"{path}/{i}"})
+    for i in range(common, end_new):
+        ops.append({"op": "add", "path": f"{path}/{i}", "value": copy.deepcopy(new[i])})
+    return ops
+
+
+def _resolve(doc: Any, tokens: list[str]) -> Any:
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return doc
+
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _add(doc: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to a scalar at /{'/'.join(tokens)}")
+    return doc
+
+
+def _remove(doc: Any, tokens: list[str]) -> tuple[Any, Any]:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        return doc, parent.pop(key)
+    if isinstance(parent, list):
+        return doc, parent.pop(_index(parent, key, allow_end=False))
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_operation(doc: Any, operation: dict[str, Any]) -> Any:
+    """Apply one operation in place where possible; returns the new document."""
+    try:
+        op = operation["op"]
+        tokens = parse_pointer(operation["path"])
+    except (KeyError, TypeError):
+        raise JsonPatchError(f"Malformed operation: {operation!r}")
+
+    if op in ("add", "replace", "test") and "value" not in operation:
+        raise JsonPatchError(f"'{op}' requires a value")
+    if op == "add":
+        return _add(doc, tokens, copy.deepcopy(operation["value"]))
+    if op == "remove":
+        return _remove(doc, tokens)[0]
+    if op == "replace":
+        _resolve(doc, tokens)
+        if not tokens:
+            return copy.deepcopy(operation["value"])
+        doc, _ = _remove(doc, tokens)
+        return _add(doc, tokens, copy.deepcopy(operation["value"]))
+    if op in ("move", "copy"):
+        if "from" not in operation:
+            raise JsonPatchError(f"'{op}' requires 'from'")
+        source = parse_pointer(operation["from"])
+        if op == "move":
+            if tokens[: len(source)] == source and tokens != source:
+                raise JsonPatchError("Cannot move a value into its own child")
+            doc, value = _remove(doc, source)
+        else:
+            value = copy.deepcopy(_resolve(doc, source))
+        return _add(doc, tokens, value)
+    if op == "test":
+        if not equal(_resolve(doc, tokens), operation["value"]):
+            raise JsonPatchError(f"Test failed at {operation['path']}")
+        return doc
+    raise JsonPatchError(f"Unknown operation: {op!r}")
+
+
+def apply(doc: Any, patch: Patch) -> Any:
+    """Return ``doc`` with ``patch`` applied; ``doc`` itself is not modified."""
+    if not isinstance(patch, list):
+        raise JsonPatchError("A JSON patch must be a list of operations")
+    result = copy.deepcopy(doc)
+    for operation in patch:
+        result = apply_operation(result, operation)
+    return result
+
+
+def merge(doc: Any, patch: Any) -> Any:
+    """Return ``doc`` with the merge patch applied; ``doc`` itself is not modified."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(doc) if isinstance(doc, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge(result.get(key), value)
+    return result
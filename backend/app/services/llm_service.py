@@ -4,17 +4,24 @@ import asyncio
 import json
 import logging
 import time
+import weakref
+from dataclasses import dataclass
 from hashlib import sha256
-from typing import Optional
-
-import openai
-from pydantic import ValidationError
+from typing import Any, Awaitable, Callable, Optional, TypeVar
 
+from app.core import deadline as deadlines
+from app.core import scheduler
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.schemas.veterinary_record import VeterinaryRecordSchema
+from app.services import record_repair
 
 logger = logging.getLogger("app.services.llm")
 
+# Bump when the extraction prompt or model changes; stored with each record so
+# ``python -m app.backfill --stale`` can find records produced by older ones.
+PROMPT_VERSION = "2026-01-gpt-4o-mini-v1"
+
 
 class LLMExtractionError(Exception):
     """Raised when LLM extraction fails."""
@@ -33,100 +40,365 @@ class RetryConfig:
         self.timeout = timeout
 
 
-async def call_openai_with_retry(
+SYSTEM_PROMPT = "You are an expert veterinary medical record parser. Extract structured data from veterinary documents with high accuracy."
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class LLMProvider:
+    """An OpenAI-compatible ``chat.completions`` endpoint and model."""
+
+    name: str
+    model: str
+    base_url: str | None = None
+    api_key: str = ""
+
+    @property
+    def latency_metric(self) -> str:
+        return f"llm.provider.{self.name}.latency_ms"
+
+    def client(self):
+        """This event loop's client for the provider, created on first use."""
+        clients = _clients.setdefault(asyncio.get_running_loop(), {})
+        if self not in clients:
+            import openai
+
+            # Retries, timeouts and hedging happen here, not in the SDK.
+            clients[self] = openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0
+            )
+        return clients[self]
+
+
+# Clients are reused so keep-alive connections survive between calls. They
+# are kept per event loop because an HTTP connection pool cannot move loops.
+_clients: weakref.WeakKeyDictionary[Any, dict[LLMProvider, Any]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def close_clients() -> None:
+    """Close the running loop's provider clients; called on shutdown."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+
+
+def configured_providers(model: str | None = None) -> list[LLMProvider]:
+    """The primary endpoint followed by ``settings.llm_providers``."""
+    providers = [
+        LLMProvider(
+            "primary",
+            model or settings.llm_model,
+            settings.openai_base_url,
+            settings.openai_api_key,
+        )
+    ]
+    for i, extra in enumerate(settings.llm_providers, start=1):
+        providers.append(
+            LLMProvider(
+                extra.get("name") or f"fallback{i}",
+                extra.get("model") or settings.llm_model,
+                extra.get("base_url"),
+                extra.get("api_key") or settings.openai_api_key,
+            )
+        )
+    return providers
+
+
+def hedge_delay(provider: LLMProvider, timeout: float) -> float | None:
+    """Seconds to wait before a second request, or None to never hedge.
+
+    The provider's observed latency quantile (p95 by default), once it has
+    enough samples; a conservative fixed delay before that.
+    """
+    if not settings.llm_hedge_enabled:
+        return None
+    if metrics.timing_count(provider.latency_metric) < settings.llm_hedge_min_samples:
+        delay_ms = float(settings.llm_hedge_initial_delay_ms)
+    else:
+        observed = metrics.quantile(
+            provider.latency_metric, settings.llm_hedge_quantile
+        )
+        delay_ms = max(float(settings.llm_hedge_min_delay_ms), observed or 0.0)
+    delay = delay_ms / 1000
+    return delay if delay < timeout else None
+
+
+async def _complete(
+    provider: LLMProvider,
+    client,
     prompt: str,
-    model: str = "gpt-4o-mini",
-    retry_config: Optional[RetryConfig] = None,
-    temperature: float = 0.2,
+    temperature: float,
+    timeout: float,
+    response_format: dict[str, Any],
 ) -> str:
-    """Call OpenAI API with retry and error handling."""
-    if retry_config is None:
-        retry_config = RetryConfig()
+    t0 = time.perf_counter()
+    cancelled = False
+    try:
+        response = await asyncio.wait_for(
+            client.chat.completions.create(
+                model=provider.model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=temperature,
+                response_format=response_format,
+            ),
+            timeout=timeout,
+        )
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        # Timeouts and errors count too, so a slowing provider raises the p95
+        # that hedging waits for. A cancelled call (a hedge lost) says nothing.
+        if not cancelled:
+            metrics.observe(provider.latency_metric, (time.perf_counter() - t0) * 1000)
+    return response.choices[0].message.content
 
-    client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
 
-    prompt_len = len(prompt)
-    prompt_hash = sha256(prompt.encode("utf-8")).hexdigest()[:8]
-    if settings.llm_debug_logs:
-        logger.info(
-            "llm.call.start model=%s temp=%.2f timeout=%s retries=%s prompt_len=%s prompt_hash=%s",
-            model,
+async def _hedged(
+    provider: LLMProvider,
+    start: Callable[[], Awaitable[str]],
+    parse: Callable[[str], T],
+    delay: float | None,
+) -> T:
+    """First response that ``parse`` accepts; a second request starts after ``delay``.
+
+    Errors from one request are only raised once no other request is in flight.
+    """
+    first = asyncio.ensure_future(start())
+    pending = {first}
+    hedged = False
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if hedged else delay,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                hedged = True
+                metrics.incr(f"llm.provider.{provider.name}.hedged")
+                logger.info(
+                    "llm.hedge.fire provider=%s delay_ms=%d",
+                    provider.name,
+                    delay * 1000,
+                )
+                pending.add(asyncio.ensure_future(start()))
+                continue
+            for task in done:
+                try:
+                    result = parse(task.result())
+                except Exception as exc:
+                    error = exc
+                    continue
+                if task is not first:
+                    metrics.incr(f"llm.provider.{provider.name}.hedge_won")
+                return result
+            if not hedged:
+                break
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _call_provider(
+    provider: LLMProvider,
+    prompt: str,
+    parse: Callable[[str], T],
+    retry_config: RetryConfig,
+    temperature: float,
+    response_format: dict[str, Any],
+) -> T:
+    import openai
+
+    client = provider.client()
+
+    def start() -> Awaitable[str]:
+        return _complete(
+            provider,
+            client,
+            prompt,
             temperature,
             retry_config.timeout,
-            retry_config.max_retries,
-            prompt_len,
-            prompt_hash,
+            response_format,
         )
 
     for attempt in range(retry_config.max_retries):
         try:
             t0 = time.monotonic()
-            response = await asyncio.wait_for(
-                client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert veterinary medical record parser. Extract structured data from veterinary documents with high accuracy.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=temperature,
-                    response_format={"type": "json_object"},
-                ),
-                timeout=retry_config.timeout,
-            )
-            dt = time.monotonic() - t0
-            content = response.choices[0].message.content
+            delay = hedge_delay(provider, retry_config.timeout)
+            result = await _hedged(provider, start, parse, delay)
             if settings.llm_debug_logs:
                 logger.info(
-                    "llm.call.success attempt=%s duration_ms=%d response_len=%s",
+                    "llm.call.success provider=%s attempt=%s duration_ms=%d",
+                    provider.name,
                     attempt + 1,
-                    int(dt * 1000),
-                    len(content or ""),
+                    int((time.monotonic() - t0) * 1000),
                 )
-            return content
+            return result
 
         except asyncio.TimeoutError:
+            metrics.incr(f"llm.provider.{provider.name}.timeouts")
             if settings.llm_debug_logs:
                 logger.warning(
-                    "llm.call.timeout attempt=%s of %s",
+                    "llm.call.timeout provider=%s attempt=%s of %s",
+                    provider.name,
                     attempt + 1,
                     retry_config.max_retries,
                 )
             if attempt < retry_config.max_retries - 1:
-                wait_time = retry_config.backoff_factor * (2**attempt)
-                await asyncio.sleep(wait_time)
+                await asyncio.sleep(retry_config.backoff_factor * (2**attempt))
                 continue
             raise LLMExtractionError(
                 f"OpenAI request timed out after {retry_config.max_retries} retries"
             )
 
+        except openai.AuthenticationError as e:
+            metrics.incr(f"llm.provider.{provider.name}.errors")
+            if settings.llm_debug_logs:
+                logger.error(
+                    "llm.call.auth_error provider=%s msg=%s", provider.name, str(e)
+                )
+            raise LLMExtractionError(f"OpenAI authentication error: {str(e)}")
+
         except (openai.APIError, openai.RateLimitError, openai.APIConnectionError) as e:
+            metrics.incr(f"llm.provider.{provider.name}.errors")
             if settings.llm_debug_logs:
                 logger.warning(
-                    "llm.call.error attempt=%s of %s type=%s msg=%s",
+                    "llm.call.error provider=%s attempt=%s of %s type=%s msg=%s",
+                    provider.name,
                     attempt + 1,
                     retry_config.max_retries,
                     e.__class__.__name__,
                     str(e),
                 )
             if attempt < retry_config.max_retries - 1:
-                wait_time = retry_config.backoff_factor * (2**attempt)
-                await asyncio.sleep(wait_time)
+                await asyncio.sleep(retry_config.backoff_factor * (2**attempt))
                 continue
             raise LLMExtractionError(f"OpenAI API error: {str(e)}")
 
-        except openai.AuthenticationError as e:
-            if settings.llm_debug_logs:
-                logger.error("llm.call.auth_error msg=%s", str(e))
-            raise LLMExtractionError(f"OpenAI authentication error: {str(e)}")
-
     raise LLMExtractionError(
         f"Failed to extract data after {retry_config.max_retries} attempts"
     )
 
 
+async def call_llm(
+    prompt: str,
+    parse: Callable[[str], T],
+    retry_config: Optional[RetryConfig] = None,
+    temperature: float = 0.2,
+    providers: Optional[list[LLMProvider]] = None,
+    response_format: Optional[dict[str, Any]] = None,
+) -> T:
+    """Call the configured providers in order until one gives a parseable response.
+
+    Later providers are only tried when ``settings.llm_fallback_on_error`` is
+    set. ``parse`` raises :class:`LLMExtractionError` for responses it rejects.
+    ``response_format`` defaults to a plain JSON object.
+    """
+    if response_format is None:
+        response_format = {"type": "json_object"}
+    if retry_config is None:
+        retry_config = RetryConfig(
+            max_retries=settings.llm_max_retries, timeout=settings.llm_timeout_seconds
+        )
+    chain = providers or configured_providers()
+    if not settings.llm_fallback_on_error:
+        chain = chain[:1]
+
+    prompt_hash = sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    if settings.llm_debug_logs:
+        logger.info(
+            "llm.call.start providers=%s temp=%.2f timeout=%s retries=%s prompt_len=%s prompt_hash=%s",
+            ",".join(p.name for p in chain),
+            temperature,
+            retry_config.timeout,
+            retry_config.max_retries,
+            len(prompt),
+            prompt_hash,
+        )
+
+    deadline = deadlines.current()
+    if deadline is None:
+        return await _scheduled_chain(
+            chain, prompt, parse, retry_config, temperature, response_format
+        )
+    try:
+        # Cancels the HTTP request in flight, not just the wait for it.
+        return await deadline.guard(
+            _scheduled_chain(
+                chain, prompt, parse, retry_config, temperature, response_format
+            )
+        )
+    except deadlines.RequestCancelled as exc:
+        metrics.incr("llm.cancelled")
+        logger.warning(
+            "llm.call.cancelled reason=%s prompt_hash=%s", exc.reason, prompt_hash
+        )
+        raise
+
+
+async def _scheduled_chain(*args: Any) -> Any:
+    """``_call_chain`` once the request's priority class gets an LLM slot."""
+    async with scheduler.slot_async("llm"):
+        return await _call_chain(*args)
+
+
+async def _call_chain(
+    chain: list[LLMProvider],
+    prompt: str,
+    parse: Callable[[str], T],
+    retry_config: RetryConfig,
+    temperature: float,
+    response_format: dict[str, Any],
+) -> T:
+    for index, provider in enumerate(chain):
+        try:
+            result = await _call_provider(
+                provider, prompt, parse, retry_config, temperature, response_format
+            )
+        except LLMExtractionError as exc:
+            metrics.incr(f"llm.provider.{provider.name}.failed")
+            if index == len(chain) - 1:
+                raise
+            logger.warning(
+                "llm.fallback from=%s to=%s msg=%s",
+                provider.name,
+                chain[index + 1].name,
+                str(exc),
+            )
+            continue
+        if index:
+            metrics.incr("llm.fallback.used")
+        return result
+    raise LLMExtractionError("No LLM provider configured")
+
+
+async def call_openai_with_retry(
+    prompt: str,
+    model: Optional[str] = None,
+    retry_config: Optional[RetryConfig] = None,
+    temperature: float = 0.2,
+) -> str:
+    """Raw completion text from the configured providers."""
+    return await call_llm(
+        prompt,
+        lambda text: text,
+        retry_config=retry_config,
+        temperature=temperature,
+        providers=configured_providers(model),
+    )
+
+
 def extract_structured_record(raw_text: str) -> VeterinaryRecordSchema:
     """Extract structured veterinary record from raw text using LLM."""
     return asyncio.run(_extract_structured_record_impl(raw_text))
@@ -162,20 +434,142 @@ Ensure all fields are accurate and properly categorized. Use null for missing in
 Text to extract:
 {raw_text}"""
 
-    try:
+    response_format = None
+    if settings.llm_structured_outputs:
+        response_format = record_repair.response_format()
+    result = await call_llm(prompt, _parse_response, response_format=response_format)
+    followed_up = result.record is None
+    if followed_up:
+        result = await _follow_up(raw_text, result)
+    if result.fixes:
+        metrics.incr("llm.repair.repaired")
+        for kind in result.fixes:
+            metrics.incr(f"llm.repair.fix.{kind}")
+        if result.rescued and not followed_up:
+            # Without local repair this response would have cost a new call.
+            metrics.incr("llm.repair.recalls_avoided")
         if settings.llm_debug_logs:
-            logger.info("llm.parse.start")
-        response_text = await call_openai_with_retry(prompt)
-        extracted_data = json.loads(response_text)
-        record = VeterinaryRecordSchema(**extracted_data)
-        if settings.llm_debug_logs:
-            logger.info("llm.parse.success")
-        return record
-    except json.JSONDecodeError as e:
+            logger.info("llm.repair.applied fixes=%s", ",".join(result.fixes))
+    return result.record
+
+
+def update_structured_record(
+    prior: dict[str, Any], changed_text: str
+) -> VeterinaryRecordSchema:
+    """Update a near duplicate's record from only the pages that changed."""
+    return asyncio.run(update_structured_record_async(prior, changed_text))
+
+
+async def update_structured_record_async(
+    prior: dict[str, Any], changed_text: str
+) -> VeterinaryRecordSchema:
+    """Async variant of the warm-start update; returns the complete record."""
+    prompt = f"""Below is a veterinary medical record extracted from an earlier version of a document, followed by the pages of the new version that differ from it.
+Return the complete record for the new version as a JSON object with the same structure: keep what the changed pages do not contradict, update or add what they say, and remove nothing else.
+
+Earlier record:
+{json.dumps(prior, ensure_ascii=False)}
+
+Changed pages:
+{changed_text}"""
+    response_format = None
+    if settings.llm_structured_outputs:
+        response_format = record_repair.response_format()
+    result = await call_llm(prompt, _parse_response, response_format=response_format)
+    if result.record is None:
+        result = await _follow_up(changed_text, result)
+    for kind in result.fixes:
+        metrics.incr(f"llm.repair.fix.{kind}")
+    return result.record
+
+
+def extract_fields(text: str, fields: list[str]) -> dict[str, Any]:
+    """Re-extract only ``fields`` from ``text``, usually a window of pages."""
+    return asyncio.run(extract_fields_async(text, fields))
+
+
+async def extract_fields_async(text: str, fields: list[str]) -> dict[str, Any]:
+    """Async variant of field re-extraction; returns the values as JSON data."""
+    prompt = f"""Extract only these fields of a veterinary medical record from the text below.
+Return a JSON object with exactly these keys:
+{record_repair.field_template(fields)}
+
+Use null for missing information. Include every item found.
+
+Text to extract:
+{text}"""
+    response_format = None
+    if settings.llm_structured_outputs:
+        response_format = record_repair.response_format(frozenset(fields))
+    data, fixes = await call_llm(prompt, _load_object, response_format=response_format)
+    result = record_repair.repair_fields(data, fields)
+    if result.errors:
+        raise LLMExtractionError(
+            f"Extracted data validation failed: {_describe_errors(result.errors)}"
+        )
+    for kind in fixes + result.fixes:
+        metrics.incr(f"llm.repair.fix.{kind}")
+    return result.data
+
+
+def _load_object(response_text: str) -> tuple[dict[str, Any], list[str]]:
+    try:
+        data, fixes = record_repair.load_json(response_text)
+    except ValueError as e:
         if settings.llm_debug_logs:
             logger.error("llm.parse.json_error msg=%s", str(e))
         raise LLMExtractionError(f"Failed to parse LLM response as JSON: {str(e)}")
-    except ValidationError as e:
+    if not isinstance(data, dict):
+        raise LLMExtractionError("Failed to parse LLM response as JSON: not an object")
+    return data, fixes
+
+
+def _parse_response(response_text: str) -> record_repair.Repaired:
+    if settings.llm_debug_logs:
+        logger.info("llm.parse.start")
+    data, fixes = _load_object(response_text)
+    result = record_repair.repair(data)
+    result.fixes[:0] = fixes
+    result.rescued = result.rescued or bool(fixes)
+    return result
+
+
+def _describe_errors(errors: list[dict[str, Any]]) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in errors
+    )
+
+
+async def _follow_up(
+    raw_text: str, first: record_repair.Repaired
+) -> record_repair.Repaired:
+    """Re-request only the fields that failed validation and merge them in."""
+    fields = first.failing_fields
+    metrics.incr("llm.repair.followup")
+    if settings.llm_debug_logs:
+        logger.info("llm.repair.followup fields=%s", ",".join(fields))
+    prompt = f"""These fields of a veterinary record extracted from the text below are invalid:
+{_describe_errors(first.errors[:20])}
+
+Re-extract them from the text. Return a JSON object with only these keys: {", ".join(fields)}.
+Use null for missing information.
+
+Text to extract:
+{raw_text}"""
+    response_format = None
+    if settings.llm_structured_outputs:
+        response_format = record_repair.response_format(frozenset(fields))
+    update, fixes = await call_llm(
+        prompt, _load_object, response_format=response_format
+    )
+    merged = {**first.data, **{k: v for k, v in update.items() if k in fields}}
+    result = record_repair.repair(merged)
+    result.fixes[:0] = first.fixes + fixes
+    if result.record is None:
+        metrics.incr("llm.repair.failed")
+        message = _describe_errors(result.errors)
         if settings.llm_debug_logs:
-            logger.error("llm.parse.validation_error msg=%s", str(e))
-        raise LLMExtractionError(f"Extracted data validation failed: {str(e)}")
+            logger.error("llm.parse.validation_error msg=%s", message)
+        raise LLMExtractionError(f"Extracted data validation failed: {message}")
+    metrics.incr("llm.repair.followup_succeeded")
+    return result
@@ -0,0 +1,324 @@
+"""Near-duplicate documents by MinHash over extracted text, indexed with LSH.
+
+Clinics re-send the same history re-scanned or re-exported with a new date
+stamp: the bytes differ but the text barely does. Each document's text is cut
+into word 5-gram shingles and summarized by a 128-value MinHash signature,
+computed with one-permutation hashing (one hash per shingle, one bin per
+value, empty bins densified from their neighbours) so long documents cost a
+single pass. The share of equal values estimates the Jaccard similarity of
+two documents' shingle sets.
+
+Signatures are split into 16 bands of 8 values; each band is hashed into a
+bucket in ``document_lsh_bands``. Documents that share a bucket are
+candidates, and are kept when their signatures agree on at least
+``near_duplicate_threshold`` of the values. With these bands a pair at 0.9
+similarity shares a bucket with probability > 0.99; one at 0.5, about 6%.
+
+Each page also keeps a digest of its normalized text and a 32-value MinHash
+sketch over word 3-grams. A page whose digest is in the near duplicate is
+unchanged. One whose sketch agrees with a page of the near duplicate on at
+least ``near_duplicate_page_threshold`` of the values (found through 16
+two-value bands) is edited, so a date stamp or OCR noise on every page still
+only sends the new lines of each page to the LLM.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import re
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from hashlib import blake2b
+from typing import Any, Iterable
+
+from sqlalchemy import delete, exists, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.model_exports import DocumentLSHBand, DocumentSignature, StructuredRecord
+
+logger = logging.getLogger("app.services.near_duplicates")
+
+NUM_HASHES = 128
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_WORDS = 5
+# Documents sharing the most buckets are compared first; boilerplate that
+# lands in huge buckets cannot make a lookup compare thousands of signatures.
+MAX_CANDIDATES = 50
+PAGE_HASHES = 32
+PAGE_BANDS = 16
+PAGE_SHINGLE_WORDS = 3
+
+_MASK32 = 0xFFFFFFFF
+_BIN_BITS = NUM_HASHES.bit_length() - 1
+_PAGE_BIN_BITS = PAGE_HASHES.bit_length() - 1
+# Odd constant that offsets values borrowed by empty bins, per distance.
+_DENSIFY_STEP = 0x9E3779B1
+_TOKEN = re.compile(r"\w+")
+_SIGNATURE = struct.Struct(f"<{NUM_HASHES}I")
+_BAND = struct.Struct(f"<{ROWS}I")
+_PAGE_SKETCH = struct.Struct(f"<{PAGE_HASHES}I")
+
+
+@dataclass
+class Fingerprint:
+    minhash: list[int]
+    # ``[digest, sketch]`` per page; a bare digest in rows written before sketches.
+    page_digests: list[Any]
+
+
+@dataclass
+class Match:
+    document_id: str
+    similarity: float
+    page_digests: list[Any]
+
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def _densify(bins: list[int | None]) -> list[int]:
+    """Fill empty bins from the next non-empty bin to the right (circularly)."""
+    size = len(bins)
+    filled = [b for b in bins if b is not None]
+    if len(filled) == size:
+        return filled  # type: ignore[return-value]
+    signature = []
+    for i in range(size):
+        distance = 0
+        while bins[(i + distance) % size] is None:
+            distance += 1
+        value = bins[(i + distance) % size]
+        signature.append((value + distance * _DENSIFY_STEP) & _MASK32)
+    return signature
+
+
+def _page_sketch(tokens: list[str]) -> str:
+    """MinHash of a page's word 3-grams, packed and base64-encoded; "" if empty."""
+    if not tokens:
+        return ""
+    bins: list[int | None] = [None] * PAGE_HASHES
+    last = max(len(tokens) - PAGE_SHINGLE_WORDS, 0)
+    for start in range(last + 1):
+        h = _hash64(" ".join(tokens[start : start + PAGE_SHINGLE_WORDS]))
+        i, value = h & (PAGE_HASHES - 1), (h >> _PAGE_BIN_BITS) & _MASK32
+        current = bins[i]
+        if current is None or value < current:
+            bins[i] = value
+    return base64.b64encode(_PAGE_SKETCH.pack(*_densify(bins))).decode()
+
+
+def fingerprint(pages: Iterable[str]) -> Fingerprint | None:
+    """Signature and page digests of a document's pages; None without words."""
+    bins: list[int | None] = [None] * NUM_HASHES
+    digests = []
+    window: list[str] = []
+    shingles = 0
+    for text in pages:
+        tokens = _TOKEN.findall(text.lower())
+        digest = blake2b(" ".join(tokens).encode(), digest_size=16).hexdigest()
+        digests.append([digest, _page_sketch(tokens)])
+        # Shingles run across page boundaries, as the text does.
+        for token in tokens:
+            window.append(token)
+            if len(window) > SHINGLE_WORDS:
+                del window[0]
+            if len(window) == SHINGLE_WORDS:
+                shingles += 1
+                h = _hash64(" ".join(window))
+                i, value = h & (NUM_HASHES - 1), (h >> _BIN_BITS) & _MASK32
+                current = bins[i]
+                if current is None or value < current:
+                    bins[i] = value
+    if not shingles and window:
+        # Shorter than one shingle: the whole text is the only one.
+        h = _hash64(" ".join(window))
+        bins[h & (NUM_HASHES - 1)] = (h >> _BIN_BITS) & _MASK32
+    if all(b is None for b in bins):
+        return None
+    return Fingerprint(_densify(bins), digests)
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def bands(minhash: list[int]) -> list[tuple[int, int]]:
+    """``(band, bucket)`` pairs; buckets are signed 64-bit for ``BIGINT``."""
+    return [
+        (
+            band,
+            int.from_bytes(
+                blake2b(
+                    _BAND.pack(*minhash[band * ROWS : (band + 1) * ROWS]),
+                    digest_size=8,
+                ).digest(),
+                "big",
+                signed=True,
+            ),
+        )
+        for band in range(BANDS)
+    ]
+
+
+def store(db: Session, doc_id: str, fp: Fingerprint) -> None:
+    """Save ``doc_id``'s signature and replace its LSH buckets."""
+    values = {
+        "document_id": doc_id,
+        "minhash": _SIGNATURE.pack(*fp.minhash),
+        "page_digests": fp.page_digests,
+        "created_at": datetime.utcnow(),
+    }
+    stmt = pg_insert(DocumentSignature).values(**values)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DocumentSignature.document_id],
+            set_={
+                name: stmt.excluded[name] for name in values if name != "document_id"
+            },
+        )
+    )
+    db.execute(delete(DocumentLSHBand).where(DocumentLSHBand.document_id == doc_id))
+    db.execute(
+        pg_insert(DocumentLSHBand)
+        .values(
+            [
+                {"band": band, "bucket": bucket, "document_id": doc_id}
+                for band, bucket in bands(fp.minhash)
+            ]
+        )
+        .on_conflict_do_nothing()
+    )
+    db.commit()
+    metrics.incr("near_duplicate.indexed")
+
+
+def load(db: Session, doc_id: str) -> Fingerprint | None:
+    row = db.get(DocumentSignature, doc_id)
+    if row is None:
+        return None
+    return Fingerprint(list(_SIGNATURE.unpack(row.minhash)), row.page_digests)
+
+
+def find(
+    db: Session,
+    doc_id: str,
+    fp: Fingerprint,
+    threshold: float | None = None,
+    with_record: bool = False,
+) -> list[Match]:
+    """Other documents at least ``threshold`` similar to ``fp``, best first.
+
+    With ``with_record`` only documents that have a structured record count.
+    """
+    if threshold is None:
+        threshold = settings.near_duplicate_threshold
+    t0 = time.perf_counter()
+    shared = func.count().label("shared")
+    candidates = select(DocumentLSHBand.document_id, shared).where(
+        tuple_(DocumentLSHBand.band, DocumentLSHBand.bucket).in_(bands(fp.minhash)),
+        DocumentLSHBand.document_id != doc_id,
+    )
+    if with_record:
+        # Before the LIMIT, so record-less copies cannot crowd out the rest.
+        candidates = candidates.where(
+            exists().where(StructuredRecord.document_id == DocumentLSHBand.document_id)
+        )
+    candidates = (
+        candidates.group_by(DocumentLSHBand.document_id)
+        .order_by(shared.desc())
+        .limit(MAX_CANDIDATES)
+        .subquery()
+    )
+    stmt = select(
+        DocumentSignature.document_id,
+        DocumentSignature.minhash,
+        DocumentSignature.page_digests,
+    ).join(candidates, candidates.c.document_id == DocumentSignature.document_id)
+    matches = []
+    for row in db.execute(stmt):
+        score = similarity(fp.minhash, list(_SIGNATURE.unpack(row.minhash)))
+        if score >= threshold:
+            matches.append(Match(row.document_id, score, row.page_digests))
+    matches.sort(key=lambda m: (-m.similarity, m.document_id))
+    metrics.observe("near_duplicate.lookup", (time.perf_counter() - t0) * 1000)
+    logger.debug("near_duplicate.lookup id=%s matches=%s", doc_id, len(matches))
+    return matches
+
+
+def _page(entry: Any) -> tuple[str, list[int]]:
+    if isinstance(entry, str):
+        return entry, []
+    digest, sketch = entry
+    if not sketch:
+        return digest, []
+    return digest, list(_PAGE_SKETCH.unpack(base64.b64decode(sketch)))
+
+
+def _page_bands(sketch: list[int]) -> list[tuple[int, tuple[int, ...]]]:
+    rows = PAGE_HASHES // PAGE_BANDS
+    if not sketch:
+        return []
+    return [
+        (band, tuple(sketch[band * rows : (band + 1) * rows]))
+        for band in range(PAGE_BANDS)
+    ]
+
+
+def page_matches(
+    fp: Fingerprint, match: Match, threshold: float | None = None
+) -> dict[int, int | None]:
+    """``fp``'s pages (raw-text segments) whose text does not appear in
+    ``match``, each with the index of ``match``'s closest page at least
+    ``threshold`` similar, or None when the page is new."""
+    if threshold is None:
+        threshold = settings.near_duplicate_page_threshold
+    known = [_page(entry) for entry in match.page_digests]
+    exact = {digest for digest, _ in known}
+    buckets: dict[tuple[int, tuple[int, ...]], set[int]] = {}
+    for j, (_, sketch) in enumerate(known):
+        for key in _page_bands(sketch):
+            buckets.setdefault(key, set()).add(j)
+    result: dict[int, int | None] = {}
+    for i, entry in enumerate(fp.page_digests):
+        digest, sketch = _page(entry)
+        if digest in exact:
+            continue
+        candidates = {j for key in _page_bands(sketch) for j in buckets.get(key, ())}
+        # Most similar first, then the nearest page.
+        scored = [
+            (
+                sum(x == y for x, y in zip(sketch, known[j][1])) / PAGE_HASHES,
+                -abs(i - j),
+                j,
+            )
+            for j in candidates
+        ]
+        best = max(scored, default=None)
+        result[i] = best[2] if best is not None and best[0] >= threshold else None
+    return result
+
+
+def changed_pages(fp: Fingerprint, match: Match) -> list[int]:
+    """Indexes of ``fp``'s pages whose text does not appear in ``match``."""
+    return sorted(page_matches(fp, match))
+
+
+def new_lines(text: str, prior: str) -> str:
+    """The lines of ``text`` whose words are not a line of ``prior``."""
+    known = {_normalize(line) for line in prior.splitlines()}
+    return "\n".join(
+        line for line in text.splitlines() if _normalize(line) not in known
+    )
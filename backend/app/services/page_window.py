@@ -0,0 +1,102 @@
+"""Pick the pages of a document's raw text that are relevant to some fields.
+
+Extractors mark page boundaries with ``--- Page N ---`` lines (PDF, TIFF).
+Text without markers is cut into fixed-size pseudo-pages. Pages are scored
+by keyword hits for the requested fields. The best pages with any hits are
+kept, in document order, until a character budget is reached.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+_PAGE_MARKER = re.compile(r"^--- Page (\d+) ---$", re.M)
+PSEUDO_PAGE_CHARS = 4000
+
+FIELD_HINTS: dict[str, tuple[str, ...]] = {
+    "pet": ("patient", "name", "species", "breed", "age", "weight", "kg", "microchip"),
+    "clinic_name": ("clinic", "hospital", "practice"),
+    "veterinarian": ("dr.", "dvm", "veterinarian", "vet"),
+    "visit_date": ("date", "visit"),
+    "chief_complaint": ("complaint", "presented", "reason for visit"),
+    "clinical_history": ("history", "previous", "hx"),
+    "physical_examination": ("exam", "temperature", "heart rate", "palpation"),
+    "diagnoses": ("diagnosis", "diagnosed", "dx", "assessment", "impression"),
+    "medications": (
+        "mg",
+        "ml",
+        "tablet",
+        "dose",
+        "dosage",
+        "sid",
+        "bid",
+        "tid",
+        "prescribed",
+        "medication",
+        "rx",
+    ),
+    "treatment_plan": ("plan", "treatment", "therapy"),
+    "prognosis": ("prognosis",),
+    "follow_up": ("follow", "recheck", "revisit"),
+    "notes": ("note",),
+}
+
+
+@dataclass
+class PageWindow:
+    pages: list[int]
+    text: str
+    total_pages: int
+
+
+def split_pages(raw_text: str) -> list[tuple[int, str]]:
+    """``(page number, text)`` pairs, numbered from 1."""
+    markers = list(_PAGE_MARKER.finditer(raw_text))
+    if not markers:
+        return [
+            (i // PSEUDO_PAGE_CHARS + 1, raw_text[i : i + PSEUDO_PAGE_CHARS])
+            for i in range(0, len(raw_text), PSEUDO_PAGE_CHARS)
+        ]
+    pages = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(raw_text)
+        pages.append((int(marker.group(1)), raw_text[marker.end() : end].strip()))
+    return pages
+
+
+def _score(text: str, fields: list[str]) -> int:
+    lowered = text.lower()
+    return sum(
+        lowered.count(hint) for name in fields for hint in FIELD_HINTS.get(name, ())
+    )
+
+
+def select_window(
+    raw_text: str,
+    fields: list[str],
+    max_chars: int,
+    pages: list[int] | None = None,
+) -> PageWindow:
+    """The pages to send for ``fields``; ``pages`` overrides the scoring."""
+    all_pages = split_pages(raw_text)
+    if pages:
+        wanted = set(pages)
+        chosen = [p for p in all_pages if p[0] in wanted]
+    else:
+        scored = [(_score(body, fields), n, body) for n, body in all_pages]
+        if any(score for score, _, _ in scored):
+            scored = [page for page in scored if page[0]]
+        # Best first, earlier pages on ties; with no hits, simply the first pages.
+        scored.sort(key=lambda page: (-page[0], page[1]))
+        chosen, used = [], 0
+        for _, n, body in scored:
+            if chosen and used + len(body) > max_chars:
+                continue
+            chosen.append((n, body))
+            used += len(body)
+        chosen.sort()
+    text = "\n".join(f"--- Page {n} ---\n{body}" for n, body in chosen)
+    return PageWindow(
+        pages=[n for n, _ in chosen], text=text[:max_chars], total_pages=len(all_pages)
+    )
@@ -0,0 +1,122 @@
+"""Structured record history stored as JSON patches with periodic snapshots."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.model_exports import StructuredRecordVersion
+from app.services import json_patch
+
+logger = logging.getLogger("app.services.history")
+
+SOURCE_LLM = "llm"
+SOURCE_MANUAL = "manual"
+
+
+def is_snapshot_version(version: int) -> bool:
+    interval = max(settings.record_snapshot_interval, 1)
+    return version == 1 or version % interval == 0
+
+
+def append_versions(
+    db: Session,
+    written: list[dict[str, Any]],
+    source: str,
+    prompt_version: str | None,
+) -> None:
+    """Insert history rows for upserted records (same transaction, no commit).
+
+    Each ``written`` row carries the new ``record_json`` and ``version`` plus
+    ``old_json``/``old_version`` as seen by the upsert statement. If another
+    writer got in between (``old_version`` is not ``version - 1``), the base
+    is rebuilt from history instead.
+    """
+    rows = []
+    for row in written:
+        doc_id, version, new = row["document_id"], row["version"], row["record_json"]
+        entry = {
+            "document_id": doc_id,
+            "version": version,
+            "patch": None,
+            "snapshot": None,
+            "source": source,
+            "prompt_version": row["prompt_version"],
+        }
+        if is_snapshot_version(version) or row["old_json"] is None:
+            entry["snapshot"] = new
+        else:
+            old = row["old_json"]
+            if row["old_version"] != version - 1:
+                old = reconstruct(db, doc_id, version - 1)
+            entry["patch"] = json_patch.diff(old, new)
+        rows.append(entry)
+    if rows:
+        db.execute(pg_insert(StructuredRecordVersion), rows)
+
+
+def reconstruct(db: Session, doc_id: str, version: int) -> dict[str, Any]:
+    """Record as of ``version``: nearest snapshot at or below it plus patches."""
+    base = (
+        select(func.max(StructuredRecordVersion.version))
+        .where(
+            StructuredRecordVersion.document_id == doc_id,
+            StructuredRecordVersion.version <= version,
+            StructuredRecordVersion.snapshot.is_not(None),
+        )
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(
+            StructuredRecordVersion.version,
+            StructuredRecordVersion.patch,
+            StructuredRecordVersion.snapshot,
+        )
+        .where(
+            StructuredRecordVersion.document_id == doc_id,
+            StructuredRecordVersion.version.between(base, version),
+        )
+        .order_by(StructuredRecordVersion.version)
+    ).all()
+    if not rows or rows[-1].version != version:
+        raise HTTPException(status_code=404, detail="Record version not found")
+    record = rows[0].snapshot
+    for row in rows[1:]:
+        record = json_patch.apply(record, row.patch)
+    logger.debug(
+        "history.reconstruct doc_id=%s version=%s patches=%s",
+        doc_id,
+        version,
+        len(rows) - 1,
+    )
+    return record
+
+
+def list_versions(db: Session, doc_id: str) -> list[dict[str, Any]]:
+    rows = db.execute(
+        select(
+            StructuredRecordVersion.version,
+            StructuredRecordVersion.source,
+            StructuredRecordVersion.prompt_version,
+            StructuredRecordVersion.created_at,
+            StructuredRecordVersion.snapshot.is_not(None).label("is_snapshot"),
+        )
+        .where(StructuredRecordVersion.document_id == doc_id)
+        .order_by(StructuredRecordVersion.version)
+    ).all()
+    return [
+        {
+            "version": row.version,
+            "source": row.source,
+            "prompt_version": row.prompt_version,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "snapshot": row.is_snapshot,
+        }
+        for row in rows
+    ]
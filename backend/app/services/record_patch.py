@@ -0,0 +1,228 @@
+"""Partial structured record updates: RFC 6902 JSON Patch and RFC 7396 merge patch.
+
+A patch is compiled into steps. Each value is validated only against the
+part of ``VeterinaryRecordSchema`` it touches. The steps then become a
+single jsonb expression (``jsonb_set`` / ``jsonb_insert`` / ``#-``). Their
+preconditions become ``WHERE`` clauses, so one ``UPDATE`` applies the patch
+in the database. Patches that do not map onto jsonb functions (``move``,
+``copy``, whole-document replacement) are applied in Python with
+``json_patch`` instead.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Union, get_args, get_origin
+
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import Text, cast, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from app.db.model_exports import StructuredRecord
+from app.schemas.veterinary_record import VeterinaryRecordSchema
+from app.services import json_patch
+
+JSON_PATCH = "application/json-patch+json"
+MERGE_PATCH = "application/merge-patch+json"
+CONTENT_TYPES = (JSON_PATCH, MERGE_PATCH)
+
+
+@dataclass(frozen=True)
+class Step:
+    # add | insert | replace | remove | discard (remove if present) | test
+    op: str
+    tokens: tuple[str, ...]
+    value: Any = None
+
+
+@dataclass
+class CompiledPatch:
+    steps: list[Step]
+    # False when some operation has no jsonb equivalent.
+    in_database: bool = True
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=detail)
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _resolve_schema(tokens: tuple[str, ...]) -> tuple[Any, bool]:
+    """Annotation at ``tokens`` and whether removing it is allowed."""
+    annotation: Any = VeterinaryRecordSchema
+    removable = False
+    for token in tokens:
+        annotation = _unwrap_optional(annotation)
+        if _is_model(annotation):
+            field = annotation.model_fields.get(token)
+            if field is None:
+                raise _invalid(f"Unknown field: /{'/'.join(tokens)}")
+            annotation, removable = field.annotation, not field.is_required()
+        elif get_origin(annotation) is list:
+            if token != "-" and not token.isdigit():
+                raise _invalid(f"Invalid array index: {token!r}")
+            annotation, removable = get_args(annotation)[0], True
+        else:
+            raise _invalid(f"Path below a scalar: /{'/'.join(tokens)}")
+    return annotation, removable
+
+
+@lru_cache(maxsize=None)
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _validated(tokens: tuple[str, ...], value: Any) -> Any:
+    """``value`` validated against the schema at ``tokens``, as JSON data."""
+    annotation, _ = _resolve_schema(tokens)
+    adapter = _adapter(annotation)
+    try:
+        return adapter.dump_python(adapter.validate_python(value), mode="json")
+    except ValidationError as exc:
+        raise _invalid(f"/{'/'.join(tokens)}: {exc.errors()[0]['msg']}")
+
+
+def _check_removable(tokens: tuple[str, ...]) -> None:
+    if not _resolve_schema(tokens)[1]:
+        raise _invalid(f"Required field cannot be removed: /{'/'.join(tokens)}")
+
+
+def _parent_is_list(tokens: tuple[str, ...]) -> bool:
+    return get_origin(_unwrap_optional(_resolve_schema(tokens[:-1])[0])) is list
+
+
+def compile_json_patch(patch: Any) -> CompiledPatch:
+    if not isinstance(patch, list) or not patch:
+        raise _invalid("A JSON patch must be a non-empty list of operations")
+    compiled = CompiledPatch(steps=[])
+    for operation in patch:
+        try:
+            op = operation["op"]
+            tokens = tuple(json_patch.parse_pointer(operation["path"]))
+            if "from" in operation:
+                json_patch.parse_pointer(operation["from"])
+        except (KeyError, TypeError, json_patch.JsonPatchError):
+            raise _invalid(f"Malformed operation: {operation!r}")
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise _invalid(f"'{op}' requires a value")
+        if op in ("move", "copy") or not tokens:
+            # Validated as a whole record after applying in Python.
+            if op in ("move", "copy") and "from" not in operation:
+                raise _invalid(f"'{op}' requires 'from'")
+            compiled.in_database = False
+            continue
+        if op == "test":
+            compiled.steps.append(Step("test", tokens, operation["value"]))
+        elif op == "remove":
+            _check_removable(tokens)
+            compiled.steps.append(Step("remove", tokens))
+        elif op in ("add", "replace"):
+            value = _validated(tokens, operation["value"])
+            if op == "add" and _parent_is_list(tokens):
+                compiled.steps.append(Step("insert", tokens, value))
+            else:
+                compiled.steps.append(Step(op, tokens, value))
+        else:
+            raise _invalid(f"Unknown operation: {op!r}")
+    return compiled
+
+
+def compile_merge_patch(patch: Any) -> CompiledPatch:
+    if not isinstance(patch, dict):
+        raise _invalid("A merge patch for a record must be an object")
+    compiled = CompiledPatch(steps=[])
+
+    def walk(node: dict[str, Any], prefix: tuple[str, ...]) -> None:
+        for key, value in node.items():
+            tokens = prefix + (key,)
+            if value is None:
+                _check_removable(tokens)
+                compiled.steps.append(Step("discard", tokens))
+            elif isinstance(value, dict) and _is_model(
+                _unwrap_optional(_resolve_schema(tokens)[0])
+            ):
+                walk(value, tokens)
+            else:
+                compiled.steps.append(Step("add", tokens, _validated(tokens, value)))
+
+    walk(patch, ())
+    return compiled
+
+
+def compile_patch(content_type: str, patch: Any) -> CompiledPatch:
+    if content_type == JSON_PATCH:
+        return compile_json_patch(patch)
+    return compile_merge_patch(patch)
+
+
+def _path(tokens: tuple[str, ...]) -> Any:
+    return cast(literal(list(tokens), ARRAY(Text)), ARRAY(Text))
+
+
+def _at(doc: Any, tokens: tuple[str, ...]) -> Any:
+    return doc.op("#>", return_type=JSONB)(_path(tokens))
+
+
+def to_sql(steps: list[Step]) -> tuple[Any, list[Any]]:
+    """The new ``record_json`` expression and the conditions it relies on.
+
+    Conditions are checked against the document as it is before each step.
+    If any of them is false the ``UPDATE`` matches no row.
+    """
+    doc: Any = StructuredRecord.record_json
+    conditions: list[Any] = []
+    for step in steps:
+        path, parent = _path(step.tokens), step.tokens[:-1]
+        value = literal(step.value, JSONB)
+        if step.op == "test":
+            conditions.append(_at(doc, step.tokens) == value)
+        elif step.op in ("remove", "discard"):
+            if step.op == "remove":
+                conditions.append(_at(doc, step.tokens).isnot(None))
+            doc = doc.op("#-", return_type=JSONB)(path)
+        elif step.op == "replace":
+            conditions.append(_at(doc, step.tokens).isnot(None))
+            doc = func.jsonb_set(doc, path, value, False, type_=JSONB)
+        elif step.op == "insert":
+            array = _at(doc, parent)
+            conditions.append(func.jsonb_typeof(array) == "array")
+            if step.tokens[-1] == "-":
+                # Insert after the last element; also works on an empty array.
+                end = _path(parent + ("-1",))
+                doc = func.jsonb_insert(doc, end, value, True, type_=JSONB)
+            else:
+                index = int(step.tokens[-1])
+                conditions.append(func.jsonb_array_length(array) >= index)
+                doc = func.jsonb_insert(doc, path, value, type_=JSONB)
+        else:  # add to an object member
+            conditions.append(func.jsonb_typeof(_at(doc, parent)) == "object")
+            doc = func.jsonb_set(doc, path, value, True, type_=JSONB)
+    return doc, conditions
+
+
+def apply_in_python(content_type: str, record: dict[str, Any], patch: Any) -> dict:
+    """Apply ``patch`` to ``record`` and validate the whole result."""
+    try:
+        if content_type == JSON_PATCH:
+            patched = json_patch.apply(record, patch)
+        else:
+            patched = json_patch.merge(record, patch)
+    except json_patch.JsonPatchError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    try:
+        return VeterinaryRecordSchema.model_validate(patched).model_dump(mode="json")
+    except ValidationError as exc:
+        raise _invalid(str(exc.errors()[0]["msg"]))
@@ -0,0 +1,338 @@
+"""Response schema for LLM extraction and local repair of near-miss responses.
+
+``response_schema`` derives the strict JSON schema sent as ``response_format``
+from ``VeterinaryRecordSchema``. ``load_json`` and ``repair`` fix the common
+ways a response can still miss: code fences, surrounding prose, trailing
+commas and truncation in the JSON; placeholders such as "N/A", numbers
+where strings are expected, single objects where lists are expected and
+invalid list items in the data. Each fix is reported by kind so callers can
+count the calls it saved.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.schemas.veterinary_record import VeterinaryRecordSchema
+
+# Set by the server, never requested from the model.
+SERVER_FIELDS = frozenset({"extraction_date"})
+
+NULL_PLACEHOLDERS = frozenset(
+    {
+        "",
+        "-",
+        "--",
+        "n/a",
+        "na",
+        "none",
+        "null",
+        "nil",
+        "unknown",
+        "not available",
+        "not provided",
+        "not specified",
+        "not stated",
+    }
+)
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*(.*?)\s*```$", re.S)
+_DROP = object()
+
+
+@dataclass
+class Repaired:
+    data: dict[str, Any]
+    record: VeterinaryRecordSchema | None = None
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    fixes: list[str] = field(default_factory=list)
+    # True when the response as received would not have been usable.
+    rescued: bool = False
+
+    @property
+    def failing_fields(self) -> list[str]:
+        """Top-level fields named by the remaining validation errors."""
+        names = {str(e["loc"][0]) for e in self.errors if e.get("loc")}
+        return sorted(names)
+
+
+def _strict(node: Any, fields: frozenset[str] | None = None) -> Any:
+    if isinstance(node, list):
+        return [_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if len(node.get("allOf", ())) == 1:
+        node = node["allOf"][0]
+    if "$ref" in node:
+        # Structured outputs do not allow keywords next to a reference.
+        return {"$ref": node["$ref"]}
+    result = {
+        key: _strict(value)
+        for key, value in node.items()
+        if key not in ("default", "title", "format", "examples")
+    }
+    if "properties" in node:
+        properties = {
+            name: _strict(value)
+            for name, value in node["properties"].items()
+            if name not in SERVER_FIELDS and (fields is None or name in fields)
+        }
+        result["properties"] = properties
+        # Strict mode: every property is required; optional ones accept null.
+        result["required"] = list(properties)
+        result["additionalProperties"] = False
+    return result
+
+
+@lru_cache(maxsize=None)
+def response_schema(fields: frozenset[str] | None = None) -> dict[str, Any]:
+    """Strict JSON schema for the record, or for only ``fields`` of it."""
+    schema = VeterinaryRecordSchema.model_json_schema()
+    defs = schema.pop("$defs", {})
+    strict = _strict(schema, fields)
+    strict.pop("example", None)
+    if defs:
+        strict["$defs"] = {name: _strict(value) for name, value in defs.items()}
+    return strict
+
+
+def response_format(fields: frozenset[str] | None = None) -> dict[str, Any]:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "veterinary_record",
+            "strict": True,
+            "schema": copy.deepcopy(response_schema(fields)),
+        },
+    }
+
+
+def _close_json(text: str, fixes: list[str]) -> str:
+    """Drop trailing commas, cut text after the document and close a truncated one."""
+    out: list[str] = []
+    closers: list[str] = []
+    in_string = escaped = False
+    for index, ch in enumerate(text):
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if _strip_trailing(out, ","):
+                fixes.append("json_trailing_comma")
+            if closers:
+                closers.pop()
+            if not closers:
+                out.append(ch)
+                if text[index + 1 :].strip():
+                    fixes.append("json_surrounding_text")
+                return "".join(out)
+        out.append(ch)
+    if in_string or closers:
+        fixes.append("json_truncated")
+        if in_string:
+            out.append('"')
+        _strip_trailing(out, ",")
+        if "".join(out).rstrip().endswith(":"):
+            out.append("null")
+        out.extend(reversed(closers))
+    return "".join(out)
+
+
+def _strip_trailing(out: list[str], char: str) -> bool:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == char:
+        del out[i]
+        return True
+    return False
+
+
+def load_json(text: str) -> tuple[Any, list[str]]:
+    """Parse ``text``, repairing common syntax slips; raises ``ValueError``."""
+    try:
+        return json.loads(text), []
+    except json.JSONDecodeError as exc:
+        original = exc
+    fixes: list[str] = []
+    candidate = text.strip()
+    fenced = _FENCE.match(candidate)
+    if fenced:
+        candidate = fenced.group(1)
+        fixes.append("json_fence")
+    start = candidate.find("{")
+    if start > 0:
+        candidate = candidate[start:]
+        fixes.append("json_surrounding_text")
+    try:
+        return json.loads(_close_json(candidate, fixes)), fixes
+    except json.JSONDecodeError:
+        raise original
+
+
+def _split_optional(annotation: Any) -> tuple[Any, bool]:
+    if get_origin(annotation) is Union:
+        args = get_args(annotation)
+        rest = [a for a in args if a is not type(None)]
+        if len(rest) == 1:
+            return rest[0], len(rest) != len(args)
+    return annotation, False
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _primary_field(model: type[BaseModel]) -> str | None:
+    """The single required string field, e.g. a medication's ``name``."""
+    required = [
+        name
+        for name, info in model.model_fields.items()
+        if info.is_required() and info.annotation is str
+    ]
+    return required[0] if len(required) == 1 else None
+
+
+def _coerce(value: Any, annotation: Any, fixes: list[str]) -> Any:
+    annotation, nullable = _split_optional(annotation)
+    if (
+        nullable
+        and isinstance(value, str)
+        and value.strip().lower() in NULL_PLACEHOLDERS
+    ):
+        fixes.append("null_placeholder")
+        return None
+    if _is_model(annotation):
+        if isinstance(value, dict):
+            fields = annotation.model_fields
+            return {
+                key: _coerce(item, fields[key].annotation, fixes)
+                if key in fields
+                else item
+                for key, item in value.items()
+            }
+        primary = _primary_field(annotation)
+        if isinstance(value, str) and primary:
+            fixes.append("string_to_item")
+            return {primary: value}
+        return value
+    if get_origin(annotation) is list:
+        return _coerce_list(value, get_args(annotation)[0], fixes)
+    if annotation is str:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            fixes.append("number_to_string")
+            return str(value)
+        if isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+            fixes.append("list_to_string")
+            return "; ".join(value)
+    return value
+
+
+def _coerce_list(value: Any, item_type: Any, fixes: list[str]) -> Any:
+    if value is None:
+        fixes.append("null_to_list")
+        return []
+    if isinstance(value, dict) or (isinstance(value, str) and _is_model(item_type)):
+        fixes.append("object_to_list")
+        value = [value]
+    if not isinstance(value, list):
+        return value
+    items = []
+    for item in value:
+        item = _coerce(item, item_type, fixes)
+        if _is_model(item_type):
+            try:
+                item_type.model_validate(item)
+            except ValidationError:
+                item = _DROP
+        if item is _DROP or item is None:
+            fixes.append("dropped_item")
+            continue
+        items.append(item)
+    return items
+
+
+def extractable_fields() -> list[str]:
+    """Top-level record fields the model is asked for, in schema order."""
+    return [f for f in VeterinaryRecordSchema.model_fields if f not in SERVER_FIELDS]
+
+
+def _template(annotation: Any) -> Any:
+    annotation, _ = _split_optional(annotation)
+    if _is_model(annotation):
+        return {k: _template(f.annotation) for k, f in annotation.model_fields.items()}
+    if get_origin(annotation) is list:
+        return [_template(get_args(annotation)[0])]
+    return "string"
+
+
+def field_template(fields: list[str]) -> str:
+    """Compact JSON outline of ``fields``, for prompts without a schema."""
+    model_fields = VeterinaryRecordSchema.model_fields
+    return json.dumps(
+        {name: _template(model_fields[name].annotation) for name in fields}
+    )
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(name: str) -> TypeAdapter:
+    return TypeAdapter(VeterinaryRecordSchema.model_fields[name].annotation)
+
+
+def repair_fields(data: dict[str, Any], fields: list[str]) -> Repaired:
+    """Coerce and validate only ``fields`` of a record.
+
+    ``data`` of the result holds the validated values as JSON data; ``record``
+    stays ``None`` since the rest of the record is not known here.
+    """
+    fixes: list[str] = []
+    model_fields = VeterinaryRecordSchema.model_fields
+    result = Repaired(data={}, fixes=fixes)
+    for name in fields:
+        value = _coerce(data.get(name), model_fields[name].annotation, fixes)
+        adapter = _field_adapter(name)
+        try:
+            validated = adapter.validate_python(value)
+        except ValidationError as exc:
+            result.errors.extend(
+                {**e, "loc": (name, *e["loc"])} for e in exc.errors(include_url=False)
+            )
+            continue
+        result.data[name] = adapter.dump_python(validated, mode="json")
+    return result
+
+
+def repair(data: dict[str, Any]) -> Repaired:
+    """Coerce ``data`` towards the schema and validate it."""
+    fixes: list[str] = []
+    data = {k: v for k, v in data.items() if k not in SERVER_FIELDS}
+    coerced = _coerce(data, VeterinaryRecordSchema, fixes)
+    result = Repaired(data=coerced, fixes=fixes)
+    try:
+        result.record = VeterinaryRecordSchema.model_validate(coerced)
+    except ValidationError as exc:
+        result.errors = exc.errors(include_url=False)
+        return result
+    if fixes:
+        try:
+            VeterinaryRecordSchema.model_validate(data)
+        except ValidationError:
+            result.rescued = True
+    return result
@@ -0,0 +1,372 @@
+"""Resumable (tus-like) upload sessions.
+
+A session is a JSON descriptor plus a ``.part`` file under
+``<upload_dir>/.sessions``. The server-side offset is the size of the part
+file, so bytes that reached disk before a dropped connection are kept and the
+client resumes from there. The SHA-256 of the received bytes is updated as
+chunks arrive; if this process lost that state (restart, another worker), it
+is rebuilt from the part file. Sessions not touched within
+``upload_session_ttl_minutes`` are removed by :func:`purge_expired_sessions`.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.content_sniffing import (
+    OCTET_STREAM,
+    ZIP_MIME,
+    guess_from_name,
+    probe_zip,
+    sniff_bytes,
+)
+from app.services.document_service import ensure_extractable, record_stored_upload
+
+logger = logging.getLogger("app.services.uploads")
+
+SESSION_DIR_NAME = ".sessions"
+# Bytes buffered from the first PATCH before sniffing the content type.
+_SNIFF_BYTES = 8192
+_HASH_BLOCK = 1024 * 1024
+
+_hash_lock = threading.Lock()
+_hashers: dict[str, tuple[int, Any]] = {}
+
+
+def _session_dir() -> Path:
+    path = Path(settings.upload_dir) / SESSION_DIR_NAME
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _descriptor_path(session_id: str) -> Path:
+    return _session_dir() / f"{session_id}.json"
+
+
+def _part_path(session_id: str) -> Path:
+    return _session_dir() / f"{session_id}.part"
+
+
+def _expiry() -> str:
+    ttl = timedelta(minutes=settings.upload_session_ttl_minutes)
+    return (datetime.utcnow() + ttl).isoformat() + "Z"
+
+
+def _expired(expires_at: str, now: datetime) -> bool:
+    return datetime.fromisoformat(expires_at.rstrip("Z")) < now
+
+
+def _write_descriptor(session: dict[str, Any]) -> None:
+    path = _descriptor_path(session["id"])
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(session))
+    os.replace(tmp, path)
+
+
+def _load(session_id: str) -> dict[str, Any]:
+    if not session_id.isalnum():
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    path = _descriptor_path(session_id)
+    try:
+        session = json.loads(path.read_text())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    except ValueError:
+        raise HTTPException(status_code=500, detail="Corrupt upload session")
+    if _expired(session["expires_at"], datetime.utcnow()):
+        _discard(session_id)
+        raise HTTPException(status_code=404, detail="Upload session expired")
+    return session
+
+
+def _discard(session_id: str) -> None:
+    _descriptor_path(session_id).unlink(missing_ok=True)
+    _part_path(session_id).unlink(missing_ok=True)
+    with _hash_lock:
+        _hashers.pop(session_id, None)
+
+
+def current_offset(session_id: str) -> int:
+    try:
+        return _part_path(session_id).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _hasher_at(session_id: str, offset: int):
+    """SHA-256 state covering the first ``offset`` bytes of the part file."""
+    with _hash_lock:
+        cached = _hashers.get(session_id)
+    if cached is not None and cached[0] == offset:
+        return cached[1]
+    hasher = hashlib.sha256()
+    if offset == 0:
+        return hasher
+    remaining = offset
+    with _part_path(session_id).open("rb") as fh:
+        while remaining:
+            block = fh.read(min(_HASH_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    metrics.incr("uploads.sessions.hash_rebuilt")
+    logger.info("upload.session.hash_rebuilt id=%s offset=%s", session_id, offset)
+    return hasher
+
+
+def describe(session: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": session["id"],
+        "filename": session["filename"],
+        "length": session["length"],
+        "offset": current_offset(session["id"]),
+        "content_type": session.get("content_type"),
+        "expires_at": session["expires_at"],
+    }
+
+
+def create_session(
+    filename: str,
+    length: int,
+    declared_type: str | None = None,
+    sha256: str | None = None,
+) -> dict[str, Any]:
+    """Open a session for ``length`` bytes; ``sha256`` is checked on finalize."""
+    purge_expired_sessions()
+    max_bytes = settings.max_upload_size_mb * 1024 * 1024
+    if length < 0:
+        raise HTTPException(status_code=422, detail="Upload length must be >= 0")
+    if length > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    if declared_type and declared_type not in settings.allowed_mimetypes:
+        raise HTTPException(status_code=415, detail="Unsupported media type")
+
+    now = datetime.utcnow().isoformat() + "Z"
+    session = {
+        "id": uuid.uuid4().hex,
+        "filename": Path(filename).name or "upload",
+        "declared_type": declared_type,
+        "length": length,
+        "sha256": sha256.lower() if sha256 else None,
+        "content_type": None,
+        "created_at": now,
+        "expires_at": _expiry(),
+    }
+    _part_path(session["id"]).touch()
+    _write_descriptor(session)
+    metrics.incr("uploads.sessions.created")
+    logger.info(
+        "upload.session.created id=%s filename=%s length=%s",
+        session["id"],
+        session["filename"],
+        length,
+    )
+    return describe(session)
+
+
+def get_session(session_id: str) -> dict[str, Any]:
+    return describe(_load(session_id))
+
+
+def _write(fh, hasher, data: bytes) -> None:
+    fh.write(data)
+    hasher.update(data)
+
+
+def _open_locked(session_id: str):
+    """The part file opened for appending, under an exclusive ``flock``.
+
+    The lock is shared by all worker processes; a PATCH already running
+    anywhere makes this one 409.
+    """
+    fh = _part_path(session_id).open("ab")
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        fh.close()
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+    return fh
+
+
+async def append_chunk(
+    session_id: str, offset: int, chunks: AsyncIterator[bytes]
+) -> int:
+    """Append a request body at ``offset``; returns the new offset.
+
+    ``offset`` must equal the server offset (409 otherwise), checked while
+    holding the part file's lock. The first bytes of a session are sniffed
+    before they are written, so unsupported content ends the session with 415.
+    """
+    session = _load(session_id)
+    fh = await run_in_threadpool(_open_locked, session_id)
+    try:
+        start = os.fstat(fh.fileno()).st_size
+        if offset != start:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset mismatch: server is at {start}",
+            )
+        length = session["length"]
+        hasher = await run_in_threadpool(_hasher_at, session_id, start)
+        position = start
+        pending = b""
+        t0 = time.perf_counter()
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                if position + len(pending) + len(chunk) > length:
+                    raise HTTPException(
+                        status_code=413, detail="Chunk exceeds Upload-Length"
+                    )
+                if start == 0 and session["content_type"] is None:
+                    pending += chunk
+                    if len(pending) < _SNIFF_BYTES:
+                        continue
+                    _sniff_first_chunk(session, pending)
+                    chunk, pending = pending, b""
+                await run_in_threadpool(_write, fh, hasher, chunk)
+                position += len(chunk)
+            if pending:
+                _sniff_first_chunk(session, pending)
+                await run_in_threadpool(_write, fh, hasher, pending)
+                position += len(pending)
+        finally:
+            fh.flush()
+            # Record what reached disk so a retry resumes without rehashing.
+            alive = _descriptor_path(session_id).exists()
+            with _hash_lock:
+                if alive and os.fstat(fh.fileno()).st_size == position:
+                    _hashers[session_id] = (position, hasher)
+                else:
+                    _hashers.pop(session_id, None)
+
+        session["expires_at"] = _expiry()
+        _write_descriptor(session)
+    finally:
+        fh.close()
+
+    received = position - start
+    metrics.incr("uploads.sessions.bytes", received)
+    metrics.observe("uploads.sessions.patch", (time.perf_counter() - t0) * 1000)
+    logger.debug(
+        "upload.session.patch id=%s offset=%s received=%s",
+        session_id,
+        position,
+        received,
+    )
+    return position
+
+
+def _sniff_first_chunk(session: dict[str, Any], head: bytes) -> None:
+    content_type = sniff_bytes(head) or OCTET_STREAM
+    if content_type != ZIP_MIME:
+        try:
+            ensure_extractable(content_type)
+        except HTTPException:
+            _discard(session["id"])
+            metrics.incr("uploads.sessions.rejected")
+            raise
+    session["content_type"] = content_type
+    _write_descriptor(session)
+
+
+def finalize_session(session_id: str, db: Session | None = None) -> dict[str, Any]:
+    """Move a complete upload into place and record it like a direct upload.
+
+    Takes the part file's lock like a PATCH (409 while one is running), so a
+    chunk still being written is never promoted.
+    """
+    session = _load(session_id)
+    upload_dir = Path(settings.upload_dir)
+    file_path = upload_dir / f"{session_id}_{session['filename']}"
+    fh = _open_locked(session_id)
+    try:
+        offset = os.fstat(fh.fileno()).st_size
+        if offset != session["length"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {offset} of {session['length']} bytes",
+            )
+        digest = _hasher_at(session_id, offset).hexdigest()
+        if session["sha256"] and digest != session["sha256"]:
+            _discard(session_id)
+            metrics.incr("uploads.sessions.checksum_mismatch")
+            raise HTTPException(status_code=422, detail="Checksum mismatch")
+        os.replace(_part_path(session_id), file_path)
+    finally:
+        fh.close()
+    try:
+        content_type = session["content_type"]
+        if content_type is None:
+            content_type = guess_from_name(
+                session["filename"], session["declared_type"]
+            )
+        elif content_type == ZIP_MIME:
+            content_type = probe_zip(file_path)
+        ensure_extractable(content_type)
+        metadata = record_stored_upload(
+            session_id, session["filename"], file_path, content_type, db=db
+        )
+    except Exception:
+        file_path.unlink(missing_ok=True)
+        raise
+    finally:
+        _discard(session_id)
+
+    metrics.incr("uploads.sessions.finalized")
+    return {**metadata, "sha256": digest}
+
+
+def delete_session(session_id: str) -> None:
+    _load(session_id)
+    _discard(session_id)
+    logger.info("upload.session.deleted id=%s", session_id)
+
+
+def purge_expired_sessions(now: datetime | None = None) -> int:
+    """Remove abandoned sessions; returns how many were purged."""
+    directory = Path(settings.upload_dir) / SESSION_DIR_NAME
+    if not directory.is_dir():
+        return 0
+    now = now or datetime.utcnow()
+    ttl_seconds = settings.upload_session_ttl_minutes * 60
+    purged = 0
+    for descriptor in directory.glob("*.json"):
+        try:
+            expired = _expired(json.loads(descriptor.read_text())["expires_at"], now)
+        except (OSError, ValueError, KeyError):
+            expired = True
+        if expired:
+            _discard(descriptor.stem)
+            purged += 1
+    # Part files whose descriptor is gone (e.g. crash between writes).
+    for part in directory.glob("*.part"):
+        if not (directory / f"{part.stem}.json").exists():
+            try:
+                if time.time() - part.stat().st_mtime > ttl_seconds:
+                    part.unlink()
+                    purged += 1
+            except FileNotFoundError:
+                pass
+    if purged:
+        metrics.incr("uploads.sessions.expired", purged)
+        logger.info("upload.session.purged count=%s", purged)
+    return purged
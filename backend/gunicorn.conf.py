@@ -0,0 +1,33 @@
+"""Gunicorn settings for ``SERVER_MODE=production`` (started by ``app.serve``)."""
+
+from app.core.config import settings
+from app.serve import worker_count
+
+bind = f"{settings.server_host}:{settings.server_port}"
+workers = worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+max_requests = settings.worker_max_requests
+max_requests_jitter = max(settings.worker_max_requests // 10, 0)
+timeout = settings.worker_timeout_seconds
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before forking.
+    from app.db.session import engine
+    from app.main import app, init_resources
+
+    init_resources()
+    app.state.resources_ready = True
+    # Connections opened here must not be shared with the forked workers.
+    engine.dispose()
+    server.log.info("serve.preloaded workers=%s", workers)
+
+
+def post_fork(server, worker):
+    from app.db.session import engine
+
+    engine.dispose(close=False)
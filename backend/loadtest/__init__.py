@@ -0,0 +1 @@
+"""Offline load-testing tools: OpenAI-compatible stub server and pipeline harness."""
@@ -0,0 +1,238 @@
+"""Load-test harness driving upload -> extract against a running backend.
+
+    python -m loadtest.harness run --base-url http://localhost:8000 \
+        --file data/samples/clinical_history_1.pdf --requests 200 \
+        --concurrency 16 --output report.json
+    python -m loadtest.harness compare baseline.json report.json --fail-threshold 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import mimetypes
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+STAGES = ("upload", "extract", "total")
+REPORT_VERSION = 1
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Linear-interpolated percentile (``q`` in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    lo = math.floor(rank)
+    hi = math.ceil(rank)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+class StageRecorder:
+    """Collects latencies (ms) and outcomes for one pipeline stage."""
+
+    def __init__(self) -> None:
+        self.latencies_ms: list[float] = []
+        self.errors = 0
+        self.status_codes: dict[str, int] = {}
+
+    def record(self, latency_ms: float, status: int | str, ok: bool) -> None:
+        self.latencies_ms.append(latency_ms)
+        key = str(status)
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> dict[str, Any]:
+        count = len(self.latencies_ms)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "error_rate": (self.errors / count) if count else 0.0,
+            "mean_ms": (sum(self.latencies_ms) / count) if count else None,
+            "p50_ms": percentile(self.latencies_ms, 50),
+            "p95_ms": percentile(self.latencies_ms, 95),
+            "p99_ms": percentile(self.latencies_ms, 99),
+            "max_ms": max(self.latencies_ms) if count else None,
+            "status_codes": dict(sorted(self.status_codes.items())),
+        }
+
+
+async def _one_iteration(
+    client: httpx.AsyncClient,
+    payload: bytes,
+    filename: str,
+    content_type: str,
+    stages: dict[str, StageRecorder],
+) -> None:
+    t_start = time.perf_counter()
+    try:
+        resp = await client.post(
+            "/documents/upload",
+            files={"file": (filename, payload, content_type)},
+        )
+        status: int | str = resp.status_code
+    except httpx.HTTPError as exc:
+        resp, status = None, exc.__class__.__name__
+    t_upload = time.perf_counter()
+    upload_ok = resp is not None and resp.status_code == 200
+    stages["upload"].record((t_upload - t_start) * 1000, status, upload_ok)
+    if not upload_ok:
+        stages["total"].record((t_upload - t_start) * 1000, status, False)
+        return
+
+    doc_id = resp.json()["id"]
+    try:
+        resp = await client.post(f"/documents/{doc_id}/extract")
+        status = resp.status_code
+    except httpx.HTTPError as exc:
+        resp, status = None, exc.__class__.__name__
+    t_end = time.perf_counter()
+    extract_ok = resp is not None and resp.status_code == 200
+    stages["extract"].record((t_end - t_upload) * 1000, status, extract_ok)
+    stages["total"].record((t_end - t_start) * 1000, status, extract_ok)
+
+
+async def run_load(
+    base_url: str,
+    file_path: str,
+    requests: int,
+    concurrency: int,
+    timeout: float = 300.0,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[str, Any]:
+    """Run ``requests`` upload->extract iterations with ``concurrency`` workers."""
+    path = Path(file_path)
+    payload = path.read_bytes()
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    stages = {name: StageRecorder() for name in STAGES}
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, transport=transport
+    ) as client:
+
+        async def worker() -> None:
+            for _ in remaining:
+                await _one_iteration(client, payload, path.name, content_type, stages)
+
+        started_at = datetime.utcnow().isoformat() + "Z"
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    completed = stages["total"].summary()
+    succeeded = completed["count"] - completed["errors"]
+    return {
+        "version": REPORT_VERSION,
+        "started_at": started_at,
+        "config": {
+            "base_url": base_url,
+            "file": path.name,
+            "file_bytes": len(payload),
+            "requests": requests,
+            "concurrency": concurrency,
+        },
+        "environment": {"python": platform.python_version(), "host": platform.node()},
+        "elapsed_s": elapsed,
+        "throughput_rps": succeeded / elapsed if elapsed > 0 else 0.0,
+        "stages": {name: rec.summary() for name, rec in stages.items()},
+    }
+
+
+def _pct_change(old: float | None, new: float | None) -> float | None:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100.0
+
+
+def compare_reports(
+    baseline: dict[str, Any], current: dict[str, Any], fail_threshold: float
+) -> dict[str, Any]:
+    """Diff two reports; latency growth or throughput loss over the threshold fails."""
+    regressions: list[str] = []
+    stages: dict[str, Any] = {}
+    for name in STAGES:
+        old = baseline["stages"].get(name, {})
+        new = current["stages"].get(name, {})
+        diff: dict[str, Any] = {}
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            change = _pct_change(old.get(metric), new.get(metric))
+            diff[f"{metric}_change_pct"] = change
+            if change is not None and change > fail_threshold:
+                regressions.append(f"{name}.{metric} +{change:.1f}%")
+        diff["error_rate_delta"] = new.get("error_rate", 0.0) - old.get(
+            "error_rate", 0.0
+        )
+        stages[name] = diff
+
+    throughput_change = _pct_change(
+        baseline.get("throughput_rps"), current.get("throughput_rps")
+    )
+    if throughput_change is not None and -throughput_change > fail_threshold:
+        regressions.append(f"throughput {throughput_change:.1f}%")
+
+    return {
+        "fail_threshold_pct": fail_threshold,
+        "throughput_change_pct": throughput_change,
+        "stages": stages,
+        "regressions": regressions,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="drive upload->extract and write a report")
+    run.add_argument("--base-url", default="http://localhost:8000")
+    run.add_argument("--file", default="data/samples/clinical_history_1.pdf")
+    run.add_argument("--requests", type=int, default=50)
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--timeout", type=float, default=300.0)
+    run.add_argument("--output", help="write the JSON report here (default stdout)")
+
+    cmp_ = sub.add_parser("compare", help="compare two reports")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--fail-threshold", type=float, default=10.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = asyncio.run(
+            run_load(
+                args.base_url,
+                args.file,
+                args.requests,
+                args.concurrency,
+                timeout=args.timeout,
+            )
+        )
+        text = json.dumps(report, indent=2)
+        if args.output:
+            Path(args.output).write_text(text)
+        else:
+            print(text)
+        return 0
+
+    result = compare_reports(
+        json.loads(Path(args.baseline).read_text()),
+        json.loads(Path(args.current).read_text()),
+        args.fail_threshold,
+    )
+    print(json.dumps(result, indent=2))
+    return 1 if result["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
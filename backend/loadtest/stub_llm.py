@@ -0,0 +1,213 @@
+"""OpenAI-compatible ``chat.completions`` stub for offline end-to-end runs.
+
+Point the backend at it with ``OPENAI_BASE_URL=http://<host>:<port>/v1``.
+
+    python -m loadtest.stub_llm --port 8089 --latency lognormal:800:0.4 \
+        --error-rate 0.01 --rate-limit-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("loadtest.stub_llm")
+
+DEFAULT_RECORD: dict[str, Any] = {
+    "pet": {
+        "name": "Buddy",
+        "species": "Dog",
+        "breed": "Golden Retriever",
+        "age": "5 years",
+        "weight": "30 kg",
+        "microchip": None,
+    },
+    "clinic_name": "Happy Paws Clinic",
+    "veterinarian": "Dr. Smith",
+    "visit_date": "2024-01-15",
+    "chief_complaint": "Lameness in right rear leg",
+    "clinical_history": "Presented for evaluation of acute lameness",
+    "physical_examination": "Pain on palpation of right hip",
+    "diagnoses": [
+        {"condition": "Osteoarthritis", "date": None, "severity": None, "notes": None}
+    ],
+    "medications": [
+        {
+            "name": "Carprofen",
+            "dosage": "100mg twice daily",
+            "route": None,
+            "indication": None,
+        }
+    ],
+    "treatment_plan": "Rest and anti-inflammatory therapy",
+    "prognosis": "Good with treatment",
+    "follow_up": "Recheck in 2 weeks",
+    "notes": None,
+}
+
+
+class LatencyDistribution:
+    """Latency sampler parsed from ``kind:arg[:arg]`` (all values in ms).
+
+    Supported kinds: ``fixed:MS``, ``uniform:LO:HI``, ``normal:MEAN:STD``,
+    ``lognormal:MEDIAN:SIGMA`` and ``exponential:MEAN``.
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, spec: str = "fixed:0") -> None:
+        kind, *raw_args = spec.split(":")
+        if kind not in self.KINDS or len(raw_args) != self.KINDS[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in raw_args]
+
+    def sample_ms(self, rng: random.Random) -> float:
+        a = self.args
+        if self.kind == "fixed":
+            value = a[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(a[0], a[1])
+        elif self.kind == "normal":
+            value = rng.gauss(a[0], a[1])
+        elif self.kind == "lognormal":
+            # median * exp(N(0, sigma)) keeps the median at the configured value
+            value = a[0] * rng.lognormvariate(0.0, a[1])
+        else:
+            value = rng.expovariate(1.0 / a[0]) if a[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server."""
+
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: int = 1
+    responses: list[dict[str, Any]] = field(default_factory=lambda: [DEFAULT_RECORD])
+    seed: int | None = None
+
+
+def load_responses(path: str) -> list[dict[str, Any]]:
+    """Load canned records from a JSON object or a JSON list of objects."""
+    data = json.loads(Path(path).read_text())
+    return data if isinstance(data, list) else [data]
+
+
+def _error_body(message: str, error_type: str, code: str) -> dict[str, Any]:
+    return {"error": {"message": message, "type": error_type, "code": code}}
+
+
+def create_stub_app(config: StubConfig | None = None) -> FastAPI:
+    """Build the stub ASGI app; counters are exposed at ``GET /stats``."""
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    responses = itertools.cycle(config.responses)
+    stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    app = FastAPI(title="OpenAI stub")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(config.latency.sample_ms(rng) / 1000.0)
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content=_error_body(
+                    "Rate limit reached", "requests", "rate_limit_exceeded"
+                ),
+                headers={"Retry-After": str(config.retry_after_seconds)},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content=_error_body("Injected stub failure", "server_error", "stub"),
+            )
+
+        stats["ok"] += 1
+        content = json.dumps(next(responses))
+        prompt_chars = sum(len(m.get("content") or "") for m in body["messages"])
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (prompt_chars + len(content)) // 4,
+                },
+            }
+        )
+
+    @app.get("/stats")
+    async def get_stats() -> dict[str, int]:
+        return dict(stats)
+
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="e.g. lognormal:800:0.4")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--responses", help="JSON file with canned record(s)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        latency=LatencyDistribution(args.latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed,
+    )
+    if args.responses:
+        config.responses = load_responses(args.responses)
+
+    import uvicorn
+
+    logger.info(
+        "stub.start latency=%s error_rate=%s rate_limit_rate=%s",
+        args.latency,
+        args.error_rate,
+        args.rate_limit_rate,
+    )
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
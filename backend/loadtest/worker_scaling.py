@@ -0,0 +1,170 @@
+"""Throughput of the production server profile at several worker counts.
+
+Starts the LLM stub, then for each worker count boots ``python -m app.serve``
+with ``SERVER_MODE=production`` and runs the upload->extract harness against
+it. Needs a reachable ``DATABASE_URL``::
+
+    python -m loadtest.worker_scaling --workers 1 2 4 8 \
+        --file data/samples/clinical_history_1.pdf --requests 200 \
+        --concurrency 32 --output scaling.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from loadtest.harness import run_load
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _wait_healthy(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not healthy after {timeout:.0f}s")
+
+
+def _start(argv: list[str], env: dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        argv,
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+def run_scaling(
+    workers: list[int],
+    file_path: str,
+    requests: int,
+    concurrency: int,
+    port: int = 8100,
+    stub_port: int = 8189,
+    stub_latency: str = "fixed:50",
+    pool_workers: int = 0,
+) -> dict[str, Any]:
+    env = dict(os.environ)
+    stub = _start(
+        [
+            sys.executable,
+            "-m",
+            "loadtest.stub_llm",
+            "--host=127.0.0.1",
+            f"--port={stub_port}",
+            f"--latency={stub_latency}",
+        ],
+        env,
+    )
+    runs = []
+    try:
+        _wait_healthy(f"http://127.0.0.1:{stub_port}/stats", 30)
+        for count in workers:
+            server_env = {
+                **env,
+                "SERVER_MODE": "production",
+                "SERVER_HOST": "127.0.0.1",
+                "SERVER_PORT": str(port),
+                "WEB_CONCURRENCY": str(count),
+                "EXTRACTION_POOL_WORKERS": str(pool_workers),
+                "OPENAI_API_KEY": "stub",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+                "DEBUG": "false",
+            }
+            server = _start([sys.executable, "-m", "app.serve"], server_env)
+            try:
+                _wait_healthy(f"http://127.0.0.1:{port}/health", 60)
+                report = asyncio.run(
+                    run_load(
+                        f"http://127.0.0.1:{port}", file_path, requests, concurrency
+                    )
+                )
+            finally:
+                _stop(server)
+            runs.append(
+                {
+                    "workers": count,
+                    "throughput_rps": report["throughput_rps"],
+                    "p95_total_ms": report["stages"]["total"]["p95_ms"],
+                    "error_rate": report["stages"]["total"]["error_rate"],
+                }
+            )
+    finally:
+        _stop(stub)
+
+    base = runs[0]["throughput_rps"] if runs else 0.0
+    for run in runs:
+        run["speedup"] = run["throughput_rps"] / base if base else None
+    return {
+        "config": {
+            "file": Path(file_path).name,
+            "requests": requests,
+            "concurrency": concurrency,
+            "stub_latency": stub_latency,
+            "extraction_pool_workers": pool_workers,
+            "cpus": os.cpu_count(),
+        },
+        "runs": runs,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--file", default="data/samples/clinical_history_1.pdf")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=8189)
+    parser.add_argument("--stub-latency", default="fixed:50")
+    parser.add_argument("--pool-workers", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default stdout)")
+    args = parser.parse_args(argv)
+
+    result = run_scaling(
+        args.workers,
+        args.file,
+        args.requests,
+        args.concurrency,
+        port=args.port,
+        stub_port=args.stub_port,
+        stub_latency=args.stub_latency,
+        pool_workers=args.pool_workers,
+    )
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
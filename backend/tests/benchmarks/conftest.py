@@ -0,0 +1,20 @@
+"""Benchmark fixtures: deterministic synthetic documents and records.
+
+Benchmarks run once as smoke tests in the normal suite (``--benchmark-disable``
+in pytest.ini). To measure, save a baseline and compare against it::
+
+    pytest tests/benchmarks --benchmark-enable --benchmark-autosave
+    pytest tests/benchmarks --benchmark-enable --benchmark-compare \
+        --benchmark-compare-fail=mean:15%
+
+The second run fails when any benchmark's mean slows by more than 15%.
+"""
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def bench_dir(tmp_path_factory) -> Path:
+    return tmp_path_factory.mktemp("bench")
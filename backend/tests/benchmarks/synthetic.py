@@ -0,0 +1,153 @@
+"""Deterministic synthetic inputs for benchmarks."""
+
+import random
+import zipfile
+from pathlib import Path
+from typing import Any
+
+SEED = 1234
+
+_WORDS = (
+    "paciente canino felino vacuna desparasitacion abdomen peso temperatura "
+    "diagnostico tratamiento dosis oral cada horas dias control revision "
+    "analitica hemograma bioquimica otitis dermatitis giardiasis amoxicilina "
+    "meloxicam clinica veterinaria historial exploracion mucosas rosadas"
+).split()
+
+
+def synthetic_lines(count: int, seed: int = SEED) -> list[str]:
+    """Deterministic clinical-looking lines of 8-16 words."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 16))).capitalize()
+        for _ in range(count)
+    ]
+
+
+def make_pdf(path: Path, pages: int) -> Path:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(path), pagesize=A4, invariant=1)
+    lines = synthetic_lines(pages * 40)
+    for page in range(pages):
+        y = 800
+        for line in lines[page * 40 : (page + 1) * 40]:
+            c.drawString(40, y, line)
+            y -= 18
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_docx(path: Path, paragraphs: int, table_rows: int = 0) -> Path:
+    import docx
+
+    document = docx.Document()
+    for line in synthetic_lines(paragraphs):
+        document.add_paragraph(line)
+    if table_rows:
+        table = document.add_table(rows=table_rows, cols=3)
+        for i, row in enumerate(table.rows):
+            row.cells[0].text = f"Medicamento {i}"
+            row.cells[1].text = f"{i * 5} mg"
+            row.cells[2].text = "oral"
+    document.save(str(path))
+    return path
+
+
+def make_png(path: Path, lines: int) -> Path:
+    from PIL import Image, ImageDraw
+
+    image = Image.new("L", (1240, 60 + 30 * lines), color=255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(synthetic_lines(lines)):
+        draw.text((40, 30 + 30 * i), line, fill=0)
+    image.save(path)
+    return path
+
+
+def make_record(medications: int, diagnoses: int | None = None) -> dict[str, Any]:
+    """A VeterinaryRecordSchema-shaped dict with long medication/diagnosis lists."""
+    rng = random.Random(SEED)
+    diagnoses = medications if diagnoses is None else diagnoses
+    return {
+        "pet": {"name": "Luna", "species": "Canino", "breed": "Mestizo"},
+        "clinic_name": "Clinica Veterinaria Parque Oeste",
+        "veterinarian": "Dra. Garcia",
+        "visit_date": "2024-03-01",
+        "chief_complaint": " ".join(synthetic_lines(2)),
+        "clinical_history": " ".join(synthetic_lines(20)),
+        "physical_examination": " ".join(synthetic_lines(5)),
+        "diagnoses": [
+            {
+                "condition": f"Condicion {i}",
+                "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "severity": rng.choice(["leve", "moderada", "grave"]),
+                "notes": None,
+            }
+            for i in range(diagnoses)
+        ],
+        "medications": [
+            {
+                "name": f"Medicamento {i}",
+                "dosage": f"{rng.randint(1, 500)} mg cada {rng.choice([8, 12, 24])} h",
+                "route": rng.choice(["oral", "sc", "iv"]),
+                "indication": None,
+            }
+            for i in range(medications)
+        ],
+        "treatment_plan": " ".join(synthetic_lines(3)),
+        "prognosis": "Favorable",
+        "follow_up": "Revision en 15 dias",
+        "notes": None,
+    }
+
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats'
+    '.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def make_large_docx(path: Path, paragraphs: int, table_every: int = 50) -> Path:
+    """Write a large DOCX by streaming raw XML (python-docx is too slow here).
+
+    Every ``table_every`` paragraphs a 10-row medication table is inserted.
+    """
+    lines = synthetic_lines(min(paragraphs, 1000))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _DOCX_RELS)
+        with zf.open("word/document.xml", "w") as fh:
+            fh.write(f'<w:document xmlns:w="{_W_NS}"><w:body>'.encode())
+            for i in range(paragraphs):
+                line = lines[i % len(lines)]
+                fh.write(f"<w:p><w:r><w:t>{line}</w:t></w:r></w:p>".encode())
+                if table_every and i % table_every == table_every - 1:
+                    fh.write(b"<w:tbl>")
+                    for row in range(10):
+                        cells = (f"Medicamento {row}", f"{row * 5} mg", "oral")
+                        fh.write(b"<w:tr>")
+                        for cell in cells:
+                            fh.write(
+                                f"<w:tc><w:p><w:r><w:t>{cell}</w:t></w:r></w:p></w:tc>".encode()
+                            )
+                        fh.write(b"</w:tr>")
+                    fh.write(b"</w:tbl>")
+            fh.write(b"</w:body></w:document>")
+    return path
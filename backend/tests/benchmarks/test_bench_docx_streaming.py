@@ -0,0 +1,78 @@
+"""Streaming DOCX extractor vs. the python-docx object model: time and peak RSS."""
+
+import multiprocessing
+import resource
+
+import pytest
+
+from app.services.extraction.docx import DocxExtractor
+from tests.benchmarks.synthetic import make_large_docx
+
+
+def _python_docx_extract(file_path: str) -> str:
+    """The previous extractor: full object model, paragraphs only."""
+    import docx
+
+    doc = docx.Document(file_path)
+    return "\n".join(p.text for p in doc.paragraphs)
+
+
+def _streaming_extract(file_path: str) -> str:
+    return DocxExtractor().extract(file_path).text
+
+
+_IMPLEMENTATIONS = {
+    "streaming": _streaming_extract,
+    "python_docx": _python_docx_extract,
+}
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss survives fork+exec and so starts at the parent's peak; VmHWM
+    # belongs to the new address space.
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure_rss(name: str, file_path: str, queue) -> None:
+    before = _peak_rss_kb()
+    _IMPLEMENTATIONS[name](file_path)
+    queue.put(_peak_rss_kb() - before)
+
+
+def peak_rss_growth_kb(name: str, file_path: str) -> int:
+    """Peak RSS growth (KiB) of one extraction in a fresh interpreter."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure_rss, args=(name, file_path, queue))
+    proc.start()
+    growth = queue.get(timeout=300)
+    proc.join()
+    return growth
+
+
+@pytest.fixture(scope="module")
+def large_docx(tmp_path_factory):
+    path = tmp_path_factory.mktemp("docx") / "large.docx"
+    return str(make_large_docx(path, paragraphs=10000))
+
+
+@pytest.mark.parametrize("name", ["streaming", "python_docx"])
+def test_bench_large_docx(benchmark, large_docx, name):
+    text = benchmark.pedantic(
+        _IMPLEMENTATIONS[name], args=(large_docx,), rounds=3, iterations=1
+    )
+    benchmark.extra_info["peak_rss_growth_kb"] = peak_rss_growth_kb(name, large_docx)
+    assert text
+
+
+def test_streaming_docx_peak_rss_below_object_model(large_docx):
+    streaming = peak_rss_growth_kb("streaming", large_docx)
+    python_docx = peak_rss_growth_kb("python_docx", large_docx)
+    assert streaming < python_docx
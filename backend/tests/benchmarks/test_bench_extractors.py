@@ -0,0 +1,34 @@
+"""Benchmarks for the PDF, DOCX and image extractors on growing inputs."""
+
+import shutil
+
+import pytest
+
+from app.services.extraction.docx import DocxExtractor
+from app.services.extraction.image import ImageExtractor
+from app.services.extraction.pdf import PDFExtractor
+from tests.benchmarks.synthetic import make_docx, make_pdf, make_png
+
+
+@pytest.mark.parametrize("pages", [1, 10, 50])
+def test_bench_pdf_extractor(benchmark, bench_dir, pages):
+    path = make_pdf(bench_dir / f"bench_{pages}.pdf", pages)
+    result = benchmark(PDFExtractor().extract, str(path))
+    assert result.meta["pages"] == pages
+
+
+@pytest.mark.parametrize("paragraphs", [10, 200, 2000])
+def test_bench_docx_extractor(benchmark, bench_dir, paragraphs):
+    path = make_docx(bench_dir / f"bench_{paragraphs}.docx", paragraphs)
+    result = benchmark(DocxExtractor().extract, str(path))
+    assert result.meta["paragraphs"] >= paragraphs
+
+
+@pytest.mark.skipif(shutil.which("tesseract") is None, reason="tesseract missing")
+@pytest.mark.parametrize("lines", [5, 40])
+def test_bench_image_extractor(benchmark, bench_dir, lines):
+    path = make_png(bench_dir / f"bench_{lines}.png", lines)
+    result = benchmark.pedantic(
+        ImageExtractor().extract, args=(str(path),), rounds=3, iterations=1
+    )
+    assert result.text
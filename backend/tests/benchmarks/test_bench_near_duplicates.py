@@ -0,0 +1,101 @@
+"""Near-duplicate lookup against a large LSH index.
+
+The index is filled in SQL with ``BENCH_NEAR_DUPLICATE_DOCS`` documents
+(1M with ``--benchmark-enable``; 10k in the smoke run), each with a random
+signature and 16 random buckets, plus a few real documents whose text is a
+re-stamped copy of the query. The benchmark is one ``near_duplicates.find``:
+the bucket lookup on ``document_lsh_bands`` and the signature comparison of
+its candidates.
+"""
+
+import os
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.db.base import Base
+from app.services import near_duplicates
+from app.services.document_service import persist_document_metadata
+from tests.benchmarks.synthetic import synthetic_lines
+
+INDEX_DOCS = 1_000_000
+# Filling 1M takes minutes; the normal suite only checks that lookup works.
+SMOKE_DOCS = 10_000
+COPIES = 3
+
+
+def _index_docs(config) -> int:
+    if "BENCH_NEAR_DUPLICATE_DOCS" in os.environ:
+        return int(os.environ["BENCH_NEAR_DUPLICATE_DOCS"])
+    return SMOKE_DOCS if config.getoption("benchmark_disable") else INDEX_DOCS
+
+
+def _pages(stamp: str) -> list[str]:
+    lines = synthetic_lines(10 * 40)
+    pages = ["\n".join(lines[i * 40 : (i + 1) * 40]) for i in range(10)]
+    pages[0] = f"Impreso {stamp}\n{pages[0]}"
+    return pages
+
+
+def _add_document(db, doc_id: str) -> None:
+    persist_document_metadata(
+        db,
+        {
+            "id": doc_id,
+            "original_filename": "bench.pdf",
+            "stored_filename": f"{doc_id}_bench.pdf",
+            "content_type": "application/pdf",
+            "size": 1,
+            "path": f"/tmp/{doc_id}_bench.pdf",
+        },
+    )
+
+
+@pytest.fixture
+def lsh_index(request, pglite_session):
+    db = pglite_session
+    count = _index_docs(request.config)
+    Base.metadata.create_all(bind=db.bind)
+    db.execute(
+        text(
+            "INSERT INTO documents (id, original_filename, stored_filename, "
+            "content_type, size, path, created_at) "
+            "SELECT 'bench' || i, 'b.pdf', 'b.pdf', 'application/pdf', 1, "
+            "'/tmp/b.pdf', now() FROM generate_series(1, :n) AS i"
+        ),
+        {"n": count},
+    )
+    db.execute(
+        text(
+            "INSERT INTO document_signatures (document_id, minhash, page_digests, "
+            "created_at) SELECT 'bench' || i, decode(repeat(md5(i::text), 32), "
+            "'hex'), '[]', now() FROM generate_series(1, :n) AS i"
+        ),
+        {"n": count},
+    )
+    db.execute(
+        text(
+            "INSERT INTO document_lsh_bands (band, bucket, document_id) "
+            "SELECT band, (random() * 9.2e18)::bigint, 'bench' || i "
+            "FROM generate_series(1, :n) AS i, generate_series(0, :bands) AS band"
+        ),
+        {"n": count, "bands": near_duplicates.BANDS - 1},
+    )
+    db.commit()
+    db.execute(text("ANALYZE document_lsh_bands"))
+    db.execute(text("ANALYZE document_signatures"))
+    copies = []
+    for day in range(COPIES):
+        doc_id = uuid.uuid4().hex
+        _add_document(db, doc_id)
+        fp = near_duplicates.fingerprint(_pages(f"2024-03-0{day + 1}"))
+        near_duplicates.store(db, doc_id, fp)
+        copies.append(doc_id)
+    return copies
+
+
+def test_bench_lookup_at_1m_documents(benchmark, pglite_session, lsh_index):
+    query = near_duplicates.fingerprint(_pages("2024-09-17"))
+    matches = benchmark(near_duplicates.find, pglite_session, "query", query)
+    assert sorted(m.document_id for m in matches) == sorted(lsh_index)
@@ -0,0 +1,150 @@
+"""Benchmarks for structured record persistence."""
+
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db.base import Base
+from app.db.model_exports import Document, StructuredRecord
+from app.services.document_service import (
+    bulk_upsert_structured_records,
+    patch_structured_record,
+    persist_document_metadata,
+    upsert_structured_record,
+)
+from tests.benchmarks.synthetic import make_record
+
+
+@pytest.fixture
+def bench_document(pglite_session):
+    Base.metadata.create_all(bind=pglite_session.bind)
+    doc_id = uuid.uuid4().hex
+    persist_document_metadata(
+        pglite_session,
+        {
+            "id": doc_id,
+            "original_filename": "bench.pdf",
+            "stored_filename": f"{doc_id}_bench.pdf",
+            "content_type": "application/pdf",
+            "size": 1,
+            "path": f"/tmp/{doc_id}_bench.pdf",
+        },
+    )
+    return doc_id
+
+
+@pytest.mark.parametrize("medications", [1, 50, 500])
+def test_bench_upsert_structured_record(
+    benchmark, pglite_session, bench_document, medications
+):
+    record = make_record(medications)
+    result = benchmark(upsert_structured_record, pglite_session, bench_document, record)
+    assert len(result["medications"]) == medications
+
+
+# One field edit on a large record: full rewrite vs. a jsonb_set patch.
+@pytest.mark.parametrize("path", ["put", "json_patch"])
+def test_bench_single_field_edit(benchmark, pglite_session, bench_document, path):
+    record = make_record(500)
+    upsert_structured_record(pglite_session, bench_document, record)
+    edits = iter(range(10**9))
+
+    def edit():
+        dosage = f"{next(edits)} mg"
+        if path == "put":
+            record["medications"][7]["dosage"] = dosage
+            upsert_structured_record(pglite_session, bench_document, record)
+        else:
+            op = {"op": "replace", "path": "/medications/7/dosage", "value": dosage}
+            patch_structured_record(
+                pglite_session, bench_document, "application/json-patch+json", [op]
+            )
+
+    benchmark(edit)
+
+
+BULK_RECORDS = 10_000
+# The normal suite runs each body once with --benchmark-disable; keep it quick.
+SMOKE_RECORDS = 200
+BULK_BATCH = 1000
+# Per-document paths are ~1 ms per row; compare them on a smaller corpus.
+PER_ROW_SHARE = 10
+
+
+def _bulk_records(config) -> int:
+    if "BENCH_UPSERT_RECORDS" in os.environ:
+        return int(os.environ["BENCH_UPSERT_RECORDS"])
+    return SMOKE_RECORDS if config.getoption("benchmark_disable") else BULK_RECORDS
+
+
+@pytest.fixture
+def bulk_documents(request, pglite_session):
+    Base.metadata.create_all(bind=pglite_session.bind)
+    ids = [uuid.uuid4().hex for _ in range(_bulk_records(request.config))]
+    pglite_session.execute(
+        pg_insert(Document).values(
+            [
+                {
+                    "id": doc_id,
+                    "original_filename": "bench.pdf",
+                    "stored_filename": f"{doc_id}_bench.pdf",
+                    "content_type": "application/pdf",
+                    "size": 1,
+                    "path": f"/tmp/{doc_id}_bench.pdf",
+                    "created_at": datetime.utcnow(),
+                }
+                for doc_id in ids
+            ]
+        )
+    )
+    pglite_session.commit()
+    return ids
+
+
+def _legacy_upsert(db, doc_id, record):
+    """The ORM get/relationship/commit/refresh path this replaced."""
+    doc = db.get(Document, doc_id)
+    if doc.record:
+        doc.record.record_json = record
+    else:
+        doc.record = StructuredRecord(document_id=doc_id, record_json=record)
+    db.commit()
+    db.refresh(doc)
+    return doc.record.record_json
+
+
+def test_bench_bulk_upsert_10k(benchmark, pglite_session, bulk_documents):
+    record = make_record(5)
+
+    def run():
+        written = 0
+        for start in range(0, len(bulk_documents), BULK_BATCH):
+            batch = {d: record for d in bulk_documents[start : start + BULK_BATCH]}
+            written += len(
+                bulk_upsert_structured_records(pglite_session, batch, "bench")
+            )
+        return written
+
+    assert benchmark.pedantic(run, rounds=3, iterations=1) == len(bulk_documents)
+
+
+@pytest.mark.parametrize("path", ["statement", "legacy_orm"])
+def test_bench_per_row_upsert(benchmark, pglite_session, bulk_documents, path):
+    record = make_record(5)
+    ids = bulk_documents[: len(bulk_documents) // PER_ROW_SHARE]
+    if path == "statement":
+
+        def run():
+            for doc_id in ids:
+                upsert_structured_record(pglite_session, doc_id, record)
+
+    else:
+
+        def run():
+            for doc_id in ids:
+                _legacy_upsert(pglite_session, doc_id, record)
+
+    benchmark.pedantic(run, rounds=3, iterations=1)
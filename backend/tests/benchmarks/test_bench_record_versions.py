@@ -0,0 +1,49 @@
+"""Benchmarks for reconstructing record versions from patches and snapshots."""
+
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.db.base import Base
+from app.services.document_service import (
+    persist_document_metadata,
+    upsert_structured_record,
+)
+from app.services.record_history import reconstruct
+from tests.benchmarks.synthetic import make_record
+
+VERSIONS = 100
+
+
+def _history(session, interval, monkeypatch):
+    monkeypatch.setattr(settings, "record_snapshot_interval", interval)
+    Base.metadata.create_all(bind=session.bind)
+    doc_id = uuid.uuid4().hex
+    persist_document_metadata(
+        session,
+        {
+            "id": doc_id,
+            "original_filename": "bench.pdf",
+            "stored_filename": f"{doc_id}_bench.pdf",
+            "content_type": "application/pdf",
+            "size": 1,
+            "path": f"/tmp/{doc_id}_bench.pdf",
+        },
+    )
+    record = make_record(medications=20, diagnoses=10)
+    for i in range(VERSIONS):
+        record["notes"] = f"review pass {i}"
+        record["medications"][i % 20]["dosage"] = f"{i} mg"
+        upsert_structured_record(session, doc_id, record)
+    return doc_id, record
+
+
+# interval > VERSIONS means a single snapshot and a 99-patch chain.
+@pytest.mark.parametrize("interval", [10, 1000])
+def test_bench_reconstruct_latest_of_100(
+    benchmark, pglite_session, monkeypatch, interval
+):
+    doc_id, expected = _history(pglite_session, interval, monkeypatch)
+    result = benchmark(reconstruct, pglite_session, doc_id, VERSIONS)
+    assert result == expected
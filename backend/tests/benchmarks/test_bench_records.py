@@ -0,0 +1,63 @@
+"""Benchmarks for record validation and serialization."""
+
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.schemas.veterinary_record import VeterinaryRecordSchema
+from tests.benchmarks.synthetic import make_record
+
+
+@pytest.mark.parametrize("medications", [1, 50, 500])
+def test_bench_schema_validate(benchmark, medications):
+    data = make_record(medications)
+    record = benchmark(VeterinaryRecordSchema.model_validate, data)
+    assert len(record.medications) == medications
+
+
+@pytest.mark.parametrize("medications", [1, 50, 500])
+def test_bench_schema_dump(benchmark, medications):
+    record = VeterinaryRecordSchema.model_validate(make_record(medications))
+    dumped = benchmark(record.model_dump)
+    assert len(dumped["medications"]) == medications
+
+
+def _json_mode(record):
+    return record.model_dump(mode="json")
+
+
+def _dump_json_roundtrip(record):
+    return json.loads(record.model_dump_json())
+
+
+@pytest.mark.parametrize("medications", [50, 500])
+@pytest.mark.parametrize("path", ["json_mode", "roundtrip"])
+def test_bench_schema_to_json_data(benchmark, medications, path):
+    record = VeterinaryRecordSchema.model_validate(make_record(medications))
+    dump = _json_mode if path == "json_mode" else _dump_json_roundtrip
+    result = benchmark(dump, record)
+    assert isinstance(result["extraction_date"], str)
+
+
+def _encoded_json_response(content):
+    # What FastAPI does with a returned dict before rendering it.
+    return JSONResponse(jsonable_encoder(content))
+
+
+RESPONSE_PATHS = {
+    "encoder_json": _encoded_json_response,
+    "json": JSONResponse,
+    "orjson": ORJSONResponse,
+}
+
+
+# Per-request response CPU for PUT /documents/{id} on a large record.
+@pytest.mark.parametrize("medications", [50, 500])
+@pytest.mark.parametrize("path", list(RESPONSE_PATHS))
+def test_bench_record_response(benchmark, medications, path):
+    record = VeterinaryRecordSchema.model_validate(make_record(medications))
+    content = {"id": "doc", "version": 2, "record": record.model_dump(mode="json")}
+    response = benchmark(RESPONSE_PATHS[path], content)
+    assert response.body.startswith(b'{"id":')
@@ -0,0 +1,71 @@
+"""Content sniffing on the first upload chunk vs. the previous post-write inference."""
+
+import mimetypes
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from app.services.content_sniffing import ZIP_MIME, probe_zip, sniff_bytes
+from tests.benchmarks.synthetic import make_docx, make_pdf, make_png
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+CHUNK = 1024 * 1024
+
+
+def _legacy_infer_content_type(file_path: Path, original_filename: str) -> str:
+    """The previous ``_infer_content_type`` path for an untyped upload."""
+    ext_map = {".pdf": "application/pdf", ".png": "image/png", ".docx": DOCX}
+    ext = Path(original_filename or "").suffix.lower()
+    if ext in ext_map:
+        return ext_map[ext]
+    guessed, _ = mimetypes.guess_type(original_filename or "")
+    if guessed:
+        return guessed
+    with file_path.open("rb") as f:
+        head = f.read(8)
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(file_path) as zf:
+            if any(n.startswith("word/") for n in zf.namelist()):
+                return DOCX
+    return "application/octet-stream"
+
+
+def _streaming_sniff(file_path: Path) -> str:
+    with file_path.open("rb") as f:
+        mime = sniff_bytes(f.read(CHUNK))
+    return probe_zip(file_path) if mime == ZIP_MIME else mime
+
+
+def _many_member_docx(path: Path, members: int) -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("word/document.xml", "<w:document/>")
+        for i in range(members):
+            zf.writestr(f"customXml/item{i}.xml", "<x/>")
+    return path
+
+
+@pytest.fixture(scope="module")
+def samples(tmp_path_factory):
+    base = tmp_path_factory.mktemp("sniff")
+    return {
+        "pdf": (make_pdf(base / "a.pdf", 1), "application/pdf"),
+        "png": (make_png(base / "a.png", 1), "image/png"),
+        "docx": (make_docx(base / "a.docx", 10), DOCX),
+        "docx_5k_members": (_many_member_docx(base / "big.docx", 5000), DOCX),
+    }
+
+
+@pytest.mark.parametrize("kind", ["pdf", "png", "docx", "docx_5k_members"])
+@pytest.mark.parametrize("impl", ["streaming", "legacy"])
+def test_bench_sniff(benchmark, samples, kind, impl):
+    path, expected = samples[kind]
+    if impl == "streaming":
+        result = benchmark(_streaming_sniff, path)
+    else:
+        result = benchmark(_legacy_infer_content_type, path, "upload")
+    assert result == expected
@@ -0,0 +1,85 @@
+"""Segment-streamed vs. buffered extraction of a 1000-page PDF: time and peak RSS.
+
+"buffered" is the previous path: the whole text joined in memory, written to
+the sidecar and serialized into the response. "streamed" writes segments to
+the sidecar as they are extracted and leaves ``raw_text`` out of the response
+(the default).
+
+Only extraction is measured. The structuring stage reads at most
+``llm_max_input_chars`` of the sidecar into the LLM prompt.
+"""
+
+import multiprocessing
+import uuid
+from pathlib import Path
+
+import orjson
+import pytest
+
+from app.core.config import settings
+from app.services import document_service
+from app.services.extraction.base import join_segments
+from app.services.extraction.pdf import PDFExtractor
+from tests.benchmarks.synthetic import make_pdf
+from tests.benchmarks.test_bench_docx_streaming import _peak_rss_kb
+
+PAGES = 1000
+
+
+def _buffered(file_path: str, out_dir: str) -> bytes:
+    meta: dict = {}
+    text = join_segments(PDFExtractor().iter_segments(file_path, meta))
+    (Path(out_dir) / f"{uuid.uuid4().hex}.txt").write_text(text, encoding="utf-8")
+    return orjson.dumps({"raw_text": text, "extraction_meta": meta})
+
+
+def _streamed(file_path: str, out_dir: str) -> bytes:
+    settings.upload_dir = out_dir
+    meta: dict = {}
+    index = document_service._write_raw_text(
+        uuid.uuid4().hex, PDFExtractor().iter_segments(file_path, meta)
+    )
+    return orjson.dumps({"raw_text_chars": index["chars"], "extraction_meta": meta})
+
+
+_IMPLEMENTATIONS = {"streamed": _streamed, "buffered": _buffered}
+
+
+def _measure_rss(name: str, file_path: str, out_dir: str, queue) -> None:
+    before = _peak_rss_kb()
+    _IMPLEMENTATIONS[name](file_path, out_dir)
+    queue.put(_peak_rss_kb() - before)
+
+
+def peak_rss_growth_kb(name: str, file_path: str, out_dir: str) -> int:
+    """Peak RSS growth (KiB) of one extraction in a fresh interpreter."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure_rss, args=(name, file_path, out_dir, queue))
+    proc.start()
+    growth = queue.get(timeout=300)
+    proc.join()
+    return growth
+
+
+@pytest.fixture(scope="module")
+def large_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "large.pdf"
+    return str(make_pdf(path, pages=PAGES))
+
+
+@pytest.mark.parametrize("name", ["streamed", "buffered"])
+def test_bench_1000_page_pdf(benchmark, large_pdf, tmp_path, name):
+    body = benchmark.pedantic(
+        _IMPLEMENTATIONS[name], args=(large_pdf, str(tmp_path)), rounds=1, iterations=1
+    )
+    benchmark.extra_info["peak_rss_growth_kb"] = peak_rss_growth_kb(
+        name, large_pdf, str(tmp_path)
+    )
+    assert body
+
+
+def test_streamed_peak_rss_below_buffered(large_pdf, tmp_path):
+    streamed = peak_rss_growth_kb("streamed", large_pdf, str(tmp_path))
+    buffered = peak_rss_growth_kb("buffered", large_pdf, str(tmp_path))
+    assert streamed < buffered
@@ -1,8 +1,13 @@
 """Pytest configuration for integration tests using py-pglite."""
 
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.core.config import settings
 from app.main import app
 from app.db.base import Base
 from app.db.session import get_db
@@ -31,3 +36,40 @@ def client(pglite_session):
 
     # Clean up
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def uploads(monkeypatch, tmp_path):
+    """Store uploads under the test's tmp_path."""
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def upload(client):
+    """POST a file to /documents/upload; returns the response."""
+
+    def post(name="r.txt", content=b"Patient: Rex", content_type="text/plain", **kw):
+        files = {"file": (name, io.BytesIO(content), content_type)}
+        return client.post("/documents/upload", files=files, **kw)
+
+    return post
+
+
+@pytest.fixture
+def fake_llm():
+    """Build an AsyncOpenAI stand-in whose completions return ``content``.
+
+    A dict or list is sent as JSON; a string is sent as is.
+    """
+
+    def build(content):
+        response = MagicMock()
+        response.choices[0].message.content = (
+            content if isinstance(content, str) else json.dumps(content)
+        )
+        llm = AsyncMock()
+        llm.chat.completions.create.return_value = response
+        return llm
+
+    return build
@@ -0,0 +1,205 @@
+"""Backfill CLI integration tests."""
+
+import asyncio
+import io
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import backfill
+from app.backfill import BackfillOptions, run_backfill
+from app.core import scheduler
+from app.core.config import settings
+from app.db.model_exports import SchedulerLease, StructuredRecord
+from app.schemas.veterinary_record import VeterinaryRecordSchema
+from app.services.document_service import upsert_structured_record
+from app.services.llm_service import PROMPT_VERSION
+
+
+def _upload(client, name, content=b"Patient: Rex\nDiagnosis: otitis"):
+    files = {"file": (name, io.BytesIO(content), "text/plain")}
+    return client.post("/documents/upload", files=files).json()["id"]
+
+
+def _fake_llm(text):
+    return VeterinaryRecordSchema(
+        pet={"name": "Rex"}, clinic_name="Backfill", notes=text[:12]
+    )
+
+
+def test_backfill_stale_records_and_resume(client, tmp_path, pglite_session):
+    settings.upload_dir = str(tmp_path)
+    ids = [_upload(client, f"doc{i}.txt") for i in range(5)]
+    upsert_structured_record(
+        pglite_session,
+        ids[0],
+        {"clinic_name": "Current"},
+        prompt_version=PROMPT_VERSION,
+    )
+    upsert_structured_record(
+        pglite_session, ids[1], {"clinic_name": "Old"}, prompt_version="old"
+    )
+    factory = sessionmaker(bind=pglite_session.bind)
+    options = BackfillOptions(
+        stale=True,
+        workers=1,
+        concurrency=2,
+        batch_size=2,
+        checkpoint=str(tmp_path / "checkpoint.json"),
+    )
+
+    llm = AsyncMock(side_effect=_fake_llm)
+    with patch.object(backfill, "extract_structured_record_async", llm):
+        summary = run_backfill(options, session_factory=factory)
+    assert summary["written"] == 4
+    assert summary["failed"] == 0
+    assert llm.await_count == 4
+
+    pglite_session.expire_all()
+    records = {r.document_id: r for r in pglite_session.query(StructuredRecord).all()}
+    assert records[ids[0]].record_json["clinic_name"] == "Current"
+    for doc_id in ids[1:]:
+        assert records[doc_id].record_json["clinic_name"] == "Backfill"
+        assert records[doc_id].prompt_version == PROMPT_VERSION
+
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text())
+    assert sorted(checkpoint["done"]) == sorted(ids[1:])
+
+    # Everything is current now, so a second stale run selects nothing.
+    llm.reset_mock()
+    with patch.object(backfill, "extract_structured_record_async", llm):
+        assert run_backfill(options, session_factory=factory)["total"] == 0
+    assert llm.await_count == 0
+
+
+def test_backfill_resumes_from_checkpoint(client, tmp_path, pglite_session):
+    settings.upload_dir = str(tmp_path)
+    for i in range(5):
+        _upload(client, f"doc{i}.txt")
+    factory = sessionmaker(bind=pglite_session.bind)
+    options = BackfillOptions(
+        content_types=["text/plain"],
+        workers=0,
+        concurrency=1,
+        batch_size=2,
+        checkpoint=str(tmp_path / "checkpoint.json"),
+    )
+    flaky = AsyncMock(side_effect=[RuntimeError("rate limited")] + [_fake_llm("x")] * 4)
+    with patch.object(backfill, "extract_structured_record_async", flaky):
+        first = run_backfill(options, session_factory=factory)
+    assert (first["written"], first["failed"]) == (4, 1)
+
+    llm = AsyncMock(side_effect=_fake_llm)
+    with patch.object(backfill, "extract_structured_record_async", llm):
+        second = run_backfill(options, session_factory=factory)
+    assert second["skipped"] == 4
+    assert (second["written"], second["failed"]) == (1, 0)
+    assert llm.await_count == 1
+
+
+def test_backfill_filters_and_failures(client, tmp_path, pglite_session):
+    settings.upload_dir = str(tmp_path)
+    good = _upload(client, "good.txt")
+    empty = _upload(client, "empty.txt", content=b"   ")
+    factory = sessionmaker(bind=pglite_session.bind)
+    options = BackfillOptions(
+        prompt_versions=[backfill.NO_VERSION],
+        content_types=["text/plain"],
+        workers=0,
+        checkpoint=str(tmp_path / "checkpoint.json"),
+    )
+
+    with patch.object(
+        backfill, "extract_structured_record_async", AsyncMock(side_effect=_fake_llm)
+    ):
+        summary = run_backfill(options, session_factory=factory)
+    assert summary["written"] == 1
+    assert summary["failed"] == 1
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text())
+    assert checkpoint["done"] == [good]
+    assert empty in checkpoint["failed"]
+
+    other = BackfillOptions(content_types=["application/pdf"], dry_run=True)
+    other.checkpoint = str(tmp_path / "other.json")
+    assert run_backfill(other, session_factory=factory)["total"] == 0
+
+
+def _waiting(factory, count):
+    """Block until ``count`` requests queue for the shared LLM slot."""
+    for _ in range(200):
+        with factory() as db:
+            queued = db.scalar(
+                select(func.count()).where(
+                    SchedulerLease.resource == "llm",
+                    SchedulerLease.granted_at.is_(None),
+                )
+            )
+        if queued == count:
+            return
+        time.sleep(0.05)
+    raise AssertionError(f"{queued} waiting, expected {count}")
+
+
+def test_api_request_overtakes_a_backfill_on_the_shared_budget(
+    client, uploads, upload, pglite_session, monkeypatch
+):
+    # One LLM slot for every process on the database, as the API would lease it.
+    monkeypatch.setattr(settings, "scheduler_shared_llm_slots", 1)
+    monkeypatch.setattr(settings, "near_duplicate_enabled", False)
+    factory = sessionmaker(bind=pglite_session.bind)
+    monkeypatch.setattr(scheduler, "_shared_sessions", None)
+    scheduler.share(factory)
+    for i in range(3):
+        upload(f"doc{i}.txt", f"Patient: Rex {i}".encode())
+    api_doc = upload("api.txt", b"Patient: Max").json()["id"]
+
+    calls, holding, release = [], threading.Event(), threading.Event()
+
+    async def create(**kwargs):
+        calls.append(scheduler.current_priority())
+        if len(calls) == 1:
+            holding.set()
+            await asyncio.to_thread(release.wait, 10)
+        response = MagicMock()
+        response.choices[0].message.content = json.dumps({"pet": {"name": "Rex"}})
+        return response
+
+    options = BackfillOptions(
+        content_types=["text/plain"],
+        limit=3,
+        workers=0,
+        concurrency=3,
+        checkpoint=str(uploads / "checkpoint.json"),
+    )
+    with patch("openai.AsyncOpenAI") as llm:
+        llm.return_value.chat.completions.create = create
+        runner = threading.Thread(target=run_backfill, args=(options, factory))
+        runner.start()
+        assert holding.wait(10)
+        _waiting(factory, 2)
+        # The interactive request queues last, behind two backfill documents.
+        statuses = []
+        api = threading.Thread(
+            target=lambda: statuses.append(
+                client.post(f"/documents/{api_doc}/extract").status_code
+            )
+        )
+        api.start()
+        _waiting(factory, 3)
+        release.set()
+        api.join(10)
+        runner.join(10)
+
+    assert statuses == [200]
+    assert calls == [
+        scheduler.BATCH,
+        scheduler.INTERACTIVE,
+        scheduler.BATCH,
+        scheduler.BATCH,
+    ]
+    with factory() as db:
+        assert db.scalar(select(func.count()).select_from(SchedulerLease)) == 0
@@ -0,0 +1,27 @@
+"""Startup schema verification against a real database."""
+
+import pytest
+from sqlalchemy import text
+
+from app.core.metrics import metrics
+from app.db.startup import SchemaVersionError, alembic_heads, init_database
+
+
+def test_verify_mode_requires_alembic_head(pglite_session):
+    engine = pglite_session.bind
+    with pytest.raises(SchemaVersionError):
+        init_database(engine, "verify")
+
+    (head,) = alembic_heads()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32))"))
+        conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": head})
+    init_database(engine, "verify")
+
+
+def test_startup_timings_are_published(client):
+    with client:
+        client.get("/health")
+    gauges = metrics.snapshot()["gauges"]
+    assert "startup.db_init_ms" in gauges
+    assert "startup.routers_ms" in gauges
@@ -0,0 +1,98 @@
+"""Streamed raw text: the segment sidecar, GET /documents/{id}/text and the
+extraction response without ``raw_text``."""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.extraction import pool as extraction_pool
+from app.services.extraction.pdf import PDFExtractor
+
+SAMPLE_PDF = (
+    Path(__file__).parent.parent.parent / "data" / "samples" / "clinical_history_1.pdf"
+)
+RECORD = {"pet": {"name": "Rex"}, "clinic_name": "Parque Oeste"}
+
+
+def _all_segments(client, doc_id, limit):
+    segments, offset = [], 0
+    while offset is not None:
+        page = client.get(f"/documents/{doc_id}/text?offset={offset}&limit={limit}")
+        assert page.status_code == 200
+        body = page.json()
+        segments += body["segments"]
+        offset = body["next_offset"]
+    return segments, body
+
+
+def test_extract_leaves_out_raw_text_then_page_through_it(
+    client, uploads, upload, fake_llm
+):
+    pdf = SAMPLE_PDF.read_bytes()
+    doc_id = upload("c.pdf", pdf, "application/pdf").json()["id"]
+    with patch("openai.AsyncOpenAI", return_value=fake_llm(RECORD)):
+        response = client.post(f"/documents/{doc_id}/extract")
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert "raw_text" not in data
+    assert data["record"]["clinic_name"] == "Parque Oeste"
+    # Parsed in a sandboxed worker, the default.
+    pids = extraction_pool.get_pool().pids()
+    assert pids and os.getpid() not in pids
+
+    meta: dict = {}
+    expected = list(PDFExtractor().iter_segments(str(SAMPLE_PDF), meta))
+    assert data["raw_text_segments"] == len(expected) == meta["pages"]
+    assert data["raw_text_chars"] == sum(len(s.text) for s in expected)
+
+    segments, last = _all_segments(client, doc_id, limit=1)
+    assert [s["page"] for s in segments] == [s.page for s in expected]
+    assert [s["text"] for s in segments] == [s.text for s in expected]
+    assert last["total"] == len(expected)
+    assert last["chars"] == data["raw_text_chars"]
+
+
+def test_llm_prompt_is_read_from_the_sidecar_up_to_its_budget(
+    client, uploads, upload, fake_llm, monkeypatch
+):
+    metrics.reset()
+    monkeypatch.setattr(settings, "llm_max_input_chars", 50)
+    pdf = SAMPLE_PDF.read_bytes()
+    doc_id = upload("c.pdf", pdf, "application/pdf").json()["id"]
+    llm = fake_llm(RECORD)
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        response = client.post(f"/documents/{doc_id}/extract")
+    assert response.status_code == 200, response.text
+
+    text = (uploads / f"{doc_id}.txt").read_text()
+    assert len(text) > 50
+    prompt = llm.chat.completions.create.await_args.kwargs["messages"][-1]["content"]
+    assert prompt.endswith(text[:50])
+    assert metrics.counter("llm.input.truncated") == 1
+    # The whole text is still there to page through.
+    assert response.json()["raw_text_chars"] > 50
+
+
+def test_text_of_sidecar_without_index(client, uploads, upload):
+    doc_id = upload(content=b"record").json()["id"]
+    pages = ["Patient: Rex\n", "Carprofen 75 mg\n\n", "Recheck in 2 weeks"]
+    text = "Header" + "".join(
+        f"\n--- Page {i} ---\n{page}" for i, page in enumerate(pages, 1)
+    )
+    (uploads / f"{doc_id}.txt").write_text(text)
+
+    segments, last = _all_segments(client, doc_id, limit=2)
+    assert segments == [{"page": None, "text": "Header"}] + [
+        {"page": i, "text": page} for i, page in enumerate(pages, 1)
+    ]
+    assert last["chars"] == len("Header") + sum(len(p) for p in pages)
+    assert (uploads / f"{doc_id}.segments.json").exists()
+
+
+def test_text_before_extraction_is_404(client, uploads, upload):
+    doc_id = upload(content=b"record").json()["id"]
+    response = client.get(f"/documents/{doc_id}/text")
+    assert response.status_code == 404
+    assert client.get("/documents/missing/text").status_code == 404
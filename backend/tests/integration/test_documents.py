@@ -44,7 +44,7 @@ def test_upload_large_file(client, tmp_path):
     """Test uploading a 2 MB file within limits."""
     settings.upload_dir = str(tmp_path)
     content = b"a" * (2 * 1024 * 1024)
-    files = {"file": ("large.bin", io.BytesIO(content), "application/octet-stream")}
+    files = {"file": ("large.txt", io.BytesIO(content), "text/plain")}
     resp = client.post("/documents/upload", files=files)
     assert resp.status_code == 200
     doc_id = resp.json()["id"]
@@ -110,6 +110,26 @@ def test_invalid_mime_rejected(client, tmp_path):
     settings.allowed_mimetypes = orig_allowed
 
 
+def test_upload_without_extractor_rejected(client, tmp_path):
+    """Test that types with no registered extractor are rejected at upload."""
+    settings.upload_dir = str(tmp_path)
+    content = b"\x00\x01binary"
+    files = {"file": ("blob.bin", io.BytesIO(content), "application/octet-stream")}
+    resp = client.post("/documents/upload", files=files)
+    assert resp.status_code == 415
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_client_content_type_is_not_trusted(client, tmp_path):
+    """Test that sniffed content wins over the declared MIME type."""
+    settings.upload_dir = str(tmp_path)
+    content = b"\x00\x01\x02 definitely not a pdf"
+    files = {"file": ("scan.pdf", io.BytesIO(content), "application/pdf")}
+    resp = client.post("/documents/upload", files=files)
+    assert resp.status_code == 415
+    assert list(tmp_path.iterdir()) == []
+
+
 def test_oversize_rejected(client, tmp_path):
     """Test rejection of files exceeding size limit."""
     settings.upload_dir = str(tmp_path)
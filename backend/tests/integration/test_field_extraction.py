@@ -0,0 +1,112 @@
+"""POST /documents/{id}/extract/fields integration tests."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+PAGES = [
+    "Happy Paws Clinic\nPatient: Rex, Dog, Labrador, 30 kg",
+    "Physical exam unremarkable. Heart rate normal.",
+    "Medications prescribed:\nCarprofen 75 mg tablet BID\nOmeprazole 10 mg SID",
+]
+
+
+def _document(client, upload, uploads):
+    doc_id = upload(content=b"record").json()["id"]
+    record = {"pet": {"name": "Rex", "species": "Dog"}, "clinic_name": "Happy Paws"}
+    assert (
+        client.put(f"/documents/{doc_id}", json={"record": record}).status_code == 200
+    )
+    text = "".join(f"\n--- Page {i} ---\n{page}\n" for i, page in enumerate(PAGES, 1))
+    (uploads / f"{doc_id}.txt").write_text(text)
+    return doc_id
+
+
+def test_re_extracts_only_requested_fields(
+    client, uploads, upload, fake_llm, monkeypatch
+):
+    monkeypatch.setattr(settings, "field_extraction_max_chars", 100)
+    doc_id = _document(client, upload, uploads)
+    llm = fake_llm(
+        {
+            "medications": [
+                {"name": "Carprofen", "dosage": "75 mg BID"},
+                {"name": "Omeprazole", "dosage": 10},
+            ]
+        }
+    )
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        resp = client.post(
+            f"/documents/{doc_id}/extract/fields",
+            json={"fields": ["medications"]},
+            headers={"If-Match": '"v1"'},
+        )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["version"] == 2
+    assert body["pages"] == [3]
+    assert resp.headers["ETag"] == '"v2"'
+
+    kwargs = llm.chat.completions.create.call_args.kwargs
+    prompt = kwargs["messages"][-1]["content"]
+    assert "Carprofen 75 mg" in prompt and "Patient: Rex" not in prompt
+    schema = kwargs["response_format"]["json_schema"]["schema"]
+    assert list(schema["properties"]) == ["medications"]
+
+    record = client.get(f"/documents/{doc_id}/record").json()["record"]
+    assert [m["dosage"] for m in record["medications"]] == ["75 mg BID", "10"]
+    assert record["pet"]["name"] == "Rex"
+    assert record["clinic_name"] == "Happy Paws"
+    history = client.get(f"/documents/{doc_id}/record/versions").json()
+    assert history["versions"][-1]["source"] == "llm"
+
+
+def test_explicit_pages_and_errors(client, uploads, upload, fake_llm):
+    doc_id = _document(client, upload, uploads)
+    llm = fake_llm({"pet": {"name": "Rex", "weight": "30 kg"}, "clinic_name": None})
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        resp = client.post(
+            f"/documents/{doc_id}/extract/fields",
+            json={"fields": ["clinic_name", "pet"], "pages": [1]},
+        )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["fields"] == ["pet", "clinic_name"]
+    record = client.get(f"/documents/{doc_id}/record").json()["record"]
+    assert record["pet"]["weight"] == "30 kg"
+    assert record["pet"]["species"] is None
+    assert record["clinic_name"] is None
+
+    url = f"/documents/{doc_id}/extract/fields"
+    assert client.post(url, json={"fields": ["owner"]}).status_code == 422
+    assert client.post(url, json={"fields": []}).status_code == 422
+    assert client.post(url, json={"fields": ["pet"], "pages": [9]}).status_code == 422
+    stale = client.post(url, json={"fields": ["pet"]}, headers={"If-Match": '"v1"'})
+    assert stale.status_code == 412
+    missing = client.post("/documents/missing/extract/fields", json={"fields": ["pet"]})
+    assert missing.status_code == 404
+
+
+def test_deadline_cancels_the_llm_call(client, uploads, upload):
+    doc_id = _document(client, upload, uploads)
+
+    async def slow(**kwargs):
+        await asyncio.sleep(5)
+
+    llm = AsyncMock()
+    llm.chat.completions.create.side_effect = slow
+    cancelled = metrics.counter("llm.cancelled")
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        t0 = time.monotonic()
+        resp = client.post(
+            f"/documents/{doc_id}/extract/fields",
+            json={"fields": ["medications"]},
+            headers={"X-Request-Timeout": "0.3"},
+        )
+    assert resp.status_code == 504
+    assert time.monotonic() - t0 < 3
+    assert metrics.counter("llm.cancelled") == cancelled + 1
+    assert metrics.counter("requests.cancelled.deadline") >= 1
+    assert client.get(f"/documents/{doc_id}/record").json()["version"] == 1
@@ -0,0 +1,197 @@
+"""Idempotency-Key handling for upload and extraction."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core import admission
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.base import Base
+from app.db.model_exports import Document, IdempotencyKey
+from app.services import idempotency
+
+SCOPE = "POST /documents/x/extract"
+KEY = {"Idempotency-Key": "k-1"}
+
+
+@pytest.fixture
+def sessions(pglite_session):
+    Base.metadata.create_all(bind=pglite_session.bind)
+    factory = sessionmaker(bind=pglite_session.bind)
+    opened = []
+
+    def new():
+        opened.append(factory())
+        return opened[-1]
+
+    yield new
+    for session in opened:
+        session.close()
+
+
+def test_upload_retry_returns_the_same_document(
+    client, uploads, upload, pglite_session
+):
+    replayed = metrics.counter("idempotency.upload.replayed")
+    first = upload(headers=KEY)
+    second = upload(headers=KEY)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert pglite_session.scalar(select(func.count()).select_from(Document)) == 1
+    assert len(list(Path(uploads).glob("*.json"))) == 1
+    assert metrics.counter("idempotency.upload.replayed") == replayed + 1
+    # Without a key every upload is new.
+    assert upload().json() != first.json()
+
+
+def test_key_reused_for_another_request_is_rejected(client, uploads, upload):
+    assert upload(headers=KEY).status_code == 200
+    response = upload(content=b"Another patient entirely", headers=KEY)
+    assert response.status_code == 422
+    assert "different request" in response.json()["detail"]
+    # Same name, type and size, different content.
+    assert upload(content=b"Patient: Max", headers=KEY).status_code == 422
+
+
+def test_extract_retry_does_not_call_the_llm_again(client, uploads, upload, fake_llm):
+    doc_id = upload().json()["id"]
+    llm = fake_llm({"pet": {"name": "Rex"}, "clinic_name": "Happy Paws"})
+    headers = {"Idempotency-Key": "extract-1"}
+    url = f"/documents/{doc_id}/extract?include_raw_text=true"
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        first = client.post(url, headers=headers)
+        second = client.post(url, headers=headers)
+    assert first.status_code == second.status_code == 200
+    # The raw text is not stored with the key; the replay leaves it out.
+    expected = {k: v for k, v in first.json().items() if k != "raw_text"}
+    assert second.json() == expected
+    assert "raw_text" in first.json()
+    assert llm.chat.completions.create.await_count == 1
+
+
+def test_replay_needs_no_admission_slot(client, uploads, upload, fake_llm, monkeypatch):
+    doc_id = upload().json()["id"]
+    headers = {"Idempotency-Key": "extract-3"}
+    with patch("openai.AsyncOpenAI", return_value=fake_llm({"pet": {}})):
+        assert client.post(f"/documents/{doc_id}/extract", headers=headers).is_success
+    gate = admission.controller("extract")
+    # Every slot busy and no room to queue.
+    monkeypatch.setattr(gate, "in_flight", gate.max_concurrency)
+    monkeypatch.setattr(gate, "max_queue", 0)
+    replay = client.post(f"/documents/{doc_id}/extract", headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    busy = client.post(f"/documents/{doc_id}/extract")
+    assert busy.status_code == 503
+
+
+def test_failed_request_releases_the_key(client, uploads, upload, fake_llm):
+    doc_id = upload().json()["id"]
+    headers = {"Idempotency-Key": "extract-2"}
+    with patch("openai.AsyncOpenAI", return_value=fake_llm("not json at all")):
+        failed = client.post(f"/documents/{doc_id}/extract", headers=headers)
+    assert failed.status_code == 422
+    llm = fake_llm({"pet": {"name": "Rex"}})
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        retry = client.post(f"/documents/{doc_id}/extract", headers=headers)
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+    assert llm.chat.completions.create.await_count == 1
+
+
+def test_retry_attaches_to_the_request_in_progress(sessions, monkeypatch):
+    fp = idempotency.fingerprint(True)
+    original = sessions()
+    assert idempotency.claim(original, SCOPE, "k", fp) is None
+    attached = metrics.counter("idempotency.extract.attached")
+    claims = []
+    claim = idempotency.claim
+    monkeypatch.setattr(
+        idempotency, "claim", lambda *args: claims.append(args) or claim(*args)
+    )
+
+    async def scenario():
+        async def must_not_run():
+            raise AssertionError("the work ran twice")
+
+        retry = asyncio.create_task(
+            idempotency.handle(sessions(), "k", SCOPE, "extract", fp, must_not_run)
+        )
+        await asyncio.sleep(0.5)
+        assert not retry.done()
+        done = ORJSONResponse({"id": "x"}, headers={"ETag": '"v2"'})
+        idempotency.complete(original, SCOPE, "k", done)
+        return await retry
+
+    response = asyncio.run(scenario())
+    assert json.loads(response.body) == {"id": "x"}
+    assert response.headers["etag"] == '"v2"'
+    assert response.headers["idempotent-replayed"] == "true"
+    assert metrics.counter("idempotency.extract.attached") == attached + 1
+    # The wait only reads the row; the key is claimed once.
+    assert len(claims) == 1
+
+
+def test_retry_gives_up_waiting_with_409(sessions):
+    fp = idempotency.fingerprint(True)
+    assert idempotency.claim(sessions(), SCOPE, "k", fp) is None
+
+    async def never():
+        raise AssertionError("the work ran twice")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(
+            idempotency.handle(
+                sessions(), "k", SCOPE, "extract", fp, never, wait_seconds=0.3
+            )
+        )
+    assert exc.value.status_code == 409
+
+
+def test_stale_and_expired_keys_are_taken_over(sessions, monkeypatch):
+    fp = idempotency.fingerprint(True)
+    db = sessions()
+    monkeypatch.setattr(settings, "idempotency_lock_seconds", -1)
+    assert idempotency.claim(db, SCOPE, "stale", fp) is None
+    # Its holder is gone: the same request may take it over, another may not.
+    assert idempotency.claim(db, SCOPE, "stale", fp) is None
+    other = idempotency.claim(db, SCOPE, "stale", idempotency.fingerprint(False))
+    assert other is not None and other.fingerprint == fp
+
+    later = datetime.utcnow() + timedelta(hours=settings.idempotency_ttl_hours + 1)
+    assert idempotency.purge_expired(db, now=later) == 1
+    assert db.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+
+def test_retry_runs_once_the_original_releases_the_key(sessions):
+    fp = idempotency.fingerprint(True)
+    original = sessions()
+    assert idempotency.claim(original, SCOPE, "k", fp) is None
+
+    async def scenario():
+        async def run():
+            return ORJSONResponse({"id": "retry"})
+
+        retry = asyncio.create_task(
+            idempotency.handle(sessions(), "k", SCOPE, "extract", fp, run)
+        )
+        await asyncio.sleep(0.5)
+        idempotency.release(original, SCOPE, "k")
+        return await retry
+
+    response = asyncio.run(scenario())
+    assert json.loads(response.body) == {"id": "retry"}
+    assert "idempotent-replayed" not in response.headers
+    row = idempotency.current(sessions(), SCOPE, "k")
+    assert row.status == idempotency.COMPLETED
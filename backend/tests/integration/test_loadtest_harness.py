@@ -0,0 +1,48 @@
+"""Integration test: load harness against the app with the LLM stub in-process."""
+
+import asyncio
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from app.core.config import settings
+from app.main import app
+from loadtest.harness import run_load
+from loadtest.stub_llm import create_stub_app
+
+
+def test_harness_reports_per_stage_latency(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    sample = (
+        Path(__file__).resolve().parents[2]
+        / "data"
+        / "samples"
+        / "clinical_history_1.pdf"
+    )
+    stub = create_stub_app()
+    real_client = openai.AsyncOpenAI
+
+    def stub_client(**kwargs):
+        kwargs["http_client"] = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=stub)
+        )
+        kwargs["base_url"] = "http://stub/v1"
+        return real_client(**kwargs)
+
+    with patch("openai.AsyncOpenAI", side_effect=stub_client):
+        report = asyncio.run(
+            run_load(
+                "http://app",
+                str(sample),
+                requests=3,
+                concurrency=1,
+                transport=httpx.ASGITransport(app=app),
+            )
+        )
+
+    assert report["stages"]["upload"]["count"] == 3
+    assert report["stages"]["extract"]["errors"] == 0
+    assert report["stages"]["total"]["p95_ms"] > 0
+    assert report["throughput_rps"] > 0
@@ -0,0 +1,174 @@
+"""Near-duplicate detection and reuse of prior records on extraction."""
+
+import io
+import random
+from unittest.mock import patch
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.model_exports import DocumentLSHBand, StructuredRecord
+from app.services import document_service, near_duplicates
+
+WORDS = (
+    "patient canine vaccine abdomen weight temperature diagnosis treatment "
+    "dose oral every hours days recheck bloodwork otitis amoxicillin clinic"
+).split()
+PDF = "application/pdf"
+RECORD = {"pet": {"name": "Rex"}, "clinic_name": "Parque Oeste"}
+
+
+def _pdf(first_line: str, pages: int = 3, every_page: bool = False) -> bytes:
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(7)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, invariant=1)
+    for page in range(pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(10)) for _ in range(30)]
+        if page == 0 or every_page:
+            lines.insert(0, first_line)
+        for i, line in enumerate(lines):
+            c.drawString(40, 800 - 18 * i, line)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _extract(client, doc_id, llm, query=""):
+    with patch("openai.AsyncOpenAI", return_value=llm):
+        response = client.post(f"/documents/{doc_id}/extract{query}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_restamped_copy_sends_only_the_changed_page(
+    client, uploads, upload, fake_llm, pglite_session
+):
+    original = upload("a.pdf", _pdf("Printed 2024-03-01"), PDF).json()["id"]
+    first = _extract(client, original, fake_llm(RECORD))
+    assert "near_duplicate" not in first
+
+    copy = upload("b.pdf", _pdf("Printed 2024-09-17"), PDF).json()["id"]
+    llm = fake_llm({**RECORD, "visit_date": "2024-09-17"})
+    data = _extract(client, copy, llm)
+    assert data["near_duplicate"]["id"] == original
+    assert data["near_duplicate"]["similarity"] >= settings.near_duplicate_threshold
+    assert data["near_duplicate"]["changed_pages"] == [1]
+    assert data["near_duplicate"]["reused"] == "changed_pages"
+    assert data["record"]["visit_date"] == "2024-09-17"
+
+    assert llm.chat.completions.create.await_count == 1
+    prompt = llm.chat.completions.create.await_args.kwargs["messages"][1]["content"]
+    assert "Parque Oeste" in prompt and "2024-09-17" in prompt
+    assert "--- Page 1 ---" in prompt and "--- Page 2 ---" not in prompt
+    stored = pglite_session.scalar(
+        select(StructuredRecord.record_json).where(StructuredRecord.document_id == copy)
+    )
+    assert stored["visit_date"] == "2024-09-17"
+
+
+def test_stamp_on_every_page_sends_only_the_new_lines(
+    client, uploads, upload, fake_llm
+):
+    stamped = _pdf("Printed 2024-03-01", every_page=True)
+    original = upload("a.pdf", stamped, PDF).json()["id"]
+    _extract(client, original, fake_llm(RECORD))
+
+    restamped = _pdf("Printed 2024-09-17", every_page=True)
+    copy = upload("b.pdf", restamped, PDF).json()["id"]
+    llm = fake_llm({**RECORD, "visit_date": "2024-09-17"})
+    data = _extract(client, copy, llm)
+    assert data["near_duplicate"]["changed_pages"] == [1, 2, 3]
+    assert data["near_duplicate"]["reused"] == "changed_pages"
+    assert data["record"]["visit_date"] == "2024-09-17"
+
+    prompt = llm.chat.completions.create.await_args.kwargs["messages"][1]["content"]
+    assert prompt.count("Printed 2024-09-17") == 3
+    assert "2024-03-01" not in prompt
+    # The body of each page is in the original; it is not sent again.
+    body = (uploads / f"{copy}.txt").read_text().splitlines()
+    assert not [line for line in body if len(line) > 40 and line in prompt]
+
+
+def test_identical_text_reuses_the_record_without_the_llm(
+    client, uploads, upload, fake_llm
+):
+    reused = metrics.counter("near_duplicate.reused.record")
+    text = " ".join(random.Random(3).choice(WORDS) for _ in range(400))
+    original = upload("a.txt", text.encode()).json()["id"]
+    _extract(client, original, fake_llm(RECORD))
+
+    # Re-exported: different bytes, same words.
+    copy = upload("b.txt", text.upper().replace(" ", "\n").encode()).json()["id"]
+    llm = fake_llm({"pet": {"name": "Other"}})
+    data = _extract(client, copy, llm)
+    assert data["near_duplicate"]["reused"] == "record"
+    assert data["near_duplicate"]["changed_pages"] == []
+    assert data["record"]["clinic_name"] == "Parque Oeste"
+    assert llm.chat.completions.create.await_count == 0
+    assert metrics.counter("near_duplicate.reused.record") == reused + 1
+
+    # Opting out extracts in full but still reports the match.
+    data = _extract(client, copy, llm, "?reuse_near_duplicate=false")
+    assert data["near_duplicate"]["reused"] is None
+    assert data["record"]["pet"]["name"] == "Other"
+    assert llm.chat.completions.create.await_count == 1
+
+
+def test_near_duplicates_endpoint(client, uploads, upload, fake_llm, pglite_session):
+    original = upload("a.pdf", _pdf("Printed 2024-03-01"), PDF).json()["id"]
+    response = client.get(f"/documents/{original}/near-duplicates")
+    assert response.status_code == 404
+    _extract(client, original, fake_llm(RECORD))
+    copy = upload("b.pdf", _pdf("Printed 2024-09-17"), PDF).json()["id"]
+    _extract(client, copy, fake_llm(RECORD), "?reuse_near_duplicate=false")
+
+    body = client.get(f"/documents/{original}/near-duplicates").json()
+    assert [m["id"] for m in body["matches"]] == [copy]
+    assert body["matches"][0]["changed_pages"] == [1]
+    assert body["matches"][0]["has_record"] is True
+    # Re-extraction replaces a document's buckets instead of adding to them.
+    _extract(client, copy, fake_llm(RECORD), "?reuse_near_duplicate=false")
+    bands = pglite_session.scalars(
+        select(DocumentLSHBand.band).where(DocumentLSHBand.document_id == copy)
+    ).all()
+    assert sorted(bands) == list(range(16))
+
+
+def test_documents_with_records_are_not_crowded_out(
+    client, pglite_session, monkeypatch
+):
+    db = pglite_session
+    text = " ".join(random.Random(5).choice(WORDS) for _ in range(400))
+    fp = near_duplicates.fingerprint([text])
+    for doc_id in ("copy-1", "copy-2", "with-record"):
+        document_service.persist_document_metadata(
+            db,
+            {
+                "id": doc_id,
+                "original_filename": "a.txt",
+                "stored_filename": f"{doc_id}_a.txt",
+                "content_type": "text/plain",
+                "size": 1,
+                "path": f"/tmp/{doc_id}_a.txt",
+            },
+        )
+        near_duplicates.store(db, doc_id, fp)
+    # Shares fewer buckets than the record-less copies, so ranks last.
+    db.execute(
+        delete(DocumentLSHBand).where(
+            DocumentLSHBand.document_id == "with-record", DocumentLSHBand.band < 4
+        )
+    )
+    document_service.upsert_structured_record(db, "with-record", RECORD)
+    db.commit()
+    monkeypatch.setattr(near_duplicates, "MAX_CANDIDATES", 2)
+
+    assert {m.document_id for m in near_duplicates.find(db, "q", fp)} == {
+        "copy-1",
+        "copy-2",
+    }
+    matches = near_duplicates.find(db, "q", fp, with_record=True)
+    assert [m.document_id for m in matches] == ["with-record"]
@@ -28,3 +28,40 @@ def test_upload_and_update_record(client, tmp_path):
     body = upd.json()
     assert body["id"] == doc_id
     assert body["record"]["pet"]["name"] == "Rex"
+
+
+def test_bulk_upsert_returns_rows_and_keeps_manual_version(
+    client, tmp_path, pglite_session
+):
+    from app.services.document_service import (
+        bulk_upsert_structured_records,
+        upsert_structured_record,
+    )
+
+    settings.upload_dir = str(tmp_path)
+    ids = []
+    for i in range(3):
+        files = {"file": (f"b{i}.txt", io.BytesIO(b"bulk"), "text/plain")}
+        ids.append(client.post("/documents/upload", files=files).json()["id"])
+
+    rows = bulk_upsert_structured_records(
+        pglite_session, [(d, {"clinic_name": d}) for d in ids], "v1"
+    )
+    assert [r["document_id"] for r in rows] == ids
+    assert all(r["prompt_version"] == "v1" for r in rows)
+
+    # Manual edits go through the same statement and keep the prompt version.
+    upsert_structured_record(pglite_session, ids[0], {"clinic_name": "Edited"})
+    (row,) = bulk_upsert_structured_records(
+        pglite_session, {ids[0]: {"clinic_name": "Edited again"}}, None
+    )
+    assert row["record_json"] == {"clinic_name": "Edited again"}
+    assert row["prompt_version"] == "v1"
+
+
+def test_upsert_for_missing_document_returns_404(client):
+    resp = client.put(
+        "/documents/" + "0" * 32,
+        json={"record": {"pet": {"name": "Rex"}, "diagnoses": [], "medications": []}},
+    )
+    assert resp.status_code == 404
@@ -0,0 +1,122 @@
+"""PATCH /documents/{id}/record integration tests."""
+
+import io
+
+from app.core.config import settings
+
+JSON_PATCH = {"Content-Type": "application/json-patch+json"}
+MERGE_PATCH = {"Content-Type": "application/merge-patch+json"}
+
+
+def _document(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    files = {"file": ("p.txt", io.BytesIO(b"patch"), "text/plain")}
+    doc_id = client.post("/documents/upload", files=files).json()["id"]
+    record = {
+        "pet": {"name": "Rex", "species": "Dog"},
+        "clinic_name": "Clinic A",
+        "medications": [{"name": "Carprofen", "dosage": "100 mg"}],
+    }
+    assert (
+        client.put(f"/documents/{doc_id}", json={"record": record}).status_code == 200
+    )
+    return doc_id
+
+
+def _patch(client, doc_id, body, headers):
+    return client.patch(f"/documents/{doc_id}/record", json=body, headers=headers)
+
+
+def _record(client, doc_id):
+    return client.get(f"/documents/{doc_id}/record").json()
+
+
+def test_json_patch_updates_fields_in_place(client, tmp_path):
+    doc_id = _document(client, tmp_path)
+    ops = [
+        {"op": "test", "path": "/pet/name", "value": "Rex"},
+        {"op": "replace", "path": "/pet/name", "value": "Max"},
+        {"op": "add", "path": "/medications/-", "value": {"name": "Omeprazole"}},
+        {"op": "add", "path": "/medications/0", "value": {"name": "Gabapentin"}},
+        {"op": "remove", "path": "/clinic_name"},
+        {"op": "add", "path": "/notes", "value": "recheck in 2 weeks"},
+    ]
+    resp = _patch(client, doc_id, ops, JSON_PATCH)
+    assert resp.status_code == 200
+    assert resp.json() == {"id": doc_id, "version": 2}
+    assert resp.headers["ETag"] == '"v2"'
+
+    current = _record(client, doc_id)
+    assert current["version"] == 2
+    record = current["record"]
+    assert record["pet"] == {
+        "name": "Max",
+        "species": "Dog",
+        "breed": None,
+        "age": None,
+        "weight": None,
+        "microchip": None,
+    }
+    assert [m["name"] for m in record["medications"]] == [
+        "Gabapentin",
+        "Carprofen",
+        "Omeprazole",
+    ]
+    # Added sub-models are validated and filled in like a full PUT.
+    assert record["medications"][2]["dosage"] is None
+    assert "clinic_name" not in record
+    assert record["notes"] == "recheck in 2 weeks"
+
+    history = client.get(f"/documents/{doc_id}/record/versions/1").json()
+    assert history["record"]["pet"]["name"] == "Rex"
+
+
+def test_merge_patch_and_if_match(client, tmp_path):
+    doc_id = _document(client, tmp_path)
+    body = {"pet": {"weight": "31 kg", "species": None}, "veterinarian": "Dr. Ruiz"}
+    resp = _patch(client, doc_id, body, {**MERGE_PATCH, "If-Match": '"v1"'})
+    assert resp.status_code == 200
+    record = _record(client, doc_id)["record"]
+    assert record["pet"]["weight"] == "31 kg"
+    assert record["pet"]["name"] == "Rex"
+    assert "species" not in record["pet"]
+    assert record["veterinarian"] == "Dr. Ruiz"
+
+    stale = _patch(client, doc_id, {"notes": "x"}, {**MERGE_PATCH, "If-Match": '"v1"'})
+    assert stale.status_code == 412
+
+
+def test_invalid_patches_are_rejected(client, tmp_path):
+    doc_id = _document(client, tmp_path)
+    cases = [
+        ([{"op": "replace", "path": "/pet", "value": None}], 422),
+        ([{"op": "remove", "path": "/medications/0/name"}], 422),
+        ([{"op": "add", "path": "/unknown", "value": 1}], 422),
+        ([{"op": "add", "path": "/medications/-", "value": {"dosage": "1"}}], 422),
+        ([{"op": "replace", "path": "/medications/5/name", "value": "x"}], 409),
+        ([{"op": "test", "path": "/pet/name", "value": "Max"}], 409),
+        ([{"op": "add", "path": 5, "value": 1}], 422),
+        ([{"op": "move", "from": 5, "path": "/notes"}], 422),
+    ]
+    for ops, status in cases:
+        assert _patch(client, doc_id, ops, JSON_PATCH).status_code == status, ops
+    assert _record(client, doc_id)["version"] == 1
+
+    unsupported = _patch(client, doc_id, {"notes": "x"}, {})
+    assert unsupported.status_code == 415
+    missing = _patch(client, "missing", {"notes": "x"}, MERGE_PATCH)
+    assert missing.status_code == 404
+
+
+def test_move_falls_back_to_python(client, tmp_path):
+    doc_id = _document(client, tmp_path)
+    ops = [
+        {"op": "copy", "from": "/medications/0", "path": "/medications/-"},
+        {"op": "move", "from": "/pet/species", "path": "/pet/breed"},
+    ]
+    assert _patch(client, doc_id, ops, JSON_PATCH).status_code == 200
+    current = _record(client, doc_id)
+    assert current["version"] == 2
+    assert len(current["record"]["medications"]) == 2
+    assert current["record"]["pet"]["breed"] == "Dog"
+    assert current["record"]["pet"]["species"] is None
@@ -0,0 +1,117 @@
+"""Structured record version history integration tests."""
+
+import io
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.model_exports import StructuredRecordVersion
+from app.services.document_service import upsert_structured_record
+
+
+def _record(clinic, medications=()):
+    return {
+        "pet": {"name": "Rex"},
+        "clinic_name": clinic,
+        "diagnoses": [],
+        "medications": [{"name": m} for m in medications],
+    }
+
+
+def test_versions_store_patches_and_reconstruct(
+    client, tmp_path, pglite_session, monkeypatch
+):
+    settings.upload_dir = str(tmp_path)
+    monkeypatch.setattr(settings, "record_snapshot_interval", 3)
+    files = {"file": ("v.txt", io.BytesIO(b"versions"), "text/plain")}
+    doc_id = client.post("/documents/upload", files=files).json()["id"]
+
+    upsert_structured_record(
+        pglite_session, doc_id, _record("LLM", ["a", "b"]), prompt_version="p1"
+    )
+    edits = [_record("Edited", ["a", "b"]), _record("Edited", ["a"])]
+    edits += [_record(f"Edit {i}", ["a"]) for i in range(3)]
+    for record in edits:
+        assert (
+            client.put(f"/documents/{doc_id}", json={"record": record}).status_code
+            == 200
+        )
+
+    current = client.get(f"/documents/{doc_id}/record").json()
+    assert current["version"] == 6
+    assert current["record"]["clinic_name"] == "Edit 2"
+
+    listing = client.get(f"/documents/{doc_id}/record/versions").json()["versions"]
+    assert [v["version"] for v in listing] == [1, 2, 3, 4, 5, 6]
+    assert [v["snapshot"] for v in listing] == [True, False, True, False, False, True]
+    assert listing[0]["source"] == "llm"
+    assert listing[1]["source"] == "manual"
+    assert listing[1]["prompt_version"] == "p1"
+
+    # The machine output survives reviewer edits.
+    first = client.get(f"/documents/{doc_id}/record/versions/1").json()
+    assert first["record"]["clinic_name"] == "LLM"
+    assert [m["name"] for m in first["record"]["medications"]] == ["a", "b"]
+    fifth = client.get(f"/documents/{doc_id}/record/versions/5").json()
+    assert fifth["record"]["clinic_name"] == "Edit 1"
+
+    patch = pglite_session.execute(
+        select(StructuredRecordVersion.patch).where(
+            StructuredRecordVersion.document_id == doc_id,
+            StructuredRecordVersion.version == 5,
+        )
+    ).scalar_one()
+    # Only the changed leaves are stored (plus the schema's extraction_date).
+    assert {"op": "replace", "path": "/clinic_name", "value": "Edit 1"} in patch
+    assert {op["path"] for op in patch} <= {"/clinic_name", "/extraction_date"}
+
+    assert client.get(f"/documents/{doc_id}/record/versions/7").status_code == 404
+
+
+def test_record_endpoints_404_without_record(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    files = {"file": ("n.txt", io.BytesIO(b"none"), "text/plain")}
+    doc_id = client.post("/documents/upload", files=files).json()["id"]
+    assert client.get(f"/documents/{doc_id}/record").status_code == 404
+    assert client.get(f"/documents/{doc_id}/record/versions").status_code == 404
+
+
+def test_conditional_put_rejects_stale_etag(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    files = {"file": ("etag.txt", io.BytesIO(b"etag"), "text/plain")}
+    doc_id = client.post("/documents/upload", files=files).json()["id"]
+    url = f"/documents/{doc_id}"
+
+    # If-Match needs an existing record; there is none yet.
+    missing = client.put(url, json={"record": _record("A")}, headers={"If-Match": "*"})
+    assert missing.status_code == 412
+
+    created = client.put(url, json={"record": _record("A")})
+    assert created.headers["ETag"] == '"v1"'
+    read = client.get(f"{url}/record")
+    assert read.headers["ETag"] == '"v1"'
+    cached = client.get(f"{url}/record", headers={"If-None-Match": '"v1"'})
+    assert cached.status_code == 304
+
+    # Two reviewers start from v1; the second save loses.
+    first = client.put(url, json={"record": _record("B")}, headers={"If-Match": '"v1"'})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+    assert first.headers["ETag"] == '"v2"'
+    second = client.put(
+        url, json={"record": _record("C")}, headers={"If-Match": '"v1"'}
+    )
+    assert second.status_code == 412
+    assert client.get(f"{url}/record").json()["record"]["clinic_name"] == "B"
+
+    # Weak tags never satisfy If-Match; a list with the current tag does.
+    weak = client.put(
+        url, json={"record": _record("C")}, headers={"If-Match": 'W/"v2"'}
+    )
+    assert weak.status_code == 412
+    listed = client.put(
+        url, json={"record": _record("C")}, headers={"If-Match": '"v1", "v2"'}
+    )
+    assert listed.status_code == 200
+    versions = client.get(f"{url}/record/versions").json()["versions"]
+    assert [v["version"] for v in versions] == [1, 2, 3]
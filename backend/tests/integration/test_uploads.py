@@ -0,0 +1,127 @@
+"""Resumable upload session integration tests."""
+
+import fcntl
+import hashlib
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.core.config import settings
+from app.db.model_exports import Document
+from app.services import upload_sessions
+
+PATCH_HEADERS = {"Content-Type": "application/offset+octet-stream"}
+
+
+def _patch(client, session_id, offset, data):
+    return client.patch(
+        f"/uploads/{session_id}",
+        content=data,
+        headers={**PATCH_HEADERS, "Upload-Offset": str(offset)},
+    )
+
+
+def test_resumable_upload_matches_direct_upload(client, tmp_path, pglite_session):
+    settings.upload_dir = str(tmp_path)
+    content = b"Patient: Bella\nDiagnosis: otitis\n" * 1000
+    digest = hashlib.sha256(content).hexdigest()
+
+    created = client.post(
+        "/uploads",
+        json={"filename": "notes.txt", "length": len(content), "sha256": digest},
+    )
+    assert created.status_code == 201
+    session_id = created.json()["id"]
+    assert created.headers["Location"] == f"/uploads/{session_id}"
+
+    first = _patch(client, session_id, 0, content[:10000])
+    assert first.status_code == 204
+    assert first.headers["Upload-Offset"] == "10000"
+
+    # A retry from a stale offset is refused with the server's position.
+    assert _patch(client, session_id, 0, content[:10]).status_code == 409
+
+    # Lose the in-memory hash state, as after a restart; it is rebuilt from disk.
+    upload_sessions._hashers.clear()
+    head = client.head(f"/uploads/{session_id}")
+    assert head.headers["Upload-Offset"] == "10000"
+    assert _patch(client, session_id, 10000, content[10000:]).status_code == 204
+
+    done = client.post(f"/uploads/{session_id}/finalize")
+    assert done.status_code == 200
+    body = done.json()
+    assert body == {"id": session_id, "filename": "notes.txt", "sha256": digest}
+
+    meta = json.loads((tmp_path / f"{session_id}.json").read_text())
+    assert meta["content_type"] == "text/plain"
+    assert meta["stored_filename"] == f"{session_id}_notes.txt"
+    assert meta["size"] == len(content)
+    doc = pglite_session.get(Document, session_id)
+    assert doc is not None and doc.size == len(content)
+
+    dl = client.get(f"/documents/{session_id}/file")
+    assert dl.content == content
+    assert not list((tmp_path / upload_sessions.SESSION_DIR_NAME).iterdir())
+
+
+def test_unsupported_first_chunk_ends_session(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    data = bytes(range(256)) * 64
+    session_id = client.post(
+        "/uploads", json={"filename": "blob.bin", "length": len(data)}
+    ).json()["id"]
+
+    resp = _patch(client, session_id, 0, data)
+    assert resp.status_code == 415
+    assert client.head(f"/uploads/{session_id}").status_code == 404
+
+
+def test_finalize_incomplete_and_checksum_mismatch(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    session_id = client.post(
+        "/uploads", json={"filename": "a.txt", "length": 10, "sha256": "0" * 64}
+    ).json()["id"]
+    assert _patch(client, session_id, 0, b"hello").status_code == 204
+    assert client.post(f"/uploads/{session_id}/finalize").status_code == 409
+
+    assert _patch(client, session_id, 5, b"world!").status_code == 413
+    assert _patch(client, session_id, 5, b"world").status_code == 204
+    assert client.post(f"/uploads/{session_id}/finalize").status_code == 422
+    assert not (Path(tmp_path) / f"{session_id}.json").exists()
+
+
+def test_expired_sessions_are_purged(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    session_id = client.post(
+        "/uploads", json={"filename": "a.txt", "length": 3}
+    ).json()["id"]
+    later = datetime.utcnow() + timedelta(
+        minutes=settings.upload_session_ttl_minutes + 1
+    )
+    assert upload_sessions.purge_expired_sessions(now=later) == 1
+    assert client.get(f"/uploads/{session_id}").status_code == 404
+
+
+def test_patch_while_another_worker_writes_is_409(client, tmp_path):
+    settings.upload_dir = str(tmp_path)
+    created = client.post("/uploads", json={"filename": "n.txt", "length": 20})
+    session_id = created.json()["id"]
+    # Another worker process holds the part file's lock mid-PATCH.
+    with upload_sessions._part_path(session_id).open("ab") as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX)
+        busy = _patch(client, session_id, 0, b"Patient: Bella\n")
+        assert busy.status_code == 409
+        assert "busy" in busy.json()["detail"]
+        other.write(b"Patient: ")
+    # Its bytes count: the offset is checked under the lock, against the file.
+    assert _patch(client, session_id, 0, b"Patient: ").status_code == 409
+    done = _patch(client, session_id, 9, b"Bella\n")
+    assert done.status_code == 204
+    assert done.headers["Upload-Offset"] == "15"
+    assert _patch(client, session_id, 15, b"Bella").status_code == 204
+    # Finalize takes the same lock: a PATCH still writing makes it 409.
+    with upload_sessions._part_path(session_id).open("ab") as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX)
+        busy = client.post(f"/uploads/{session_id}/finalize")
+        assert busy.status_code == 409
+    assert client.post(f"/uploads/{session_id}/finalize").status_code == 200
@@ -0,0 +1,101 @@
+"""Admission controller unit tests."""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.admission import AdmissionController, rss_bytes
+from app.core.metrics import metrics
+
+
+def _controller(name, rss=None, budget=None, **kwargs):
+    options = {"max_concurrency": 1, "max_queue": 1, "queue_timeout": 1.0}
+    options.update(kwargs)
+    return AdmissionController(
+        name,
+        target_p95_ms=1000,
+        memory_budget=lambda: budget,
+        rss=lambda: rss,
+        **options,
+    )
+
+
+def test_queues_then_sheds_with_retry_after():
+    gate = _controller("t_queue")
+
+    async def scenario():
+        await gate.acquire()
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0.01)
+        assert metrics.snapshot()["gauges"]["admission.t_queue.queue_depth"] == 1
+        with pytest.raises(HTTPException) as rejected:
+            await gate.acquire()
+        gate.release(50.0)
+        await waiting
+        gate.release(50.0)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert 1 <= int(rejected.headers["Retry-After"]) <= 60
+    assert metrics.counter("admission.t_queue.rejected.queue_full") == 1
+    assert metrics.timing_count("admission.t_queue.wait_ms") == 2
+    assert gate.in_flight == 0
+
+
+def test_queue_timeout():
+    gate = _controller("t_timeout", queue_timeout=0.05)
+
+    async def scenario():
+        await gate.acquire()
+        try:
+            await gate.acquire()
+        finally:
+            gate.release(None)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(scenario())
+    assert metrics.counter("admission.t_timeout.rejected.queue_timeout") == 1
+    assert gate.in_flight == 0
+
+
+def test_limit_adapts_to_latency_and_memory():
+    gate = _controller("t_adapt", max_concurrency=4, rss=100, budget=1000)
+    for _ in range(10):
+        gate.record(5000.0)
+    gate.adapt(force=True)
+    assert gate.limit == 3
+
+    gate = _controller("t_memory", max_concurrency=4, rss=1000, budget=1000)
+    gate.adapt(force=True)
+    assert gate.limit == 1
+
+    gate = _controller("t_grow", max_concurrency=4, rss=100, budget=1000)
+    gate.limit = gate.in_flight = 2
+    gate.adapt(force=True)
+    assert gate.limit == 3
+
+
+def test_slow_burst_ages_out_of_the_latency_window(monkeypatch):
+    gate = _controller("t_decay", max_concurrency=4, rss=100, budget=1000)
+    for _ in range(50):
+        gate.record(5000.0)
+    gate.limit = gate.in_flight = 1
+    gate.adapt(force=True)
+    assert gate.limit == 1
+    # The burst is older than the window: the limit grows again, though no
+    # new request has finished and the published summary still shows it.
+    later = time.monotonic() + settings.admission_latency_window_seconds + 1
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    assert gate.recent_p95() is None
+    gate.adapt(force=True)
+    assert gate.limit == 2
+    assert metrics.quantile(gate.latency_metric, 95) == 5000.0
+
+
+def test_rss_is_read_from_proc():
+    rss = rss_bytes()
+    assert rss is None or rss > 1024 * 1024
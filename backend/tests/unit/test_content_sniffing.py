@@ -0,0 +1,113 @@
+"""Unit tests for magic-byte content sniffing."""
+
+import io
+import struct
+import zipfile
+
+import pytest
+
+from app.services import content_sniffing
+from app.services.content_sniffing import (
+    DOCX_MIME,
+    ZIP_MIME,
+    guess_from_name,
+    probe_zip,
+    sniff_bytes,
+)
+
+
+@pytest.mark.parametrize(
+    "head,expected",
+    [
+        (b"%PDF-1.7\n", "application/pdf"),
+        (b"\x89PNG\r\n\x1a\n\x00\x00", "image/png"),
+        (b"\xff\xd8\xff\xe0", "image/jpeg"),
+        (b"II*\x00\x08\x00", "image/tiff"),
+        (b"MM\x00*\x00\x08", "image/tiff"),
+        (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1\x00", "application/msword"),
+        (b"\x00\x00\x00\x18ftypheic\x00", "image/heic"),
+        ("Peso: 30 kg, diagnóstico".encode("utf-8"), "text/plain"),
+        ("Alcorcón".encode("cp1252"), "text/plain"),
+        (b"\x00\x01\x02\x03binary", None),
+    ],
+)
+def test_sniff_signatures(head, expected):
+    assert sniff_bytes(head) == expected
+
+
+def _zip_bytes(names):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name in names:
+            zf.writestr(name, "<x/>")
+    return buf.getvalue()
+
+
+def test_sniff_docx_from_local_headers_in_first_chunk():
+    data = _zip_bytes(["[Content_Types].xml", "word/document.xml"])
+    assert sniff_bytes(data[:4096]) == DOCX_MIME
+
+
+def test_sniff_plain_zip_is_not_docx():
+    data = _zip_bytes(["notes/readme.txt"])
+    assert sniff_bytes(data) == ZIP_MIME
+
+
+def test_probe_zip_reads_central_directory(tmp_path):
+    # word/ is the last member, so the first chunk alone is inconclusive.
+    data = _zip_bytes([f"customXml/item{i}.xml" for i in range(200)] + ["word/a.xml"])
+    assert sniff_bytes(data[:512]) == ZIP_MIME
+    path = tmp_path / "upload"
+    path.write_bytes(data)
+    assert probe_zip(path) == DOCX_MIME
+
+
+def _as_zip64(data: bytes) -> bytes:
+    """Rewrite the EOCD the way large archives have it: sizes in Zip64 records."""
+    eocd = data.rfind(b"PK\x05\x06")
+    entries, cd_size, cd_offset = struct.unpack("<HII", data[eocd + 10 : eocd + 20])
+    record = struct.pack(
+        "<4sQHHIIQQQQ",
+        b"PK\x06\x06",
+        44,
+        45,
+        45,
+        0,
+        0,
+        entries,
+        entries,
+        cd_size,
+        cd_offset,
+    )
+    locator = struct.pack("<4sIQI", b"PK\x06\x07", 0, eocd, 1)
+    tail = data[eocd : eocd + 12] + b"\xff" * 8 + data[eocd + 20 :]
+    return data[:eocd] + record + locator + tail
+
+
+def test_probe_zip_follows_the_zip64_locator(tmp_path, monkeypatch):
+    data = _as_zip64(_zip_bytes(["[Content_Types].xml", "word/document.xml"]))
+    path = tmp_path / "large.docx"
+    path.write_bytes(data)
+    assert zipfile.ZipFile(path).namelist()[-1] == "word/document.xml"
+    # Only the central directory can answer.
+    monkeypatch.setattr(content_sniffing, "_local_header_names", lambda head: [])
+    assert probe_zip(path) == DOCX_MIME
+
+
+def test_probe_zip_falls_back_to_local_headers(tmp_path):
+    data = _zip_bytes(["[Content_Types].xml", "word/document.xml"])
+    path = tmp_path / "cut.docx"
+    path.write_bytes(data[: data.rfind(b"PK\x05\x06")])
+    assert probe_zip(path) == DOCX_MIME
+
+
+def test_probe_zip_handles_truncated_file(tmp_path):
+    path = tmp_path / "broken"
+    path.write_bytes(b"PK\x03\x04garbage")
+    assert probe_zip(path) == ZIP_MIME
+
+
+def test_guess_from_name_for_empty_uploads():
+    assert guess_from_name("notes.txt", None) == "text/plain"
+    assert guess_from_name("upload", "image/png") == "image/png"
+    assert guess_from_name("upload", None) == "application/octet-stream"
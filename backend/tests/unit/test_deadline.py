@@ -0,0 +1,93 @@
+"""Request deadline and cancellation unit tests."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from app.core import deadline as deadlines
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.extraction import ocr
+
+
+def test_deadline_expiry_and_cancel():
+    deadline = deadlines.Deadline(0.05)
+    deadline.check()
+    assert 0 < deadline.remaining() <= 0.05
+    time.sleep(0.06)
+    with pytest.raises(deadlines.DeadlineExceeded):
+        deadline.check()
+
+    unlimited = deadlines.Deadline(None)
+    assert unlimited.remaining() is None and not unlimited.done
+    unlimited.cancel()
+    with pytest.raises(deadlines.ClientDisconnected):
+        unlimited.check()
+
+    deadlines.check()  # no deadline outside a request
+    with deadlines.use(unlimited):
+        with pytest.raises(deadlines.ClientDisconnected):
+            deadlines.check()
+
+
+def test_guard_cancels_the_awaited_work():
+    cancelled = []
+
+    async def slow() -> str:
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "late"
+
+    deadline = deadlines.Deadline(0.2)
+    t0 = time.monotonic()
+    with pytest.raises(deadlines.DeadlineExceeded):
+        asyncio.run(deadline.guard(slow()))
+    assert time.monotonic() - t0 < 1
+    assert cancelled == [True]
+
+
+def test_run_cancellable_stops_work_when_the_client_leaves():
+    class Request:
+        async def is_disconnected(self) -> bool:
+            return True
+
+    def work() -> str:
+        while True:
+            deadlines.check()
+            time.sleep(0.01)
+
+    deadline = deadlines.Deadline(5)
+    with pytest.raises(deadlines.ClientDisconnected):
+        asyncio.run(deadlines.run_cancellable(Request(), deadline, work))
+
+
+@pytest.fixture
+def slow_tesseract(tmp_path, monkeypatch):
+    script = tmp_path / "tesseract"
+    script.write_text("#!/bin/sh\nsleep 30\n")
+    script.chmod(0o755)
+    monkeypatch.setattr(ocr.pytesseract.pytesseract, "tesseract_cmd", str(script))
+    return Image.new("L", (20, 10))
+
+
+def test_ocr_kills_tesseract_on_disconnect(slow_tesseract):
+    before = metrics.counter("ocr.killed")
+    deadline = deadlines.Deadline(None)
+    threading.Timer(0.2, deadline.cancel).start()
+    t0 = time.monotonic()
+    with deadlines.use(deadline), pytest.raises(deadlines.ClientDisconnected):
+        ocr.image_to_string(slow_tesseract)
+    assert time.monotonic() - t0 < 5
+    assert metrics.counter("ocr.killed") == before + 1
+
+
+def test_ocr_timeout(slow_tesseract, monkeypatch):
+    monkeypatch.setattr(settings, "ocr_timeout_seconds", 0.2)
+    with pytest.raises(RuntimeError, match="timeout"):
+        ocr.image_to_string(slow_tesseract)
@@ -0,0 +1,33 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.services.extraction.converters import ConverterUnavailableError
+from app.services.extraction.doc import DocExtractor
+from app.services.extraction.heic import HeicExtractor
+
+
+def test_doc_extraction_uses_antiword(tmp_path):
+    path = tmp_path / "legacy.doc"
+    path.write_bytes(b"\xd0\xcf\x11\xe0")
+    extractor = DocExtractor()
+    extractor.converter = "antiword"
+    with patch(
+        "app.services.extraction.doc.run_converter", return_value=b"Historial\n"
+    ) as run:
+        result = extractor.extract(str(path))
+    assert result.text == "Historial\n"
+    assert run.call_args.args[0][0] == "antiword"
+
+
+def test_doc_extraction_without_converter_fails(tmp_path):
+    with patch("app.services.extraction.doc.first_available", return_value=None):
+        with pytest.raises(ConverterUnavailableError):
+            DocExtractor().extract(str(tmp_path / "x.doc"))
+
+
+def test_heic_extraction_without_decoder_fails(tmp_path):
+    extractor = HeicExtractor()
+    with patch.object(HeicExtractor, "warm", lambda self: None):
+        with pytest.raises(ConverterUnavailableError):
+            extractor.extract(str(tmp_path / "x.heic"))
@@ -1,5 +1,7 @@
 import os
+import zipfile
 
+from app.services.extraction import docx
 from app.services.extraction.docx import DocxExtractor
 
 
@@ -23,3 +25,100 @@ def test_docx_extraction_medical_keywords():
     assert "parque oeste" in result.text.lower()
     assert "giardiasis" in result.text.lower() or "copro" in result.text.lower()
     assert result.meta["paragraphs"] > 0
+
+
+_NS = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+)
+
+
+def _write_docx(path, body: str, header: str | None = None) -> str:
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(
+            "word/document.xml",
+            f"<w:document {_NS}><w:body>{body}</w:body></w:document>",
+        )
+        if header is not None:
+            zf.writestr("word/header1.xml", f"<w:hdr {_NS}>{header}</w:hdr>")
+    return str(path)
+
+
+def _p(text: str) -> str:
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def test_docx_extraction_tables_in_document_order(tmp_path):
+    row = "<w:tr><w:tc>{}</w:tc><w:tc>{}</w:tc></w:tr>"
+    body = (
+        _p("Tratamiento:")
+        + "<w:tbl>"
+        + row.format(_p("Amoxicilina"), _p("250 mg"))
+        + row.format(_p("Meloxicam"), _p("0.1 mg/kg"))
+        + "</w:tbl>"
+        + _p("Revision en 7 dias")
+    )
+    result = DocxExtractor().extract(_write_docx(tmp_path / "t.docx", body))
+    assert result.text.splitlines() == [
+        "Tratamiento:",
+        "Amoxicilina | 250 mg",
+        "Meloxicam | 0.1 mg/kg",
+        "Revision en 7 dias",
+    ]
+    assert result.meta["tables"] == 1
+    assert result.meta["table_rows"] == 2
+
+
+def test_docx_extraction_headers_and_text_boxes(tmp_path):
+    textbox = (
+        "<w:p><w:r><mc:AlternateContent><mc:Choice><w:txbxContent>"
+        + _p("Chip 941000024967769")
+        + "</w:txbxContent></mc:Choice><mc:Fallback><w:txbxContent>"
+        + _p("Chip 941000024967769")
+        + "</w:txbxContent></mc:Fallback></mc:AlternateContent></w:r></w:p>"
+    )
+    path = _write_docx(
+        tmp_path / "h.docx",
+        _p("Historial") + textbox,
+        header=_p("Clinica Parque Oeste"),
+    )
+    result = DocxExtractor().extract(path)
+    lines = [line for line in result.text.splitlines() if line]
+    assert lines == ["Clinica Parque Oeste", "Historial", "Chip 941000024967769"]
+    assert result.meta["headers"] == 1
+    assert result.meta["text_boxes"] == 1
+
+
+def test_docx_text_box_follows_its_anchor_paragraph(tmp_path):
+    anchor = (
+        "<w:p><w:r><w:t>Identificacion:</w:t></w:r><w:r><w:txbxContent>"
+        + _p("Chip 941000024967769")
+        + _p("Tatuaje ninguno")
+        + "</w:txbxContent></w:r><w:r><w:t> ver recuadro</w:t></w:r></w:p>"
+    )
+    path = _write_docx(tmp_path / "b.docx", anchor + _p("Peso 12 kg"))
+    result = DocxExtractor().extract(path)
+    assert result.text.splitlines() == [
+        "Identificacion: ver recuadro",
+        "Chip 941000024967769",
+        "Tatuaje ninguno",
+        "Peso 12 kg",
+    ]
+    assert result.meta["paragraphs"] == 2
+    assert result.meta["text_box_paragraphs"] == 2
+
+
+def test_docx_segments_are_chunks_of_the_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(docx, "SEGMENT_LINES", 3)
+    path = _write_docx(
+        tmp_path / "s.docx",
+        "".join(_p(f"Linea {i}") for i in range(8)),
+        header=_p("Clinica Parque Oeste"),
+    )
+    meta: dict = {}
+    segments = list(DocxExtractor().iter_segments(path, meta))
+    assert [s.text.count("Linea") for s in segments] == [0, 3, 3, 2]
+    assert all(segment.page is None for segment in segments)
+    assert "".join(s.text for s in segments) == DocxExtractor().extract(path).text
+    assert meta["paragraphs"] == 9
+    assert meta["headers"] == 1
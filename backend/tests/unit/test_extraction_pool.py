@@ -0,0 +1,144 @@
+"""Unit tests for the extraction process pool and serving settings."""
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.serve import worker_count
+from app.services.extraction import pool
+from app.services.extraction.base import ExtractionFailed
+
+
+def test_inline_without_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_pool_workers", 0)
+    path = tmp_path / "a.txt"
+    path.write_text("inline text")
+    assert pool.get_pool() is None
+    assert pool.extract("text/plain", str(path)).text == "inline text"
+
+
+def test_extraction_runs_in_child_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_pool_workers", 1)
+    path = tmp_path / "a.txt"
+    path.write_text("pooled text")
+    try:
+        result = pool.extract("text/plain", str(path))
+        child_pids = set(pool.get_pool().pids())
+    finally:
+        pool.shutdown()
+    assert result.text == "pooled text"
+    assert result.meta["type"] == "text"
+    assert child_pids and os.getpid() not in child_pids
+    assert metrics.quantile("extraction.pool.call", 50) is not None
+    assert result.meta["sandbox"]["worker"] in child_pids
+    assert result.meta["sandbox"]["wall_ms"] >= 0
+
+
+@pytest.fixture
+def sandbox(monkeypatch):
+    monkeypatch.setattr(settings, "extraction_pool_workers", 1)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_worker_recycled_after_max_jobs(sandbox, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_worker_max_jobs", 2)
+    path = tmp_path / "a.txt"
+    path.write_text("text")
+    recycled = metrics.counter("extraction.pool.recycled")
+    workers = [
+        sandbox.extract("text/plain", str(path)).meta["sandbox"]["worker"]
+        for _ in range(3)
+    ]
+    assert workers[0] == workers[1] != workers[2]
+    assert metrics.counter("extraction.pool.recycled") == recycled + 1
+
+
+def test_wall_clock_timeout_kills_worker(sandbox, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_wall_seconds", 0.5)
+    fifo = tmp_path / "stuck.txt"
+    os.mkfifo(fifo)  # Opening it blocks forever: nobody writes.
+    with pytest.raises(ExtractionFailed) as exc:
+        sandbox.extract("text/plain", str(fifo))
+    assert exc.value.meta["failure"] == "timeout"
+    assert sandbox.get_pool().pids() == []
+    path = tmp_path / "a.txt"
+    path.write_text("after timeout")
+    assert sandbox.extract("text/plain", str(path)).text == "after timeout"
+
+
+def test_worker_crash_is_classified(sandbox, tmp_path):
+    fifo = tmp_path / "stuck.txt"
+    os.mkfifo(fifo)
+
+    def crash_worker():
+        for _ in range(100):
+            pids = sandbox.get_pool().pids()
+            if pids:
+                os.kill(pids[0], signal.SIGSEGV)
+                return
+            time.sleep(0.05)
+
+    threading.Thread(target=crash_worker).start()
+    with pytest.raises(ExtractionFailed) as exc:
+        sandbox.extract("text/plain", str(fifo))
+    assert exc.value.kind == "crash"
+    assert "SIGSEGV" in str(exc.value)
+
+
+def test_decompression_bomb_is_oom(sandbox, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_max_image_pixels", 10_000)
+    path = tmp_path / "big.png"
+    Image.new("L", (200, 200)).save(path)
+    failed = metrics.counter("extraction.failed.oom")
+    with pytest.raises(ExtractionFailed) as exc:
+        sandbox.extract("image/png", str(path))
+    assert exc.value.meta["failure"] == "oom"
+    assert "exceeds" in exc.value.meta["error"]
+    assert metrics.counter("extraction.failed.oom") == failed + 1
+
+
+def test_exit_classification():
+    assert pool._classify_exit(-signal.SIGXCPU)[0] == "timeout"
+    assert pool._classify_exit(-signal.SIGKILL)[0] == "oom"
+    assert pool._classify_exit(-signal.SIGABRT)[0] == "crash"
+    assert pool._classify_exit(1)[0] == "crash"
+
+
+def test_worker_count_defaults_to_cpus(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 0)
+    assert worker_count() == (os.cpu_count() or 1)
+    monkeypatch.setattr(settings, "web_concurrency", 3)
+    assert worker_count() == 3
+
+
+def test_inline_image_over_pixel_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_pool_workers", 0)
+    monkeypatch.setattr(settings, "extraction_max_image_pixels", 1_000_000)
+    path = tmp_path / "wide.png"
+    Image.new("L", (2000, 600)).save(path)
+    with pytest.raises(ExtractionFailed) as exc:
+        pool.extract("image/png", str(path))
+    assert str(exc.value) == (
+        "Image of 2000x600 pixels exceeds the limit of 1000000 pixels"
+    )
+
+
+def test_pooled_segments_stream_and_stop_early(sandbox, tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_text("x" * (5 * 1024 * 1024 // 2))
+    meta: dict = {}
+    segments = sandbox.iter_segments("text/plain", str(path), meta)
+    first = next(segments)
+    assert len(first.text) == 1024 * 1024 and first.page is None
+    assert "chars" not in meta
+    segments.close()
+    # The child was mid-document; it is killed rather than reused.
+    assert sandbox.get_pool().pids() == []
+    assert sandbox.extract("text/plain", str(path)).meta["chars"] == 5 * 1024 * 512
@@ -0,0 +1,79 @@
+"""Unit tests for the extractor registry."""
+
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.extraction import factory
+from app.services.extraction.base import DocumentExtractor, ExtractionResult
+from app.services.extraction.factory import ExtractorRegistry, get_extractor
+
+
+class _EchoExtractor(DocumentExtractor):
+    warm_calls = 0
+
+    def __init__(self, prefix: str = "") -> None:
+        self.prefix = prefix
+
+    def warm(self) -> None:
+        type(self).warm_calls += 1
+
+    def extract(self, file_path: str) -> ExtractionResult:
+        return ExtractionResult(text=self.prefix + file_path, meta={"type": "echo"})
+
+
+def test_factory_import_does_not_load_backends():
+    code = (
+        "import sys, app.services.extraction.factory; "
+        "print(sorted(m for m in ('fitz', 'pytesseract', 'PIL', 'docx') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_get_extractor_returns_warm_singleton():
+    first = get_extractor("application/pdf")
+    assert get_extractor("application/pdf") is first
+    assert get_extractor("image/png") is get_extractor("image/jpeg")
+    assert "import_ms" in factory.registry.stats()["pdf"]
+
+
+def test_unsupported_mime_raises_value_error():
+    with pytest.raises(ValueError):
+        get_extractor("application/x-unknown")
+
+
+def test_register_class_with_options_and_magic():
+    registry = ExtractorRegistry(entry_point_group=None)
+    registry.register(
+        _EchoExtractor,
+        ["text/x-echo"],
+        magic={b"ECHO": "text/x-echo"},
+        prefix="> ",
+    )
+    _EchoExtractor.warm_calls = 0
+    extractor = registry.get("text/x-echo")
+    assert extractor.extract("a.txt").text == "> a.txt"
+    assert registry.get("text/x-echo") is extractor
+    assert _EchoExtractor.warm_calls == 1
+    assert registry.match_magic(b"ECHO data") == "text/x-echo"
+    assert registry.match_magic(b"nope") is None
+
+
+def test_entry_points_are_loaded_on_first_miss(monkeypatch):
+    def plugin(registry):
+        registry.register(_EchoExtractor, ["application/x-plugin"], name="plugin")
+
+    monkeypatch.setattr(
+        factory,
+        "entry_points",
+        lambda group: [SimpleNamespace(name="echo", load=lambda: plugin)],
+    )
+    registry = ExtractorRegistry()
+    assert registry.supports("application/x-plugin")
+    assert isinstance(registry.get("application/x-plugin"), _EchoExtractor)
@@ -0,0 +1,41 @@
+from app.services.extraction.text import TextExtractor, detect_encoding
+
+
+def test_text_extraction_utf8(tmp_path):
+    path = tmp_path / "note.txt"
+    path.write_text("Exploración: mucosas rosadas\n", encoding="utf-8")
+    result = TextExtractor().extract(str(path))
+    assert result.text == "Exploración: mucosas rosadas\n"
+    assert result.meta["encoding"] == "utf-8"
+
+
+def test_text_extraction_legacy_windows_encoding(tmp_path):
+    path = tmp_path / "legacy.txt"
+    path.write_bytes("Alcorcón, diagnóstico: otitis".encode("cp1252"))
+    result = TextExtractor().extract(str(path))
+    assert "Alcorcón" in result.text
+    assert result.meta["encoding"] != "utf-8"
+
+
+def test_text_extraction_utf16_bom(tmp_path):
+    path = tmp_path / "utf16.txt"
+    path.write_text("Peso: 30 kg", encoding="utf-16")
+    result = TextExtractor().extract(str(path))
+    assert result.text == "Peso: 30 kg"
+
+
+def test_detect_encoding_ignores_truncated_multibyte_tail():
+    sample = "Línea".encode("utf-8") + "ó".encode("utf-8")[:1]
+    assert detect_encoding(sample) == "utf-8"
+
+
+def test_text_segments_are_chunks_of_the_text(tmp_path):
+    path = tmp_path / "long.txt"
+    text = "Peso: 30 kg, diagnóstico: otitis\n" * 100_000
+    path.write_text(text, encoding="utf-8")
+    meta: dict = {}
+    segments = list(TextExtractor().iter_segments(str(path), meta))
+    assert len(segments) > 1
+    assert all(segment.page is None for segment in segments)
+    assert "".join(segment.text for segment in segments) == text
+    assert meta["chars"] == len(text)
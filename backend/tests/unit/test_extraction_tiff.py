@@ -0,0 +1,21 @@
+from unittest.mock import patch
+
+from PIL import Image
+
+from app.services.extraction.tiff import TiffExtractor
+
+
+def test_tiff_extraction_ocrs_every_frame_in_order(tmp_path):
+    path = tmp_path / "scan.tiff"
+    frames = [Image.new("L", (40, 20), color=shade) for shade in (10, 120, 250)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+    def fake_ocr(frame, lang=None):
+        return f"shade={frame.getpixel((0, 0))}"
+
+    with patch("app.services.extraction.ocr.image_to_string", side_effect=fake_ocr):
+        result = TiffExtractor(max_workers=2).extract(str(path))
+
+    assert result.meta["pages"] == 3
+    assert result.text.index("shade=10") < result.text.index("shade=250")
+    assert "--- Page 3 ---" in result.text
@@ -0,0 +1,85 @@
+"""Unit tests for RFC 6902 diff/apply and RFC 7396 merge."""
+
+import pytest
+
+from app.services.json_patch import JsonPatchError, apply, diff, merge
+
+
+@pytest.mark.parametrize(
+    "old,new",
+    [
+        ({"a": 1}, {"a": 2}),
+        ({"a": 1, "b": 2}, {"a": 1}),
+        ({}, {"pet": {"name": "Rex"}}),
+        ({"items": [1, 2, 3]}, {"items": [1, 3]}),
+        ({"items": [1, 2, 3]}, {"items": [0, 1, 2, 3, 4]}),
+        ({"items": [{"n": "a"}, {"n": "b"}]}, {"items": [{"n": "a", "d": 1}]}),
+        ({"a/b": {"c~d": 1}}, {"a/b": {"c~d": 2}}),
+        ({"a": [1]}, {"a": {"0": 1}}),
+        ({"a": None}, {"a": "x"}),
+    ],
+)
+def test_diff_then_apply_round_trips(old, new):
+    patch = diff(old, new)
+    assert apply(old, patch) == new
+    assert diff(new, new) == []
+
+
+def test_apply_does_not_mutate_input():
+    doc = {"medications": [{"name": "a"}]}
+    apply(doc, [{"op": "remove", "path": "/medications/0"}])
+    assert doc == {"medications": [{"name": "a"}]}
+
+
+def test_rfc6902_operations():
+    doc = {"foo": ["bar", "baz"], "qux": {"x": 1}}
+    patch = [
+        {"op": "add", "path": "/foo/1", "value": "new"},
+        {"op": "add", "path": "/foo/-", "value": "end"},
+        {"op": "move", "from": "/qux/x", "path": "/moved"},
+        {"op": "copy", "from": "/foo/0", "path": "/copied"},
+        {"op": "test", "path": "/moved", "value": 1},
+        {"op": "test", "path": "/moved", "value": 1.0},
+        {"op": "replace", "path": "/qux", "value": None},
+    ]
+    assert apply(doc, patch) == {
+        "foo": ["bar", "new", "baz", "end"],
+        "qux": None,
+        "moved": 1,
+        "copied": "bar",
+    }
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "remove", "path": "/missing"},
+        {"op": "replace", "path": "/a/5", "value": 1},
+        {"op": "add", "path": "/a/01", "value": 1},
+        {"op": "test", "path": "/a/0", "value": 2},
+        {"op": "move", "from": "/a", "path": "/a/0"},
+        {"op": "add", "path": "no-slash", "value": 1},
+        {"op": "add", "path": "/b"},
+        {"op": "frobnicate", "path": "/a"},
+        {"op": "add", "path": 5, "value": 1},
+        {"op": "copy", "from": ["a"], "path": "/b"},
+        {"op": "test", "path": "/a/0", "value": True},
+        {"op": "test", "path": "/a", "value": [1.5]},
+    ],
+)
+def test_invalid_operations_raise(operation):
+    with pytest.raises(JsonPatchError):
+        apply({"a": [1]}, [operation])
+
+
+def test_merge_patch_follows_rfc7396():
+    doc = {"a": "b", "c": {"d": "e", "f": "g"}, "list": [1, 2]}
+    patch = {"a": "z", "c": {"f": None, "h": {"i": None}}, "list": [3], "new": 1}
+    assert merge(doc, patch) == {
+        "a": "z",
+        "c": {"d": "e", "h": {}},
+        "list": [3],
+        "new": 1,
+    }
+    assert doc["c"] == {"d": "e", "f": "g"}
+    assert merge({"a": 1}, ["x"]) == ["x"]
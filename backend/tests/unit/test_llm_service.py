@@ -2,16 +2,24 @@
 
 import asyncio
 import json
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
+import openai
 import pytest
 
+from app.core.config import settings
+from app.core.metrics import metrics
 from app.schemas.veterinary_record import VeterinaryRecordSchema
 from app.services.llm_service import (
     LLMExtractionError,
     RetryConfig,
     call_openai_with_retry,
+    close_clients,
+    configured_providers,
     extract_structured_record,
+    hedge_delay,
 )
 
 
@@ -196,3 +204,161 @@ def test_veterinary_record_schema_missing_required():
 
     with pytest.raises(Exception):  # ValidationError
         VeterinaryRecordSchema(**invalid_data)
+
+
+def _completion(content):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+
+def _auth_error():
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    return openai.AuthenticationError(
+        "Invalid API key", response=httpx.Response(401, request=request), body=None
+    )
+
+
+def test_slow_request_is_hedged_after_observed_p95(monkeypatch, sample_extracted_data):
+    metrics.reset()
+    monkeypatch.setattr(settings, "llm_hedge_min_delay_ms", 10)
+    provider = configured_providers()[0]
+    for _ in range(settings.llm_hedge_min_samples):
+        metrics.observe(provider.latency_metric, 20.0)
+    assert hedge_delay(provider, timeout=30) == pytest.approx(0.02)
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            await asyncio.sleep(5)  # stuck request; cancelled once the hedge wins
+        return _completion(json.dumps(sample_extracted_data))
+
+    with patch("openai.AsyncOpenAI") as mock_openai:
+        mock_openai.return_value.chat.completions.create = create
+        t0 = time.monotonic()
+        record = extract_structured_record("Sample raw text")
+
+    assert record.pet.name == "Buddy"
+    assert time.monotonic() - t0 < 1
+    assert len(calls) == 2
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["llm.provider.primary.hedged"] == 1
+    assert snapshot["counters"]["llm.provider.primary.hedge_won"] == 1
+    assert snapshot["timings"][provider.latency_metric]["count"] == 21
+
+
+def test_fallback_provider_used_only_when_enabled(monkeypatch, sample_extracted_data):
+    metrics.reset()
+    monkeypatch.setattr(
+        settings, "llm_providers", [{"name": "backup", "model": "backup-model"}]
+    )
+
+    async def create(**kwargs):
+        if kwargs["model"] != "backup-model":
+            raise _auth_error()
+        return _completion(json.dumps(sample_extracted_data))
+
+    with patch("openai.AsyncOpenAI") as mock_openai:
+        mock_openai.return_value.chat.completions.create = create
+        monkeypatch.setattr(settings, "llm_fallback_on_error", False)
+        with pytest.raises(LLMExtractionError, match="authentication"):
+            extract_structured_record("Sample raw text")
+
+        monkeypatch.setattr(settings, "llm_fallback_on_error", True)
+        record = extract_structured_record("Sample raw text")
+
+    assert record.clinic_name == "Happy Paws Clinic"
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm.fallback.used"] == 1
+    assert counters["llm.provider.primary.failed"] == 2
+    assert "llm.provider.backup.latency_ms" in metrics.snapshot()["timings"]
+
+
+def test_malformed_response_is_repaired_without_a_new_call(sample_extracted_data):
+    metrics.reset()
+    data = {**sample_extracted_data, "clinic_name": "N/A", "medications": ["Carprofen"]}
+    content = "```json\n" + json.dumps(data)[:-1] + ",}\n```"
+
+    with patch("openai.AsyncOpenAI") as mock_openai:
+        create = mock_openai.return_value.chat.completions.create = AsyncMock(
+            return_value=_completion(content)
+        )
+        record = extract_structured_record("Sample raw text")
+
+    assert create.await_count == 1
+    response_format = create.await_args.kwargs["response_format"]
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["strict"] is True
+    assert record.clinic_name is None
+    assert [m.name for m in record.medications] == ["Carprofen"]
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm.repair.recalls_avoided"] == 1
+    assert counters["llm.repair.fix.json_fence"] == 1
+
+
+def test_invalid_field_gets_a_targeted_follow_up(sample_extracted_data):
+    metrics.reset()
+    first = {**sample_extracted_data, "pet": "a dog"}
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            return _completion(json.dumps(first))
+        return _completion(json.dumps({"pet": {"name": "Buddy", "species": "Dog"}}))
+
+    with patch("openai.AsyncOpenAI") as mock_openai:
+        mock_openai.return_value.chat.completions.create = create
+        record = extract_structured_record("Sample raw text")
+
+    assert len(calls) == 2
+    follow_up_schema = calls[1]["response_format"]["json_schema"]["schema"]
+    assert list(follow_up_schema["properties"]) == ["pet"]
+    assert "only these keys: pet" in calls[1]["messages"][1]["content"]
+    assert record.pet.name == "Buddy"
+    assert record.clinic_name == "Happy Paws Clinic"
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm.repair.followup_succeeded"] == 1
+    assert "llm.repair.recalls_avoided" not in counters
+
+
+def test_provider_client_is_reused_within_a_loop_and_closed():
+    provider = configured_providers()[0]
+
+    async def scenario():
+        first, second = provider.client(), provider.client()
+        await close_clients()
+        return first, second
+
+    with patch("openai.AsyncOpenAI", side_effect=lambda **kw: AsyncMock()) as ctor:
+        first, second = asyncio.run(scenario())
+        assert first is second
+        first.close.assert_awaited_once()
+        # A new loop (or a closed client) gets a fresh one.
+        assert asyncio.run(scenario())[0] is not first
+    assert ctor.call_count == 2
+
+
+def test_timeouts_raise_the_observed_latency():
+    metrics.reset()
+    provider = configured_providers()[0]
+
+    async def create(**kwargs):
+        await asyncio.sleep(5)
+
+    with patch("openai.AsyncOpenAI") as mock_openai:
+        mock_openai.return_value.chat.completions.create = create
+        with pytest.raises(LLMExtractionError):
+            asyncio.run(
+                call_openai_with_retry(
+                    "Test prompt",
+                    retry_config=RetryConfig(
+                        max_retries=2, backoff_factor=0.01, timeout=0.05
+                    ),
+                )
+            )
+    timing = metrics.snapshot()["timings"][provider.latency_metric]
+    assert timing["count"] == 2
+    assert metrics.quantile(provider.latency_metric, 50) >= 50
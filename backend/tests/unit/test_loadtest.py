@@ -0,0 +1,92 @@
+"""Unit tests for the offline LLM stub and load-test report helpers."""
+
+import asyncio
+import json
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+from loadtest.harness import compare_reports, percentile
+from loadtest.stub_llm import (
+    DEFAULT_RECORD,
+    LatencyDistribution,
+    StubConfig,
+    create_stub_app,
+)
+
+
+def _chat(client: TestClient):
+    return client.post(
+        "/v1/chat/completions",
+        json={"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "x"}]},
+    )
+
+
+def test_stub_returns_canned_completion():
+    client = TestClient(create_stub_app(StubConfig(seed=1)))
+    resp = _chat(client)
+    assert resp.status_code == 200
+    content = resp.json()["choices"][0]["message"]["content"]
+    assert json.loads(content) == DEFAULT_RECORD
+    assert client.get("/stats").json()["ok"] == 1
+
+
+def test_stub_injects_rate_limits_and_errors():
+    limited = TestClient(create_stub_app(StubConfig(rate_limit_rate=1.0)))
+    resp = _chat(limited)
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+
+    failing = TestClient(create_stub_app(StubConfig(error_rate=1.0)))
+    assert _chat(failing).status_code == 500
+
+
+def test_stub_is_compatible_with_openai_client():
+    async def call() -> str:
+        transport = httpx.ASGITransport(app=create_stub_app())
+        async with httpx.AsyncClient(transport=transport) as http_client:
+            client = openai.AsyncOpenAI(
+                api_key="stub", base_url="http://stub/v1", http_client=http_client
+            )
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+            )
+            return response.choices[0].message.content
+
+    assert json.loads(asyncio.run(call()))["pet"]["name"] == "Buddy"
+
+
+def test_latency_distribution_parsing():
+    import random
+
+    rng = random.Random(0)
+    assert LatencyDistribution("fixed:25").sample_ms(rng) == 25
+    sample = LatencyDistribution("uniform:10:20").sample_ms(rng)
+    assert 10 <= sample <= 20
+    with pytest.raises(ValueError):
+        LatencyDistribution("gamma:1")
+
+
+def test_percentile_interpolates():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([], 95) is None
+
+
+def test_compare_reports_flags_regressions():
+    def report(p95: float, rps: float) -> dict:
+        stage = {"p50_ms": 10.0, "p95_ms": p95, "p99_ms": p95, "error_rate": 0.0}
+        return {
+            "throughput_rps": rps,
+            "stages": {name: dict(stage) for name in ("upload", "extract", "total")},
+        }
+
+    ok = compare_reports(report(100, 10), report(105, 10), fail_threshold=10)
+    assert ok["regressions"] == []
+
+    bad = compare_reports(report(100, 10), report(150, 8), fail_threshold=10)
+    assert "extract.p95_ms +50.0%" in bad["regressions"]
+    assert any(r.startswith("throughput") for r in bad["regressions"])
@@ -0,0 +1,28 @@
+"""Metrics registry and endpoint unit tests."""
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import MetricsRegistry, metrics
+from app.main import app
+
+
+client = TestClient(app)
+
+
+def test_registry_summarizes_timings():
+    registry = MetricsRegistry(window=100)
+    for value in range(1, 101):
+        registry.observe("stage", float(value))
+    registry.incr("calls", 2)
+    snap = registry.snapshot()
+    assert snap["counters"]["calls"] == 2
+    assert snap["timings"]["stage"]["count"] == 100
+    assert snap["timings"]["stage"]["p50_ms"] == 50.5
+    assert registry.quantile("missing", 95) is None
+
+
+def test_metrics_endpoint():
+    metrics.incr("test.metrics_endpoint")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.json()["counters"]["test.metrics_endpoint"] >= 1
@@ -0,0 +1,84 @@
+import random
+
+from app.services import near_duplicates
+from app.services.near_duplicates import Match, fingerprint, similarity
+
+WORDS = (
+    "patient canine feline vaccine abdomen weight temperature diagnosis "
+    "treatment dose oral every hours days recheck bloodwork otitis dermatitis "
+    "amoxicillin meloxicam clinic history exam mucous membranes pink"
+).split()
+
+
+def _pages(count, seed=1, words=300):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def test_restamped_document_is_near_duplicate_of_the_original():
+    pages = _pages(5)
+    original = fingerprint(["Printed 2024-03-01\n" + pages[0], *pages[1:]])
+    restamped = fingerprint(["Printed 2024-09-17\n" + pages[0], *pages[1:]])
+    other = fingerprint(_pages(5, seed=2))
+    assert similarity(original.minhash, restamped.minhash) >= 0.9
+    assert similarity(original.minhash, other.minhash) < 0.5
+    # A near-identical pair shares LSH buckets; an unrelated one does not.
+    assert set(near_duplicates.bands(original.minhash)) & set(
+        near_duplicates.bands(restamped.minhash)
+    )
+    assert not set(near_duplicates.bands(original.minhash)) & set(
+        near_duplicates.bands(other.minhash)
+    )
+    match = Match("a", 0.99, original.page_digests)
+    assert near_duplicates.changed_pages(restamped, match) == [0]
+
+
+def test_similarity_estimates_jaccard():
+    tokens = " ".join(_pages(1, words=4000)).split()
+
+    def shingles(words):
+        return {
+            tuple(words[i : i + near_duplicates.SHINGLE_WORDS])
+            for i in range(len(words) - near_duplicates.SHINGLE_WORDS + 1)
+        }
+
+    edited = tokens[:3000] + _pages(1, seed=3, words=1000)[0].split()
+    a, b = shingles(tokens), shingles(edited)
+    jaccard = len(a & b) / len(a | b)
+    estimate = similarity(
+        fingerprint([" ".join(tokens)]).minhash, fingerprint([" ".join(edited)]).minhash
+    )
+    assert abs(estimate - jaccard) < 0.15
+
+
+def test_normalization_and_short_texts():
+    assert fingerprint(["Rex  CARPROFEN\n75 mg"]) == fingerprint(
+        ["rex carprofen 75 mg"]
+    )
+    assert len(fingerprint(["Rex"]).minhash) == near_duplicates.NUM_HASHES
+    assert fingerprint(["", " -- \n"]) is None
+
+
+def test_pages_edited_throughout_are_matched_by_similarity():
+    pages = _pages(4)
+    original = fingerprint(pages)
+    # OCR noise and a new stamp on every page: no page digest is the same.
+    noisy = fingerprint(
+        [page.replace("canine", "canlne", 1) + "\nPrinted 2024-09-17" for page in pages]
+    )
+    match = Match("a", 0.95, original.page_digests)
+    assert near_duplicates.page_matches(noisy, match) == {0: 0, 1: 1, 2: 2, 3: 3}
+    assert near_duplicates.page_matches(fingerprint(_pages(1, seed=9)), match) == {
+        0: None
+    }
+    # Rows stored before page sketches still match verbatim pages.
+    legacy = Match("b", 0.95, [digest for digest, _ in original.page_digests])
+    assert near_duplicates.changed_pages(fingerprint(pages), legacy) == []
+    assert near_duplicates.changed_pages(noisy, legacy) == [0, 1, 2, 3]
+
+    assert (
+        near_duplicates.new_lines(
+            "Printed 2024-09-17\nRex  CARPROFEN", "rex carprofen\nPrinted 2024-03-01"
+        )
+        == "Printed 2024-09-17"
+    )
@@ -0,0 +1,35 @@
+from app.services.page_window import select_window, split_pages
+
+
+def _document(*pages):
+    return "".join(f"\n--- Page {i} ---\n{page}\n" for i, page in enumerate(pages, 1))
+
+
+def test_split_pages_on_markers_and_without():
+    assert split_pages(_document("a", "b")) == [(1, "a"), (2, "b")]
+    assert split_pages("x" * 9000) == [
+        (1, "x" * 4000),
+        (2, "x" * 4000),
+        (3, "x" * 1000),
+    ]
+    assert split_pages("") == []
+
+
+def test_select_window_prefers_relevant_pages_within_budget():
+    text = _document(
+        "Patient: Rex, Dog",
+        "Exam normal. " * 20,
+        "Carprofen 75 mg BID",
+        "Diagnosis: otitis externa",
+    )
+    window = select_window(text, ["medications"], max_chars=60)
+    assert window.pages == [3]
+    assert "Carprofen" in window.text and "Rex" not in window.text
+    assert window.total_pages == 4
+
+    window = select_window(text, ["medications", "diagnoses"], max_chars=60)
+    assert window.pages == [3, 4]
+
+    window = select_window(text, ["medications"], max_chars=1000, pages=[1, 4])
+    assert window.pages == [1, 4]
+    assert "Carprofen" not in window.text
@@ -0,0 +1,114 @@
+"""Unit tests for the LLM response schema and local record repair."""
+
+import pytest
+
+from app.services.record_repair import (
+    field_template,
+    load_json,
+    repair,
+    repair_fields,
+    response_schema,
+)
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def test_response_schema_is_strict():
+    schema = response_schema()
+    assert "extraction_date" not in schema["properties"]
+    for node in _walk(schema):
+        assert not {"default", "title", "format", "allOf"} & node.keys()
+        if "properties" in node:
+            assert node["required"] == list(node["properties"])
+            assert node["additionalProperties"] is False
+        if "$ref" in node:
+            assert list(node) == ["$ref"]
+    subset = response_schema(frozenset({"pet", "medications"}))
+    assert subset["required"] == ["pet", "medications"]
+    assert "PetSchema" in subset["$defs"]
+
+
+@pytest.mark.parametrize(
+    "text,expected,fixes",
+    [
+        ('{"a": 1}', {"a": 1}, []),
+        ('```json\n{"a": 1}\n```', {"a": 1}, ["json_fence"]),
+        ('Sure! {"a": [1, 2,],} Done.', {"a": [1, 2]}, None),
+        ('{"a": "b, }", "c": [1', {"a": "b, }", "c": [1]}, ["json_truncated"]),
+        ('{"a": {"b": "unterminated', {"a": {"b": "unterminated"}}, None),
+        ('{"a": 1, "b":', {"a": 1, "b": None}, ["json_truncated"]),
+    ],
+)
+def test_load_json_repairs_syntax(text, expected, fixes):
+    data, applied = load_json(text)
+    assert data == expected
+    if fixes is not None:
+        assert applied == fixes
+
+
+def test_load_json_gives_up_on_garbage():
+    with pytest.raises(ValueError):
+        load_json("{ invalid json")
+
+
+def test_repair_coerces_common_slips():
+    result = repair(
+        {
+            "pet": {"name": "Rex", "age": 5, "weight": "N/A"},
+            "clinic_name": "unknown",
+            "diagnoses": {"condition": "Otitis externa"},
+            "medications": [
+                "Carprofen",
+                {"dosage": "no name"},
+                {"name": "X", "dosage": 2},
+            ],
+            "notes": ["ear clean", "recheck"],
+            "extraction_date": "whenever",
+        }
+    )
+    record = result.record
+    assert record is not None and result.rescued
+    assert record.pet.age == "5" and record.pet.weight is None
+    assert record.clinic_name is None
+    assert [d.condition for d in record.diagnoses] == ["Otitis externa"]
+    assert [m.name for m in record.medications] == ["Carprofen", "X"]
+    assert record.medications[1].dosage == "2"
+    assert record.notes == "ear clean; recheck"
+    assert "dropped_item" in result.fixes and "null_placeholder" in result.fixes
+
+
+def test_repair_reports_fields_it_cannot_fix():
+    result = repair({"pet": None, "clinic_name": "N/A", "medications": None})
+    assert result.record is None
+    assert result.failing_fields == ["pet"]
+    assert result.data["medications"] == []
+
+    clean = repair({"pet": {"name": "Rex"}, "clinic_name": "Clinic"})
+    assert clean.record is not None
+    assert clean.fixes == [] and not clean.rescued
+
+
+def test_repair_fields_validates_only_requested_fields():
+    data = {
+        "medications": {"name": "Carprofen", "dosage": 75},
+        "notes": "N/A",
+        "pet": None,
+    }
+    result = repair_fields(data, ["medications", "notes"])
+    assert result.errors == []
+    assert result.data == {
+        "medications": [
+            {"name": "Carprofen", "dosage": "75", "route": None, "indication": None}
+        ],
+        "notes": None,
+    }
+    assert repair_fields(data, ["pet"]).failing_fields == ["pet"]
+    assert '"medications": [{"name": "string"' in field_template(["medications"])
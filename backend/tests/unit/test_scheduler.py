@@ -0,0 +1,120 @@
+"""Priority scheduler unit tests."""
+
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.core import deadline as deadlines
+from app.core.metrics import metrics
+from app.core.scheduler import (
+    BACKGROUND,
+    BATCH,
+    INTERACTIVE,
+    Resource,
+    SharedResource,
+    _Ticket,
+    current_priority,
+    prioritized,
+)
+from app.main import app
+
+
+def _drain(resource, tickets):
+    """Grant order when one slot frees up at a time."""
+    order = []
+    for _ in tickets:
+        resource.release()
+        order.extend(t for t in tickets if t.granted and t not in order)
+    return [t.priority for t in order]
+
+
+def _busy(weights, aging_seconds=60):
+    resource = Resource("test", 1, weights, aging_seconds)
+    resource.in_use = 1
+    return resource
+
+
+def test_weighted_fair_share_without_starvation():
+    resource = _busy({INTERACTIVE: 4, BATCH: 1, BACKGROUND: 1})
+    tickets = [_Ticket(BATCH) for _ in range(20)]
+    tickets += [_Ticket(INTERACTIVE) for _ in range(20)]
+    tickets += [_Ticket(BACKGROUND) for _ in range(5)]
+    for ticket in tickets:
+        resource._enqueue(ticket)
+    order = _drain(resource, tickets)
+    first = order[:12]
+    assert first.count(INTERACTIVE) == 8
+    assert first.count(BATCH) == 2 and first.count(BACKGROUND) == 2
+
+
+def test_aging_serves_long_waiting_work_first():
+    resource = _busy({INTERACTIVE: 100, BATCH: 1}, aging_seconds=30)
+    old = _Ticket(BATCH)
+    old.enqueued_at -= 60
+    tickets = [_Ticket(INTERACTIVE) for _ in range(3)] + [old]
+    for ticket in tickets:
+        resource._enqueue(ticket)
+    assert _drain(resource, tickets)[0] == BATCH
+    assert metrics.counter("scheduler.test.batch.aged") >= 1
+
+
+def test_shared_slots_follow_the_weighted_share_of_slots_held():
+    shared = SharedResource("test", 10, {INTERACTIVE: 8, BATCH: 2}, 30, None)
+    now = datetime.utcnow()
+
+    def rows(priority, count, age=0):
+        at = now - timedelta(seconds=age)
+        return [
+            SimpleNamespace(id=f"{priority}{i}", priority=priority, enqueued_at=at)
+            for i in range(count)
+        ]
+
+    # Batch queued first; interactive still gets 8 of the 10 free slots.
+    granted = shared._next(rows(BATCH, 10, age=5) + rows(INTERACTIVE, 10), [], now)
+    assert sum(g.startswith(INTERACTIVE) for g in granted) == 8
+    # Slots held elsewhere count: interactive already has its share of 4.
+    held = rows(INTERACTIVE, 4)
+    assert shared._next(rows(BATCH, 1) + rows(INTERACTIVE, 1), held, now)[0] == "batch0"
+    # Work waiting past the aging limit goes next whatever its class.
+    waiting = rows(BATCH, 1, age=60) + rows(INTERACTIVE, 1)
+    assert shared._next(waiting, rows(BATCH, 9), now) == ["batch0"]
+
+
+def test_waiting_gives_up_with_the_deadline():
+    resource = Resource("test_deadline", 1, {}, 60)
+    resource.acquire(BATCH)
+    errors = []
+
+    def wait():
+        with deadlines.use(deadlines.Deadline(0.2)):
+            try:
+                resource.acquire(BATCH)
+            except deadlines.DeadlineExceeded as exc:
+                errors.append(exc)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    thread.join(5)
+    assert len(errors) == 1
+    resource.release()
+    assert resource.in_use == 0
+    assert resource.acquire(INTERACTIVE) < 50
+
+
+def test_prioritized_records_class_latency():
+    seen = []
+    run = prioritized(BACKGROUND, lambda: seen.append(current_priority()))
+    before = metrics.timing_count("scheduler.background.latency_ms")
+    run()
+    assert seen == [BACKGROUND]
+    assert current_priority() == INTERACTIVE
+    assert metrics.timing_count("scheduler.background.latency_ms") == before + 1
+
+
+def test_unknown_priority_is_rejected():
+    resp = TestClient(app).post(
+        "/documents/missing/extract", headers={"X-Priority": "urgent"}
+    )
+    assert resp.status_code == 422
@@ -0,0 +1,44 @@
+"""Cold-start import budget and startup timing tests."""
+
+import json
+import os
+import subprocess
+import sys
+
+from app.core.config import Settings
+from app.db.startup import init_database
+
+import pytest
+from pydantic import ValidationError
+
+# Generous enough for slow CI runners; the app imports in ~1s locally.
+IMPORT_BUDGET_S = float(os.environ.get("STARTUP_IMPORT_BUDGET_S", "3.0"))
+DEFERRED_MODULES = ("openai", "fitz", "pytesseract", "PIL", "docx", "alembic")
+
+
+def test_app_import_stays_within_budget():
+    code = (
+        "import json, sys, time; t0 = time.perf_counter(); import app.main; "
+        "elapsed = time.perf_counter() - t0; "
+        f"loaded = [m for m in {DEFERRED_MODULES!r} if m in sys.modules]; "
+        "print(json.dumps({'elapsed': elapsed, 'loaded': loaded}))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_S
+
+
+def test_unknown_db_init_mode_rejected(monkeypatch):
+    with pytest.raises(ValueError):
+        init_database(engine=None, mode="migrate")
+    # A typo in the environment fails when settings load, before the app boots.
+    monkeypatch.setenv("DB_INIT_MODE", "verfiy")
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_skip_mode_does_not_touch_database():
+    init_database(engine=None, mode="skip")
@@ -7,6 +7,7 @@ import App from './App'
 const apiMocks = vi.hoisted(() => ({
   uploadDocument: vi.fn(),
   extractDocument: vi.fn(),
+  getDocumentText: vi.fn(),
   getDocumentFileUrl: vi.fn(() => 'http://localhost/file.pdf'),
   getApiBaseUrl: vi.fn(() => 'http://localhost:8000'),
 }))
@@ -41,6 +42,7 @@ vi.mock('./lib/api', () => ({
   __esModule: true,
   uploadDocument: apiMocks.uploadDocument,
   extractDocument: apiMocks.extractDocument,
+  getDocumentText: apiMocks.getDocumentText,
   getDocumentFileUrl: apiMocks.getDocumentFileUrl,
   getApiBaseUrl: apiMocks.getApiBaseUrl,
 }))
@@ -50,6 +52,7 @@ describe('App integration flow', () => {
     vi.clearAllMocks()
     apiMocks.uploadDocument.mockReset()
     apiMocks.extractDocument.mockReset()
+    apiMocks.getDocumentText.mockReset()
     apiMocks.getDocumentFileUrl.mockClear()
     apiMocks.getApiBaseUrl.mockClear()
   })
@@ -74,10 +77,20 @@ describe('App integration flow', () => {
     apiMocks.uploadDocument.mockResolvedValueOnce({ id: 'doc-1', filename: 'test.pdf' })
     apiMocks.extractDocument.mockResolvedValueOnce({
       id: 'doc-1',
-      raw_text: 'extracted text',
+      raw_text_chars: 14,
+      raw_text_segments: 1,
       extraction_meta: {},
       record: { patient: 'Max' },
     })
+    apiMocks.getDocumentText.mockResolvedValueOnce({
+      id: 'doc-1',
+      offset: 0,
+      limit: 20,
+      total: 1,
+      chars: 14,
+      segments: [{ page: 1, text: 'extracted text' }],
+      next_offset: null,
+    })
 
     render(<App />)
 
@@ -89,6 +102,7 @@ describe('App integration flow', () => {
 
     expect(apiMocks.uploadDocument).toHaveBeenCalledTimes(1)
     expect(apiMocks.extractDocument).toHaveBeenCalledWith('doc-1')
+    expect(apiMocks.getDocumentText).toHaveBeenCalledWith('doc-1')
     expect(screen.getByTestId('structured-editor')).toHaveTextContent('doc-1:{"patient":"Max"}')
     expect(screen.queryByRole('alert')).not.toBeInTheDocument()
   })
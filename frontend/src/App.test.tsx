@@ -11,6 +11,7 @@ vi.stubGlobal('fetch', mockFetch)
 vi.mock('./lib/api', () => ({
   uploadDocument: vi.fn(),
   extractDocument: vi.fn(),
+  getDocumentText: vi.fn(),
   getDocumentFileUrl: vi.fn(),
   getApiBaseUrl: vi.fn(() => 'http://localhost:8000'),
 }))
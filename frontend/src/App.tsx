@@ -2,13 +2,26 @@ import { useEffect, useMemo, useState } from 'react'
 import UploadDropzone from './components/UploadDropzone'
 import DocumentPreview from './components/DocumentPreview'
 import { StructuredDataEditor } from './components/StructuredDataEditor'
-import { extractDocument, getDocumentFileUrl, uploadDocument, getApiBaseUrl } from './lib/api'
+import {
+  extractDocument,
+  getDocumentFileUrl,
+  getDocumentText,
+  uploadDocument,
+  getApiBaseUrl,
+  type DocumentTextPage,
+} from './lib/api'
 
 const UPLOAD_PROGRESS_START = 10
 const UPLOAD_PROGRESS_FETCH = 60
 const UPLOAD_PROGRESS_COMPLETE = 100
 const PROGRESS_RESET_DELAY_MS = 1200
 
+// Extraction no longer returns the text; it is paged from GET /documents/{id}/text.
+const renderSegments = (page: DocumentTextPage) =>
+  page.segments
+    .map((s) => (s.page === null ? s.text : `--- Page ${s.page} ---\n${s.text}`))
+    .join('\n\n')
+
 function App() {
   const [status, setStatus] = useState<string>('Loading...')
   const [selectedFile, setSelectedFile] = useState<File | null>(null)
@@ -16,6 +29,7 @@ function App() {
   const [uploadProgress, setUploadProgress] = useState<number>(0)
   const [uploadError, setUploadError] = useState<string | null>(null)
   const [rawText, setRawText] = useState<string>('')
+  const [textNextOffset, setTextNextOffset] = useState<number | null>(null)
   const [isExtracting, setIsExtracting] = useState<boolean>(false)
   const [extractedData, setExtractedData] = useState<Record<string, unknown> | null>(null)
 
@@ -52,8 +66,10 @@ function App() {
       setIsExtracting(true)
       console.info('extract.start', { id: result.id })
       const extracted = await extractDocument(result.id)
+      const text = await getDocumentText(result.id)
       setUploadProgress(UPLOAD_PROGRESS_COMPLETE)
-      setRawText(extracted.raw_text || '')
+      setRawText(renderSegments(text))
+      setTextNextOffset(text.next_offset)
       setExtractedData(extracted.record || {})
       console.info('extract.success', { id: result.id })
     } catch (e: unknown) {
@@ -66,6 +82,17 @@ function App() {
     }
   }
 
+  const loadMoreText = async () => {
+    if (!docId || textNextOffset === null) return
+    try {
+      const page = await getDocumentText(docId, textNextOffset)
+      setRawText((prev) => `${prev}\n\n${renderSegments(page)}`)
+      setTextNextOffset(page.next_offset)
+    } catch (e: unknown) {
+      setUploadError(e instanceof Error ? e.message : 'Loading text failed')
+    }
+  }
+
   const fileUrl = useMemo(() => (docId ? getDocumentFileUrl(docId) : ''), [docId])
 
   return (
@@ -122,6 +149,15 @@ function App() {
             {!isExtracting && rawText && (
               <div className="bg-white border rounded p-3 h-[70vh] overflow-auto whitespace-pre-wrap text-sm text-gray-800" aria-label="Extracted text from document" role="region">
                 {rawText}
+                {textNextOffset !== null && (
+                  <button
+                    type="button"
+                    onClick={loadMoreText}
+                    className="mt-3 block text-sm text-blue-700 hover:underline"
+                  >
+                    Load more pages
+                  </button>
+                )}
               </div>
             )}
             {!isExtracting && !rawText && (
@@ -37,6 +37,11 @@ const mockInitialData = {
 describe('StructuredDataEditor', () => {
   beforeEach(() => {
     vi.clearAllMocks()
+    vi.mocked(api.getDocumentRecord).mockResolvedValue({
+      id: 'test-doc-123',
+      version: 3,
+      record: mockInitialData,
+    })
   })
 
   it('renders all form sections with initial data', () => {
@@ -334,4 +339,38 @@ describe('StructuredDataEditor', () => {
       expect(screen.getByText('Saved')).toBeInTheDocument()
     })
   })
+
+  it('sends the loaded version as If-Match and offers a reload on 412', async () => {
+    const conflict = Object.assign(new Error('API Error: 412 Precondition Failed'), {
+      status: 412,
+    })
+    vi.mocked(api.updateDocument).mockRejectedValue(conflict)
+    const latest = { ...mockInitialData, clinic_name: 'Parque Oeste' }
+
+    const user = userEvent.setup()
+    render(<StructuredDataEditor docId="test-doc-123" initialData={mockInitialData} />)
+    await waitFor(() => expect(api.getDocumentRecord).toHaveBeenCalledWith('test-doc-123'))
+
+    const petNameInput = screen.getByDisplayValue('Buddy')
+    await user.clear(petNameInput)
+    await user.type(petNameInput, 'Max')
+    await user.click(screen.getByRole('button', { name: 'Save Changes' }))
+    await user.click(screen.getByRole('button', { name: 'Confirm' }))
+
+    await waitFor(() => {
+      expect(screen.getByText(/changed elsewhere/)).toBeInTheDocument()
+    })
+    expect(api.updateDocument).toHaveBeenCalledWith('test-doc-123', expect.anything(), 3)
+
+    vi.mocked(api.getDocumentRecord).mockResolvedValue({
+      id: 'test-doc-123',
+      version: 4,
+      record: latest,
+    })
+    await user.click(screen.getByRole('button', { name: 'Reload latest version' }))
+    await waitFor(() => {
+      expect(screen.getByDisplayValue('Parque Oeste')).toBeInTheDocument()
+    })
+    expect(screen.queryByText(/changed elsewhere/)).not.toBeInTheDocument()
+  })
 })
@@ -1,11 +1,11 @@
-import { useState, useCallback } from 'react'
+import { useState, useCallback, useEffect } from 'react'
 import { ConfirmationDialog } from './ConfirmationDialog'
 import { FormField } from './FormField'
 import { DiagnosisListEditor } from './DiagnosisListEditor'
 import { MedicationListEditor } from './MedicationListEditor'
 import { useFormData } from '../hooks/useFormData'
 import { useSaveState } from '../hooks/useSaveState'
-import { updateDocument, VeterinaryRecord } from '../lib/api'
+import { getDocumentRecord, updateDocument, VeterinaryRecord } from '../lib/api'
 
 interface StructuredDataEditorProps {
   docId: string
@@ -14,6 +14,9 @@ interface StructuredDataEditorProps {
   onSaveError?: (error: string) => void
 }
 
+const isVersionConflict = (error: unknown): boolean =>
+  (error as { status?: number } | null)?.status === 412
+
 export function StructuredDataEditor({
   docId,
   initialData,
@@ -22,9 +25,49 @@ export function StructuredDataEditor({
 }: StructuredDataEditorProps) {
   const [errors] = useState<Record<string, string>>({})
 
-  const { formData, isDirty, getFormValue, updateField, updateNestedArray, resetDirty } =
-    useFormData(initialData)
+  const {
+    formData,
+    isDirty,
+    getFormValue,
+    updateField,
+    updateNestedArray,
+    resetDirty,
+    replaceData,
+  } = useFormData(initialData)
   const saveState = useSaveState()
+  // Version the form is based on; sent as If-Match so a concurrent save is a 412.
+  const [baseVersion, setBaseVersion] = useState<number | undefined>(undefined)
+  const [conflict, setConflict] = useState(false)
+
+  useEffect(() => {
+    let cancelled = false
+    const load = async () => {
+      try {
+        const current = await getDocumentRecord(docId)
+        if (!cancelled) setBaseVersion(current.version)
+      } catch (error) {
+        console.error('editor.version.error', { id: docId, error })
+      }
+    }
+    load()
+    return () => {
+      cancelled = true
+    }
+  }, [docId])
+
+  const handleReload = useCallback(async () => {
+    console.info('editor.reload', { id: docId })
+    try {
+      const current = await getDocumentRecord(docId)
+      replaceData(current.record)
+      setBaseVersion(current.version)
+      setConflict(false)
+      saveState.setSaveError(null)
+    } catch (error) {
+      const errorMsg = error instanceof Error ? error.message : 'Failed to reload record'
+      saveState.failSave(errorMsg)
+    }
+  }, [docId, replaceData, saveState])
   const handleAddDiagnosis = useCallback(() => {
     console.info('editor.diagnosis.add')
     updateNestedArray('diagnoses', (current) => [
@@ -86,19 +129,29 @@ export function StructuredDataEditor({
     saveState.beginSave()
 
     try {
-      await updateDocument(docId, formData)
+      const saved = await updateDocument(docId, formData, baseVersion)
+      if (saved?.version !== undefined) setBaseVersion(saved.version)
       saveState.completeSave()
       saveState.resetConfirmation()
       onSaveSuccess?.()
       resetDirty()
       console.info('editor.save.success', { id: docId })
     } catch (error) {
-      const errorMsg = error instanceof Error ? error.message : 'Failed to save record'
+      if (isVersionConflict(error)) {
+        console.warn('editor.save.conflict', { id: docId, baseVersion })
+        setConflict(true)
+        saveState.resetConfirmation()
+      }
+      const errorMsg = isVersionConflict(error)
+        ? 'This record was changed elsewhere since you opened it.'
+        : error instanceof Error
+          ? error.message
+          : 'Failed to save record'
       saveState.failSave(errorMsg)
       onSaveError?.(errorMsg)
       console.error('editor.save.error', { id: docId, message: errorMsg })
     }
-  }, [docId, formData, saveState, onSaveSuccess, onSaveError, resetDirty])
+  }, [docId, formData, baseVersion, saveState, onSaveSuccess, onSaveError, resetDirty])
 
   const handleSubmitClick = (e: React.FormEvent<HTMLFormElement>) => {
     e.preventDefault()
@@ -135,6 +188,15 @@ export function StructuredDataEditor({
       {saveState.saveError && (
         <div className="mb-4 p-3 bg-red-50 border border-red-200 rounded text-red-700 text-sm" role="alert">
           Error: {saveState.saveError}
+          {conflict && (
+            <button
+              type="button"
+              onClick={handleReload}
+              className="ml-3 underline font-medium"
+            >
+              Reload latest version
+            </button>
+          )}
         </div>
       )}
 
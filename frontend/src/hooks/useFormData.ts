@@ -22,6 +22,7 @@ interface UseFormDataReturn {
   ) => void
   clearHistory: () => void
   resetDirty: () => void
+  replaceData: (data: Record<string, unknown>) => void
 }
 
 export function useFormData(initialData: Record<string, unknown>): UseFormDataReturn {
@@ -80,6 +81,13 @@ const resetDirty = useCallback(() => {
     setChangeHistory([])
   }, [formData])
 
+  const replaceData = useCallback((data: Record<string, unknown>) => {
+    console.debug('form.replace')
+    setFormData(data)
+    setBaselineData(data)
+    setChangeHistory([])
+  }, [])
+
   return {
     formData,
     isDirty,
@@ -89,5 +97,6 @@ const resetDirty = useCallback(() => {
     updateNestedArray,
     clearHistory,
     resetDirty,
+    replaceData,
   }
 }
@@ -1,18 +1,42 @@
 export type UploadResponse = { id: string; filename: string };
 export type ExtractResponse = {
   id: string;
-  raw_text: string;
+  raw_text?: string;
+  raw_text_chars?: number;
+  raw_text_segments?: number;
   extraction_meta: Record<string, unknown>;
   record: Record<string, unknown>;
+  near_duplicate?: {
+    id: string;
+    similarity: number;
+    changed_pages: number[];
+    reused: 'record' | 'changed_pages' | null;
+  };
 };
 
 export type VeterinaryRecord = Record<string, unknown>;
 
 export type UpdateDocumentResponse = {
   id: string;
+  version: number;
   record: VeterinaryRecord;
 };
 
+export type DocumentRecordResponse = {
+  id: string;
+  version: number;
+  record: VeterinaryRecord;
+};
+
+export class ApiError extends Error {
+  status: number;
+
+  constructor(message: string, status: number) {
+    super(message);
+    this.status = status;
+  }
+}
+
 export const getApiBaseUrl = (): string =>
   import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
@@ -34,7 +58,7 @@ export async function apiClient<T = unknown>(
 
   if (!response.ok) {
     console.error('api.error', { url, status: response.status, statusText: response.statusText });
-    throw new Error(`API Error: ${response.status} ${response.statusText}`);
+    throw new ApiError(`API Error: ${response.status} ${response.statusText}`, response.status);
   }
   const data = (await response.json()) as T;
   console.debug('api.response', { url, ok: true });
@@ -66,19 +90,123 @@ export async function extractDocument(docId: string): Promise<ExtractResponse> {
   const data = await apiClient<ExtractResponse>(`/documents/${docId}/extract`, {
     method: 'POST',
   });
-  console.info('api.extract.success', { id: docId, textLen: String(data.raw_text || '').length });
+  console.info('api.extract.success', { id: docId, textLen: data.raw_text_chars });
   return data;
 }
 
-export async function updateDocument(docId: string, record: VeterinaryRecord): Promise<UpdateDocumentResponse> {
-  console.info('api.update.start', { id: docId });
+export async function getDocumentRecord(docId: string): Promise<DocumentRecordResponse> {
+  return apiClient<DocumentRecordResponse>(`/documents/${docId}/record`);
+}
+
+// Pass the version the edit was based on to get a 412 instead of
+// overwriting someone else's save.
+export async function updateDocument(
+  docId: string,
+  record: VeterinaryRecord,
+  baseVersion?: number
+): Promise<UpdateDocumentResponse> {
+  console.info('api.update.start', { id: docId, baseVersion });
+  const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+  if (baseVersion !== undefined) headers['If-Match'] = `"v${baseVersion}"`;
   const data = await apiClient<UpdateDocumentResponse>(`/documents/${docId}`, {
     method: 'PUT',
+    headers,
     body: JSON.stringify({ record }),
   });
   console.info('api.update.success', { id: docId });
   return data;
 }
 
+export type JsonPatchOperation = {
+  op: 'add' | 'remove' | 'replace' | 'move' | 'copy' | 'test';
+  path: string;
+  value?: unknown;
+  from?: string;
+};
+
+export type PatchRecordResponse = { id: string; version: number };
+
+// Sends only the changed fields: an RFC 6902 operation list, or an RFC 7396
+// merge patch when given an object.
+export async function patchRecord(
+  docId: string,
+  patch: JsonPatchOperation[] | Record<string, unknown>,
+  baseVersion?: number
+): Promise<PatchRecordResponse> {
+  console.info('api.patch.start', { id: docId, baseVersion });
+  const headers: Record<string, string> = {
+    'Content-Type': Array.isArray(patch)
+      ? 'application/json-patch+json'
+      : 'application/merge-patch+json',
+  };
+  if (baseVersion !== undefined) headers['If-Match'] = `"v${baseVersion}"`;
+  const data = await apiClient<PatchRecordResponse>(`/documents/${docId}/record`, {
+    method: 'PATCH',
+    headers,
+    body: JSON.stringify(patch),
+  });
+  console.info('api.patch.success', { id: docId, version: data.version });
+  return data;
+}
+
+export type ReExtractFieldsResponse = {
+  id: string;
+  version: number;
+  fields: string[];
+  pages: number[];
+  values: VeterinaryRecord;
+};
+
+// Re-runs the LLM for a few fields of the stored record, on the relevant pages.
+export async function reExtractFields(
+  docId: string,
+  fields: string[],
+  baseVersion?: number
+): Promise<ReExtractFieldsResponse> {
+  console.info('api.extract_fields.start', { id: docId, fields });
+  const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+  if (baseVersion !== undefined) headers['If-Match'] = `"v${baseVersion}"`;
+  const data = await apiClient<ReExtractFieldsResponse>(
+    `/documents/${docId}/extract/fields`,
+    { method: 'POST', headers, body: JSON.stringify({ fields }) }
+  );
+  console.info('api.extract_fields.success', { id: docId, version: data.version });
+  return data;
+}
+
+export type DocumentTextPage = {
+  id: string;
+  offset: number;
+  limit: number;
+  total: number;
+  chars: number;
+  segments: { page: number | null; text: string }[];
+  next_offset: number | null;
+};
+
+export async function getDocumentText(
+  docId: string,
+  offset = 0,
+  limit = 20
+): Promise<DocumentTextPage> {
+  return apiClient<DocumentTextPage>(
+    `/documents/${docId}/text?offset=${offset}&limit=${limit}`
+  );
+}
+
+export type NearDuplicates = {
+  id: string;
+  matches: {
+    id: string;
+    similarity: number;
+    changed_pages: number[];
+    has_record: boolean;
+  }[];
+};
+
+export async function getNearDuplicates(docId: string): Promise<NearDuplicates> {
+  return apiClient<NearDuplicates>(`/documents/${docId}/near-duplicates`);
+}
+
 export const getDocumentFileUrl = (docId: string): string =>
   `${getApiBaseUrl()}/documents/${docId}/file`;